@@ -7,12 +7,21 @@ Uses separate read-only database credentials to enforce immutability
 import os
 import csv
 import logging
-from typing import List, Dict, Optional, Any
+from collections import defaultdict
+from typing import List, Dict, Optional, Any, NamedTuple, Tuple
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
 
+class NamasteRow(NamedTuple):
+    """One NAMASTE CSV row"""
+    ayush: str
+    code: str
+    icd_code: str
+    definition: str
+
+
 class MappingClient:
     """
     Read-only client for NAMASTE→ICD mapping lookups.
@@ -21,21 +30,40 @@ class MappingClient:
     1. Using read-only database credentials (if DB-based)
     2. Only exposing read methods (no write/update/delete)
     3. Loading data from CSV files (inherently read-only)
+    4. Rejecting attribute assignment once loaded (frozen instance)
     """
     
+    _frozen = False
+    
     def __init__(self, data_dir: str = "data"):
         self.data_dir = Path(data_dir)
-        self.namaste_map: Dict[str, Dict] = {}
+        
+        # NAMASTE rows stored once; name/code indexes point into self.rows
+        self.rows: List[NamasteRow] = []
+        self.by_name: Dict[str, int] = {}
+        self.by_code: Dict[str, int] = {}
         self.icd11_map: Dict[str, Dict] = {}
         
         # Load mappings from CSV (read-only)
         self._load_namaste_mappings()
         self._load_icd11_codes()
+        self._build_derived_views()
+        self._frozen = True
         
         logger.info(f"MappingClient initialized (READ-ONLY mode)")
-        logger.info(f"Loaded {len(self.namaste_map)} NAMASTE mappings")
+        logger.info(f"Loaded {len(self.rows)} NAMASTE mappings")
         logger.info(f"Loaded {len(self.icd11_map)} ICD-11 codes")
     
+    def __setattr__(self, name: str, value: Any):
+        if self._frozen:
+            raise AttributeError(f"MappingClient is read-only; cannot set '{name}'")
+        super().__setattr__(name, value)
+    
+    def __delattr__(self, name: str):
+        if self._frozen:
+            raise AttributeError(f"MappingClient is read-only; cannot delete '{name}'")
+        super().__delattr__(name)
+    
     def _load_namaste_mappings(self):
         """Load NAMASTE mappings from CSV (read-only)"""
         namaste_csv = self.data_dir / "namaste.csv"
@@ -46,36 +74,38 @@ class MappingClient:
         
         try:
             with open(namaste_csv, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
+                # Plain reader + header positions: no per-row dict allocation
+                reader = csv.reader(f)
+                header = next(reader, [])
+                code_i, display_i, definition_i, icd_i = (
+                    header.index(name) for name in ('code', 'display', 'definition', 'icd11_tm2_code')
+                )
+                width = len(header)
                 
                 for row in reader:
-                    code = row.get('code', '').strip()
-                    display = row.get('display', '').strip()
-                    definition = row.get('definition', '').strip()
-                    icd_code = row.get('icd11_tm2_code', '').strip()
+                    if len(row) < width:
+                        row += [''] * (width - len(row))
+                    
+                    code = row[code_i].strip()
+                    display = row[display_i].strip()
+                    definition = row[definition_i].strip()
+                    icd_code = row[icd_i].strip()
+                    
+                    if not display and not code:
+                        continue
+                    
+                    i = len(self.rows)
+                    self.rows.append(NamasteRow(display, code, icd_code, definition))
                     
                     # Index by display name (case-insensitive)
                     if display:
-                        term_key = display.lower().strip()
-                        self.namaste_map[term_key] = {
-                            'ayush': display,
-                            'code': code,
-                            'icd_code': icd_code,
-                            'definition': definition,
-                            'source': 'namaste_csv'
-                        }
+                        self.by_name[display.lower()] = i
                     
                     # Also index by code
                     if code:
-                        self.namaste_map[code.lower()] = {
-                            'ayush': display,
-                            'code': code,
-                            'icd_code': icd_code,
-                            'definition': definition,
-                            'source': 'namaste_csv'
-                        }
+                        self.by_code[code.lower()] = i
             
-            logger.info(f"✓ Loaded {len(self.namaste_map)} NAMASTE mappings from CSV")
+            logger.info(f"✓ Loaded {len(self.rows)} NAMASTE mappings from CSV")
             
         except Exception as e:
             logger.error(f"Error loading NAMASTE mappings: {str(e)}")
@@ -90,12 +120,20 @@ class MappingClient:
         
         try:
             with open(icd11_csv, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
+                reader = csv.reader(f)
+                header = next(reader, [])
+                code_i, title_i, description_i = (
+                    header.index(name) for name in ('code', 'title', 'description')
+                )
+                width = len(header)
                 
                 for row in reader:
-                    code = row.get('code', '').strip()
-                    title = row.get('title', '').strip()
-                    description = row.get('description', '').strip()
+                    if len(row) < width:
+                        row += [''] * (width - len(row))
+                    
+                    code = row[code_i].strip()
+                    title = row[title_i].strip()
+                    description = row[description_i].strip()
                     
                     if code:
                         self.icd11_map[code] = {
@@ -109,6 +147,103 @@ class MappingClient:
         except Exception as e:
             logger.error(f"Error loading ICD-11 codes: {str(e)}")
     
+    def _build_derived_views(self):
+        """Precompute term list, stats and search index (data is immutable after load)"""
+        # Entry order: a name's first occurrence (resolved to the row lookup()
+        # returns for it), then each row by code; every row listed once
+        search_rows: List[int] = []
+        listed = set()
+        seen_names = set()
+        for i, row in enumerate(self.rows):
+            entries = []
+            if row.ayush:
+                name_key = row.ayush.lower()
+                if name_key not in seen_names:
+                    seen_names.add(name_key)
+                    entries.append(self.by_name[name_key])
+            if row.code:
+                entries.append(i)
+            for j in entries:
+                if j not in listed:
+                    listed.add(j)
+                    search_rows.append(j)
+        
+        seen_terms = set()
+        mapped_terms = 0
+        for i in search_rows:
+            row = self.rows[i]
+            if row.ayush and row.ayush not in seen_terms:
+                seen_terms.add(row.ayush)
+                if row.icd_code:
+                    mapped_terms += 1
+        
+        self._sorted_terms: Tuple[str, ...] = tuple(sorted(seen_terms))
+        self._stats = {
+            'total_namaste_terms': len(seen_terms),
+            'mapped_to_icd11': mapped_terms,
+            'unmapped': len(seen_terms) - mapped_terms,
+            'total_icd11_codes': len(self.icd11_map)
+        }
+        
+        # Search index: lowercased "term\0definition" per entry + 1-3 gram postings
+        self._search_rows = search_rows
+        self._search_text: List[str] = [
+            f"{self.rows[i].ayush.lower()}\0{self.rows[i].definition.lower()}" for i in search_rows
+        ]
+        ngram_idx: Dict[str, List[int]] = defaultdict(list)
+        for pos, search_text in enumerate(self._search_text):
+            # N-grams from shifted views zipped together (no per-offset slicing)
+            grams = set(search_text)
+            grams.update(map(''.join, zip(search_text, search_text[1:])))
+            grams.update(map(''.join, zip(search_text, search_text[1:], search_text[2:])))
+            for gram in grams:
+                ngram_idx[gram].append(pos)
+        self._ngram_idx = dict(ngram_idx)
+        
+        # Fully materialized lookup() responses; name keys take precedence over codes
+        resolved_rows: Dict[int, Dict[str, Any]] = {}
+        self._resolved: Dict[str, Dict[str, Any]] = {}
+        for index in (self.by_code, self.by_name):
+            for key, i in index.items():
+                if i not in resolved_rows:
+                    resolved_rows[i] = self._resolve_row(self.rows[i])
+                self._resolved[key] = resolved_rows[i]
+    
+    def _resolve_row(self, row: NamasteRow) -> Dict[str, Any]:
+        """Build the lookup() response for a NAMASTE row"""
+        icd_code = row.icd_code
+        if icd_code and icd_code in self.icd11_map:
+            icd11_info = self.icd11_map[icd_code]
+            return {
+                'ayush_term': row.ayush,
+                'ayush_code': row.code,
+                'icd_code': icd_code,
+                'icd_title': icd11_info['title'],
+                'icd_description': icd11_info['description'],
+                'definition': row.definition,
+                'source': 'namaste_csv_exact_match'
+            }
+        elif icd_code:
+            # ICD code exists but not in our CSV
+            return {
+                'ayush_term': row.ayush,
+                'ayush_code': row.code,
+                'icd_code': icd_code,
+                'icd_title': f"ICD-11 Code: {icd_code}",
+                'definition': row.definition,
+                'source': 'namaste_csv_exact_match'
+            }
+        else:
+            # No ICD code (new NAMASTE term)
+            return {
+                'ayush_term': row.ayush,
+                'ayush_code': row.code,
+                'icd_code': None,
+                'icd_title': row.ayush,
+                'definition': row.definition,
+                'source': 'namaste_csv_no_icd_mapping'
+            }
+    
     # ==================== READ-ONLY METHODS ====================
     
     def lookup(self, ayush_term: str) -> Optional[Dict[str, Any]]:
@@ -120,45 +255,9 @@ class MappingClient:
             
         Returns:
             Mapping dict with ICD-11 code if found, None otherwise
+            (shared, precomputed - do not mutate)
         """
-        term_lower = ayush_term.strip().lower()
-        mapping = self.namaste_map.get(term_lower)
-        
-        if mapping:
-            icd_code = mapping.get('icd_code', '')
-            if icd_code and icd_code in self.icd11_map:
-                icd11_info = self.icd11_map[icd_code]
-                return {
-                    'ayush_term': mapping.get('ayush', ayush_term),
-                    'ayush_code': mapping.get('code', ''),
-                    'icd_code': icd_code,
-                    'icd_title': icd11_info['title'],
-                    'icd_description': icd11_info['description'],
-                    'definition': mapping.get('definition', ''),
-                    'source': 'namaste_csv_exact_match'
-                }
-            elif icd_code:
-                # ICD code exists but not in our CSV
-                return {
-                    'ayush_term': mapping.get('ayush', ayush_term),
-                    'ayush_code': mapping.get('code', ''),
-                    'icd_code': icd_code,
-                    'icd_title': f"ICD-11 Code: {icd_code}",
-                    'definition': mapping.get('definition', ''),
-                    'source': 'namaste_csv_exact_match'
-                }
-            else:
-                # No ICD code (new NAMASTE term)
-                return {
-                    'ayush_term': mapping.get('ayush', ayush_term),
-                    'ayush_code': mapping.get('code', 'NAMASTE'),
-                    'icd_code': None,
-                    'icd_title': mapping.get('ayush', ayush_term),
-                    'definition': mapping.get('definition', ''),
-                    'source': 'namaste_csv_no_icd_mapping'
-                }
-        
-        return None
+        return self._resolved.get(ayush_term.strip().lower())
     
     def lookup_batch(self, ayush_terms: List[str]) -> List[Dict[str, Any]]:
         """
@@ -170,12 +269,11 @@ class MappingClient:
         Returns:
             List of mapping dicts
         """
-        results = []
-        for term in ayush_terms:
-            mapping = self.lookup(term)
-            if mapping:
-                results.append(mapping)
-        return results
+        resolved = self._resolved
+        return [
+            mapping for mapping in (resolved.get(term.strip().lower()) for term in ayush_terms)
+            if mapping
+        ]
     
     def get_icd11_code(self, icd_code: str) -> Optional[Dict[str, Any]]:
         """
@@ -203,26 +301,48 @@ class MappingClient:
         query_lower = query.lower()
         results = []
         
+        if not query_lower:
+            candidates = range(len(self._search_text))
+        elif len(query_lower) < 3:
+            # Unigram/bigram postings are exact: every listed row contains the query
+            candidates = self._ngram_idx.get(query_lower, ())
+        else:
+            # Rows containing every query trigram, in file order
+            postings = []
+            for trigram in {query_lower[j:j + 3] for j in range(len(query_lower) - 2)}:
+                posting = self._ngram_idx.get(trigram)
+                if posting is None:
+                    return results
+                postings.append(posting)
+            
+            postings.sort(key=len)
+            matches = set(postings[0])
+            for posting in postings[1:]:
+                matches.intersection_update(posting)
+                if not matches:
+                    return results
+            candidates = sorted(matches)
+        
         seen_terms = set()
-        for key, mapping in self.namaste_map.items():
-            ayush_term = mapping.get('ayush', '')
+        for pos in candidates:
+            row = self.rows[self._search_rows[pos]]
             
-            # Avoid duplicates (since we index by both term and code)
-            if ayush_term in seen_terms:
+            # Avoid duplicate terms
+            if row.ayush in seen_terms:
                 continue
             
-            # Simple keyword matching
-            if query_lower in ayush_term.lower() or query_lower in mapping.get('definition', '').lower():
+            # Trigrams narrow the candidates; confirm the substring match
+            if query_lower in self._search_text[pos]:
                 results.append({
-                    'ayush_term': ayush_term,
-                    'ayush_code': mapping.get('code', ''),
-                    'icd_code': mapping.get('icd_code', ''),
-                    'definition': mapping.get('definition', '')
+                    'ayush_term': row.ayush,
+                    'ayush_code': row.code,
+                    'icd_code': row.icd_code,
+                    'definition': row.definition
                 })
-                seen_terms.add(ayush_term)
-            
-            if len(results) >= limit:
-                break
+                seen_terms.add(row.ayush)
+                
+                if len(results) >= limit:
+                    break
         
         return results
     
@@ -233,16 +353,7 @@ class MappingClient:
         Returns:
             List of all NAMASTE terms
         """
-        seen_terms = set()
-        terms = []
-        
-        for mapping in self.namaste_map.values():
-            ayush_term = mapping.get('ayush', '')
-            if ayush_term and ayush_term not in seen_terms:
-                terms.append(ayush_term)
-                seen_terms.add(ayush_term)
-        
-        return sorted(terms)
+        return list(self._sorted_terms)
     
     def get_stats(self) -> Dict[str, int]:
         """
@@ -251,30 +362,11 @@ class MappingClient:
         Returns:
             Dict with counts of mappings
         """
-        # Count unique AYUSH terms
-        unique_terms = set()
-        mapped_terms = 0
-        unmapped_terms = 0
-        
-        for mapping in self.namaste_map.values():
-            ayush_term = mapping.get('ayush', '')
-            if ayush_term and ayush_term not in unique_terms:
-                unique_terms.add(ayush_term)
-                if mapping.get('icd_code'):
-                    mapped_terms += 1
-                else:
-                    unmapped_terms += 1
-        
-        return {
-            'total_namaste_terms': len(unique_terms),
-            'mapped_to_icd11': mapped_terms,
-            'unmapped': unmapped_terms,
-            'total_icd11_codes': len(self.icd11_map)
-        }
+        return dict(self._stats)
 
 
-# Global read-only mapping client instance
-_mapping_client: Optional[MappingClient] = None
+# Global read-only mapping client instance, loaded once at import
+_mapping_client: MappingClient = MappingClient()
 
 
 def get_mapping_client() -> MappingClient:
@@ -284,7 +376,4 @@ def get_mapping_client() -> MappingClient:
     Returns:
         MappingClient instance
     """
-    global _mapping_client
-    if _mapping_client is None:
-        _mapping_client = MappingClient()
     return _mapping_client
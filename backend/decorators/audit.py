@@ -3,16 +3,20 @@ Audit Decorator
 Automatically logs actions to audit_logs table
 """
 
-import json
 import logging
+import orjson
 from datetime import datetime
 from functools import wraps
 from typing import Callable, Optional
-from sqlalchemy import text
-from models.database import SessionLocal
+from fastapi import Request
+from backend.services.audit_queue import get_audit_queue
+from backend.middleware.rbac import ActorContext
 
 logger = logging.getLogger(__name__)
 
+# Positional arguments described in the audit payload
+AUDIT_MAX_ARGS = 4
+
 
 def audit_action(
     resource: str,
@@ -37,11 +41,17 @@ def audit_action(
     def decorator(func: Callable):
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            # Get request from kwargs (FastAPI injects it)
+            # Get request from kwargs (FastAPI injects it); some routes use
+            # 'request' for their body model instead
             request = kwargs.get('request')
+            if not isinstance(request, Request):
+                request = None
             
-            # Get actor from request state (set by RBAC middleware)
+            # Get actor from request state (set by RBAC middleware), else from
+            # a get_current_user dependency
             actor = getattr(request.state, 'actor', None) if request else None
+            if actor is None and isinstance(kwargs.get('current_user'), ActorContext):
+                actor = kwargs['current_user']
             
             # Execute the actual function
             try:
@@ -55,10 +65,8 @@ def audit_action(
                 # Re-raise the exception
                 raise
             finally:
-                # Log to audit_logs
+                # Queue audit record (written in batches off the request path)
                 try:
-                    session = SessionLocal()
-                    
                     # Extract resource_id if function provided
                     resource_id = None
                     if extract_resource_id and result:
@@ -67,9 +75,11 @@ def audit_action(
                         except:
                             pass
                     
-                    # Build payload
+                    # Build payload from argument shape only: no values are
+                    # rendered, so cost is bounded and no PII is recorded
                     payload = {
-                        "args": str(args)[:200],  # Truncate
+                        "args_count": len(args),
+                        "args_types": [type(arg).__name__ for arg in args[:AUDIT_MAX_ARGS]],
                         "kwargs_keys": list(kwargs.keys())
                     }
                     
@@ -80,23 +90,13 @@ def audit_action(
                         ip_address = request.client.host if request.client else None
                         user_agent = request.headers.get('user-agent', '')[:200]
                     
-                    # Insert audit log
-                    insert_query = text("""
-                        INSERT INTO audit_logs 
-                        (user_id, actor_type, action, resource, resource_id, payload, 
-                         ip_address, user_agent, status, error_message, timestamp)
-                        VALUES 
-                        (:user_id, :actor_type, :action, :resource, :resource_id, :payload,
-                         :ip_address, :user_agent, :status, :error_message, :timestamp)
-                    """)
-                    
-                    session.execute(insert_query, {
+                    get_audit_queue().enqueue({
                         "user_id": actor.actor_id if actor else None,
                         "actor_type": actor.actor_type if actor else "anonymous",
                         "action": action,
                         "resource": resource,
                         "resource_id": str(resource_id) if resource_id else None,
-                        "payload": json.dumps(payload),
+                        "payload": orjson.dumps(payload).decode(),
                         "ip_address": ip_address,
                         "user_agent": user_agent,
                         "status": status,
@@ -104,9 +104,6 @@ def audit_action(
                         "timestamp": datetime.utcnow()
                     })
                     
-                    session.commit()
-                    session.close()
-                    
                 except Exception as audit_error:
                     logger.error(f"Audit logging error: {str(audit_error)}")
                     # Don't fail the request if audit logging fails
@@ -117,6 +114,20 @@ def audit_action(
     return decorator
 
 
+def audit_log(func: Callable):
+    """
+    Bare decorator: audits the route under its module name, action = function name
+    
+    Example:
+        @router.post("/start-call")
+        @audit_log
+        async def start_video_call(...):
+            ...
+    """
+    resource = func.__module__.rsplit(".", 1)[-1]
+    return audit_action(resource=resource, action=func.__name__)(func)
+
+
 def audit_read(resource: str):
     """Decorator for read operations"""
     return audit_action(resource=resource, action="read")
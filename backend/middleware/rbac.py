@@ -5,16 +5,31 @@ Provides role checking and actor context for requests
 
 from fastapi import Request, HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from typing import Optional, List, Callable
+from typing import Optional, List, Dict, Callable
 from functools import wraps
 import logging
+import time
 
-from backend.services.jwt_auth_service import get_auth_service
+from backend.services.jwt_auth_service import get_auth_service, token_cache_key as _token_cache_key
+from backend.utils.ttl_cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
 security = HTTPBearer(auto_error=False)
 
+# Verified-token cache: token digest -> user dict
+ACTOR_CACHE_TTL_SECONDS = 60
+_actor_cache = TTLCache(maxsize=10000, ttl=ACTOR_CACHE_TTL_SECONDS)
+
+# Role dependencies built so far, keyed by allowed roles
+_role_checkers: Dict[tuple, Callable] = {}
+
+
+def invalidate_cached_token(token: str):
+    """Drop a token from the verified-token caches (e.g. on logout)"""
+    _actor_cache.pop(_token_cache_key(token))
+    get_auth_service().invalidate_token(token)
+
 
 class ActorContext:
     """Actor context attached to requests"""
@@ -45,19 +60,37 @@ async def get_current_user(
         return None
     
     token = credentials.credentials
-    auth_service = get_auth_service()
+    cache_key = _token_cache_key(token)
     
-    # Verify token
-    payload = auth_service.verify_token(token)
+    user = _actor_cache.get(cache_key)
     
-    if not payload:
-        return None
-    
-    # Get user details
-    user = auth_service.get_current_user(token)
-    
-    if not user:
-        return None
+    if user is None:
+        auth_service = get_auth_service()
+        
+        # Verify token (single decode)
+        payload = auth_service.verify_token(token)
+        
+        if not payload or payload.get('type') != 'access':
+            return None
+        
+        if 'email' in payload and 'role' in payload:
+            # Identity and role are signed claims: no user lookup needed
+            user = {
+                'id': payload['sub'],
+                'email': payload['email'],
+                'role': payload['role'],
+                'name': payload.get('name')
+            }
+        else:
+            user = auth_service.get_user_by_id(payload.get('sub'))
+        
+        if not user:
+            return None
+        
+        # Cache until token expiry, capped at the cache TTL
+        ttl = min(payload.get('exp', 0) - time.time(), ACTOR_CACHE_TTL_SECONDS)
+        if ttl > 0:
+            _actor_cache.set(cache_key, user, ttl=ttl)
     
     # Create actor context
     actor = ActorContext(
@@ -113,14 +146,21 @@ def require_role(*allowed_roles: str):
         async def get_users(actor: ActorContext = Depends(require_role("admin"))):
             ...
     """
+    key = tuple(allowed_roles)
+    role_checker = _role_checkers.get(key)
+    if role_checker is not None:
+        # Same roles -> same dependency, so FastAPI resolves it once per request
+        return role_checker
+    
+    allowed = frozenset(allowed_roles)
+    denied_detail = f"Access denied. Required role: {', '.join(allowed_roles)}"
+    
     async def role_checker(actor: ActorContext = Depends(require_auth)) -> ActorContext:
-        if actor.actor_role not in allowed_roles:
-            raise HTTPException(
-                status_code=403,
-                detail=f"Access denied. Required role: {', '.join(allowed_roles)}"
-            )
+        if actor.actor_role not in allowed:
+            raise HTTPException(status_code=403, detail=denied_detail)
         return actor
     
+    _role_checkers[key] = role_checker
     return role_checker
 
 
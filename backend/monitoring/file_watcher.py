@@ -0,0 +1,158 @@
+"""
+File Watcher
+Kernel-pushed change notification for a fixed set of files (Linux inotify)
+"""
+
+import os
+import sys
+import ctypes
+import ctypes.util
+import struct
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# inotify event bits (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_ATTRIB = 0x00000004
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_IGNORED = 0x00008000
+IN_Q_OVERFLOW = 0x00004000
+
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+# Writes, metadata changes (touch/mtime) and replacement; never IN_ACCESS/IN_OPEN,
+# so read-heavy files (FAISS index, reranker) don't flood the queue
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_ATTRIB | IN_MOVE_SELF | IN_DELETE_SELF
+
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+# Filesystems where inotify misses remote writes; callers should stat instead
+NETWORK_FS_TYPES = {"nfs", "nfs4", "cifs", "smb3", "smbfs", "fuse.sshfs", "9p"}
+
+
+def _load_libc():
+    """Load libc inotify entry points, or None if unavailable"""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+def filesystem_type(path: Path) -> Optional[str]:
+    """
+    Get filesystem type of the mount containing path (from /proc/self/mounts)
+
+    Args:
+        path: File or directory path
+
+    Returns:
+        Filesystem type (e.g. 'ext4', 'nfs4'), None if unknown
+    """
+    try:
+        target = str(Path(path).resolve())
+        best_mount, best_type = "", None
+        with open("/proc/self/mounts", "r") as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                mount_point = fields[1].replace("\\040", " ")
+                if (target == mount_point or target.startswith(mount_point.rstrip("/") + "/")) \
+                        and len(mount_point) > len(best_mount):
+                    best_mount, best_type = mount_point, fields[2]
+        return best_type
+    except OSError:
+        return None
+
+
+class FileWatcher:
+    """
+    Watches files for writes, replacement and deletion via inotify.
+
+    Events are queued by the kernel and drained without blocking by
+    changed_paths(), so idle files cost no syscalls.
+    """
+
+    def __init__(self, paths: List[str]):
+        """
+        Create watcher
+
+        Args:
+            paths: Existing files to watch
+
+        Raises:
+            OSError: If inotify is unavailable or a watch cannot be added
+        """
+        libc = _load_libc()
+        if libc is None:
+            raise OSError("inotify is not available on this platform")
+
+        self._libc = libc
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+        self._watches: Dict[int, str] = {}
+        try:
+            for path in paths:
+                wd = libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+                if wd < 0:
+                    errno = ctypes.get_errno()
+                    raise OSError(errno, os.strerror(errno), path)
+                self._watches[wd] = path
+        except OSError:
+            self.close()
+            raise
+
+    def changed_paths(self) -> Set[str]:
+        """
+        Drain pending events without blocking
+
+        Returns:
+            Paths with at least one event since the last call (all watched
+            paths if the kernel queue overflowed)
+        """
+        changed: Set[str] = set()
+
+        while self._fd >= 0:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                wd, mask, _cookie, name_len = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size + name_len
+
+                if mask & IN_Q_OVERFLOW:
+                    changed.update(self._watches.values())
+                    continue
+
+                path = self._watches.get(wd)
+                if path is not None:
+                    changed.add(path)
+                if mask & IN_IGNORED:
+                    # Watch removed by the kernel (file deleted/replaced)
+                    self._watches.pop(wd, None)
+
+        return changed
+
+    def close(self):
+        """Release the inotify descriptor"""
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+        self._watches.clear()
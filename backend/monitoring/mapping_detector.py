@@ -5,16 +5,56 @@ Runs as a background job to detect violations and alert admins
 """
 
 import os
+import sys
+import asyncio
 import logging
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Set, Iterator, Tuple
 from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection
 from sqlalchemy.orm import sessionmaker
+from backend.monitoring.file_watcher import FileWatcher, filesystem_type, NETWORK_FS_TYPES
 
 logger = logging.getLogger(__name__)
 
+# Mapping resources under data_dir whose mtimes are baselined
+MAPPING_FILES = ("namaste.csv", "icd11_codes.csv", "faiss_index.bin", "reranker.joblib")
+
+# SQLite sweeps probe MAX(rowid) (catches inserts in O(log N)); an exact COUNT(*)
+# runs whenever the last one is this old, so deleting an older row is caught
+# within this bound however far the idle sweep interval has backed off
+FULL_COUNT_MAX_AGE = float(os.getenv("DETECTOR_FULL_COUNT_MAX_AGE", "60"))
+
+# run_detector_loop polling: back off while idle, snap back on a violation
+DETECTOR_MIN_INTERVAL = float(os.getenv("DETECTOR_MIN_INTERVAL", "30"))
+DETECTOR_MAX_INTERVAL = float(os.getenv("DETECTOR_MAX_INTERVAL", "300"))
+DETECTOR_BACKOFF = float(os.getenv("DETECTOR_BACKOFF", "1.5"))
+
+# Blocked-write events newer than the last one seen (orchestrator_audit.id is
+# autoincrement): a primary-key seek that reports each event exactly once
+AUDIT_EVENTS_QUERY = text("""
+    SELECT id, action, actor, resource_target, payload_summary, timestamp, error_message
+    FROM orchestrator_audit
+    WHERE id > :last_id
+    AND action = 'mapping_write_blocked'
+    ORDER BY id
+""")
+
+# Fallback when the id baseline could not be read
+AUDIT_EVENTS_SINCE_QUERY = text("""
+    SELECT id, action, actor, resource_target, payload_summary, timestamp, error_message
+    FROM orchestrator_audit
+    WHERE action = 'mapping_write_blocked'
+    AND timestamp >= :since_time
+    ORDER BY timestamp DESC
+""")
+
+AUDIT_MAX_ID_QUERY = text("SELECT COALESCE(MAX(id), 0) FROM orchestrator_audit")
+
 
 class MappingDetector:
     """
@@ -26,77 +66,181 @@ class MappingDetector:
     3. Database table row counts for mapping tables
     """
     
-    def __init__(self, database_url: str = None, data_dir: str = "data"):
+    def __init__(self, database_url: str = None, data_dir: str = "data", use_inotify: bool = True):
         self.database_url = database_url or os.getenv("DATABASE_URL", "sqlite:///./terminology.db")
         self.data_dir = Path(data_dir)
         self.engine = create_engine(self.database_url, connect_args={"check_same_thread": False})
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        # Sweeps only read: plain autocommit connections, no ORM session or transaction
+        self._read_engine = self.engine.execution_options(isolation_level="AUTOCOMMIT")
         
         # Baseline file modification times
         self.baseline_mtimes: Dict[str, float] = {}
         self.baseline_row_counts: Dict[str, int] = {}
         
+        # Highest orchestrator_audit id already reported (None -> time window)
+        self._last_seen_audit_id: Optional[int] = None
+        
+        # inotify watch on mapping files (None -> stat every sweep)
+        self.use_inotify = use_inotify
+        self._watcher: Optional[FileWatcher] = None
+        self._changed_paths: Set[str] = set()
+        
+        # MAX(rowid) probe baselines (SQLite only)
+        self.baseline_max_rowids: Dict[str, Any] = {}
+        self._last_full_count = time.monotonic()
+        self._counts_changed = False
+        
+        # File and database checks touch independent resources; run_detection overlaps them
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="mapping-detector")
+        
         # Initialize baselines
         self._initialize_baselines()
     
     def _initialize_baselines(self):
         """Initialize baseline modification times and row counts"""
-        # File baselines
-        mapping_files = [
-            self.data_dir / "namaste.csv",
-            self.data_dir / "icd11_codes.csv",
-            self.data_dir / "faiss_index.bin",
-            self.data_dir / "reranker.joblib"
-        ]
-        
-        for file_path in mapping_files:
-            if file_path.exists():
-                self.baseline_mtimes[str(file_path)] = file_path.stat().st_mtime
-                logger.info(f"Baseline mtime for {file_path.name}: {datetime.fromtimestamp(file_path.stat().st_mtime)}")
+        # File baselines: one directory listing, one stat per mapping file
+        try:
+            with os.scandir(self.data_dir) as it:
+                dirents = {entry.name: entry for entry in it if entry.is_file()}
+        except OSError as e:
+            logger.warning("Could not list data dir %s: %s", self.data_dir, e)
+            dirents = {}
+        
+        for name in MAPPING_FILES:
+            entry = dirents.get(name)
+            if entry is None:
+                continue
+            mtime = entry.stat().st_mtime
+            self.baseline_mtimes[str(self.data_dir / name)] = mtime
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Baseline mtime for %s: %s", name, datetime.fromtimestamp(mtime))
+        
+        self._start_watcher()
         
         # Database table baselines
         try:
             session = self.SessionLocal()
             
+            try:
+                self._last_seen_audit_id = session.execute(AUDIT_MAX_ID_QUERY).scalar()
+            except Exception as e:
+                self._last_seen_audit_id = None
+                session.rollback()
+                logger.warning("Could not get audit log baseline, using time window: %s", e)
+            
             mapping_tables = ['ayush_terms', 'mapping_candidates', 'icd_codes']
             for table in mapping_tables:
                 try:
                     result = session.execute(text(f"SELECT COUNT(*) FROM {table}"))
                     count = result.scalar()
                     self.baseline_row_counts[table] = count
-                    logger.info(f"Baseline row count for {table}: {count}")
+                    logger.info("Baseline row count for %s: %s", table, count)
                 except Exception as e:
-                    logger.warning(f"Could not get baseline for table {table}: {str(e)}")
+                    logger.warning("Could not get baseline for table %s: %s", table, e)
             
             session.close()
         except Exception as e:
-            logger.error(f"Error initializing database baselines: {str(e)}")
+            logger.error("Error initializing database baselines: %s", e)
+        
+        tables = list(self.baseline_row_counts)
+        self._count_stmt = self._build_count_statement(tables, "COUNT(*)")
+        
+        # rowid is SQLite-specific; other dialects always count exactly
+        self._rowid_stmt = None
+        self.baseline_max_rowids = {}
+        self._last_full_count = time.monotonic()
+        self._counts_changed = False
+        if self.engine.dialect.name == "sqlite" and tables:
+            try:
+                rowid_stmt = self._build_count_statement(tables, "MAX(rowid)")
+                with self.SessionLocal() as session:
+                    self.baseline_max_rowids = dict(session.execute(rowid_stmt).fetchall())
+                self._rowid_stmt = rowid_stmt
+            except Exception as e:
+                logger.warning("Could not get rowid baselines, using exact counts: %s", e)
+    
+    @staticmethod
+    def _build_count_statement(tables: List[str], aggregate: str):
+        """Build one UNION ALL statement applying aggregate to every baseline table"""
+        if not tables:
+            return None
+        return text(" UNION ALL ".join(
+            f"SELECT '{table}' AS table_name, {aggregate} AS row_count FROM {table}"
+            for table in tables
+        ))
+    
+    @contextmanager
+    def _read_connection(self, conn: Optional[Connection] = None) -> Iterator[Connection]:
+        """Yield conn if given (left open), otherwise a new autocommit connection"""
+        if conn is not None:
+            yield conn
+            return
+        with self._read_engine.connect() as conn:
+            yield conn
+    
+    def _rowid_probe_unchanged(self, conn: Connection) -> bool:
+        """Check whether the cheap MAX(rowid) probe shows no inserts since baseline"""
+        if self._rowid_stmt is None or self._counts_changed:
+            return False
+        if time.monotonic() - self._last_full_count >= FULL_COUNT_MAX_AGE:
+            return False
+        
+        try:
+            max_rowids = dict(conn.execute(self._rowid_stmt).fetchall())
+        except Exception as e:
+            logger.error("Error probing mapping table rowids: %s", e)
+            return False
+        
+        return max_rowids == self.baseline_max_rowids
+    
+    def _start_watcher(self):
+        """Watch baseline files with inotify, falling back to stat polling"""
+        if self._watcher is not None:
+            self._watcher.close()
+            self._watcher = None
+        self._changed_paths = set()
+        
+        if not self.use_inotify or not self.baseline_mtimes:
+            return
+        
+        # inotify does not see writes made by other NFS/CIFS clients
+        fs_type = filesystem_type(self.data_dir)
+        if fs_type in NETWORK_FS_TYPES:
+            logger.info("Mapping files on %s; using stat polling", fs_type)
+            return
+        
+        try:
+            self._watcher = FileWatcher(list(self.baseline_mtimes))
+            logger.info("Watching %d mapping files with inotify", len(self.baseline_mtimes))
+        except OSError as e:
+            logger.info("inotify unavailable (%s); using stat polling", e)
     
-    def check_audit_logs(self, since_minutes: int = 5) -> List[Dict[str, Any]]:
+    def check_audit_logs(self, since_minutes: int = 5, conn: Optional[Connection] = None) -> List[Dict[str, Any]]:
         """
         Check OrchestratorAudit for mapping_write_blocked events
         
+        Reports events logged since the previous sweep (or since baselines
+        were taken). If no id baseline could be read, falls back to the
+        last since_minutes of events.
+        
         Args:
-            since_minutes: Check logs from last N minutes
+            since_minutes: Fallback time window in minutes
+            conn: Connection to read on (defaults to a new autocommit connection)
             
         Returns:
             List of blocked write events
         """
         try:
-            session = self.SessionLocal()
-            
-            since_time = datetime.utcnow() - timedelta(minutes=since_minutes)
-            
-            query = text("""
-                SELECT id, action, actor, resource_target, payload_summary, timestamp, error_message
-                FROM orchestrator_audit
-                WHERE action = 'mapping_write_blocked'
-                AND timestamp >= :since_time
-                ORDER BY timestamp DESC
-            """)
-            
-            results = session.execute(query, {"since_time": since_time}).fetchall()
-            session.close()
+            with self._read_connection(conn) as conn:
+                last_id = self._last_seen_audit_id
+                if last_id is not None:
+                    results = conn.execute(AUDIT_EVENTS_QUERY, {"last_id": last_id}).fetchall()
+                    if results:
+                        self._last_seen_audit_id = max(last_id, results[-1][0])
+                else:
+                    since_time = datetime.utcnow() - timedelta(minutes=since_minutes)
+                    results = conn.execute(AUDIT_EVENTS_SINCE_QUERY, {"since_time": since_time}).fetchall()
             
             events = []
             for row in results:
@@ -111,12 +255,12 @@ class MappingDetector:
                 })
             
             if events:
-                logger.warning(f"Found {len(events)} mapping write blocked events in last {since_minutes} minutes")
+                logger.warning("Found %d new mapping write blocked events", len(events))
             
             return events
             
         except Exception as e:
-            logger.error(f"Error checking audit logs: {str(e)}")
+            logger.error("Error checking audit logs: %s", e)
             return []
     
     def check_file_modifications(self) -> List[Dict[str, Any]]:
@@ -128,71 +272,103 @@ class MappingDetector:
         """
         violations = []
         
-        for file_path_str, baseline_mtime in self.baseline_mtimes.items():
-            file_path = Path(file_path_str)
-            
-            if not file_path.exists():
-                logger.warning(f"Mapping file missing: {file_path}")
+        if self._watcher is not None:
+            # Only files the kernel reported as touched need a stat; once
+            # flagged they stay checked until baselines are reset
+            self._changed_paths |= self._watcher.changed_paths()
+            paths_to_check = [p for p in self.baseline_mtimes if p in self._changed_paths]
+        else:
+            paths_to_check = self.baseline_mtimes
+        
+        for file_path_str in paths_to_check:
+            baseline_mtime = self.baseline_mtimes[file_path_str]
+            try:
+                current_mtime = os.stat(file_path_str).st_mtime
+            except FileNotFoundError:
+                logger.warning("Mapping file missing: %s", file_path_str)
                 violations.append({
                     'type': 'file_missing',
-                    'file': str(file_path),
+                    'file': file_path_str,
                     'baseline_mtime': baseline_mtime
                 })
                 continue
             
-            current_mtime = file_path.stat().st_mtime
-            
             if current_mtime > baseline_mtime:
-                logger.critical(f"MAPPING FILE MODIFIED: {file_path}")
-                logger.critical(f"  Baseline: {datetime.fromtimestamp(baseline_mtime)}")
-                logger.critical(f"  Current:  {datetime.fromtimestamp(current_mtime)}")
+                baseline_time = datetime.fromtimestamp(baseline_mtime)
+                current_time = datetime.fromtimestamp(current_mtime)
+                if logger.isEnabledFor(logging.CRITICAL):
+                    logger.critical("MAPPING FILE MODIFIED: %s", file_path_str)
+                    logger.critical("  Baseline: %s", baseline_time)
+                    logger.critical("  Current:  %s", current_time)
                 
                 violations.append({
                     'type': 'file_modified',
-                    'file': str(file_path),
+                    'file': file_path_str,
                     'baseline_mtime': baseline_mtime,
                     'current_mtime': current_mtime,
-                    'baseline_time': datetime.fromtimestamp(baseline_mtime).isoformat(),
-                    'current_time': datetime.fromtimestamp(current_mtime).isoformat()
+                    'baseline_time': baseline_time.isoformat(),
+                    'current_time': current_time.isoformat()
                 })
         
         return violations
     
-    def check_table_row_counts(self) -> List[Dict[str, Any]]:
+    def check_table_row_counts(self, conn: Optional[Connection] = None) -> List[Dict[str, Any]]:
         """
         Check if mapping table row counts have changed
         
+        Args:
+            conn: Connection to read on (defaults to a new autocommit connection)
+        
         Returns:
             List of tables with changed row counts
         """
         violations = []
         
+        if self._count_stmt is None:
+            return violations
+        
         try:
-            session = self.SessionLocal()
-            
-            for table, baseline_count in self.baseline_row_counts.items():
+            with self._read_connection(conn) as conn:
+                if self._rowid_probe_unchanged(conn):
+                    return violations
+                
+                self._last_full_count = time.monotonic()
                 try:
-                    result = session.execute(text(f"SELECT COUNT(*) FROM {table}"))
-                    current_count = result.scalar()
-                    
-                    if current_count != baseline_count:
-                        logger.critical(f"MAPPING TABLE ROW COUNT CHANGED: {table}")
-                        logger.critical(f"  Baseline: {baseline_count}")
-                        logger.critical(f"  Current:  {current_count}")
-                        
-                        violations.append({
-                            'type': 'table_row_count_changed',
-                            'table': table,
-                            'baseline_count': baseline_count,
-                            'current_count': current_count,
-                            'delta': current_count - baseline_count
-                        })
+                    # All baseline tables counted in one round-trip
+                    current_counts = dict(conn.execute(self._count_stmt).fetchall())
                 except Exception as e:
-                    logger.error(f"Error checking table {table}: {str(e)}")
+                    # A table became unreadable: count individually so the rest are still checked
+                    logger.error("Error counting mapping tables together: %s", e)
+                    current_counts = {}
+                    for table in self.baseline_row_counts:
+                        try:
+                            current_counts[table] = conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+                        except Exception as e:
+                            logger.error("Error checking table %s: %s", table, e)
             
-            session.close()
+            for table, baseline_count in self.baseline_row_counts.items():
+                if table not in current_counts:
+                    continue
+                current_count = current_counts[table]
+                
+                if current_count != baseline_count:
+                    if logger.isEnabledFor(logging.CRITICAL):
+                        logger.critical("MAPPING TABLE ROW COUNT CHANGED: %s", table)
+                        logger.critical("  Baseline: %s", baseline_count)
+                        logger.critical("  Current:  %s", current_count)
+                    
+                    violations.append({
+                        'type': 'table_row_count_changed',
+                        'table': table,
+                        'baseline_count': baseline_count,
+                        'current_count': current_count,
+                        'delta': current_count - baseline_count
+                    })
         except Exception as e:
-            logger.error(f"Error checking table row counts: {str(e)}")
+            logger.error("Error checking table row counts: %s", e)
+        
+        # Keep counting exactly while counts differ so the violation is reported every sweep
+        self._counts_changed = bool(violations)
         
         return violations
     
@@ -205,11 +381,45 @@ class MappingDetector:
         """
         logger.info("Running mapping write detection sweep...")
         
-        # Check all violation types
-        audit_events = self.check_audit_logs(since_minutes=5)
-        file_violations = self.check_file_modifications()
-        table_violations = self.check_table_row_counts()
+        # File stats overlap the database reads: sweep time is the slower of the two
+        file_future = self._executor.submit(self.check_file_modifications)
+        db_future = self._executor.submit(self._check_database)
+        
+        audit_events, table_violations = db_future.result()
+        return self._report(audit_events, file_future.result(), table_violations)
+    
+    async def run_detection_async(self) -> Dict[str, Any]:
+        """
+        Run full detection sweep without blocking the event loop
+        
+        Returns:
+            Dict with detection results
+        """
+        logger.info("Running mapping write detection sweep...")
+        
+        file_violations, (audit_events, table_violations) = await asyncio.gather(
+            asyncio.to_thread(self.check_file_modifications),
+            asyncio.to_thread(self._check_database)
+        )
         
+        return self._report(audit_events, file_violations, table_violations)
+    
+    def _check_database(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Run the audit-log and row-count checks on one autocommit connection"""
+        try:
+            with self._read_engine.connect() as conn:
+                return self.check_audit_logs(5, conn=conn), self.check_table_row_counts(conn=conn)
+        except Exception as e:
+            logger.error("Error connecting for mapping detection: %s", e)
+            return [], []
+    
+    def _report(
+        self,
+        audit_events: List[Dict[str, Any]],
+        file_violations: List[Dict[str, Any]],
+        table_violations: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Assemble sweep results and alert on violations"""
         total_violations = len(audit_events) + len(file_violations) + len(table_violations)
         
         results = {
@@ -222,7 +432,7 @@ class MappingDetector:
         }
         
         if total_violations > 0:
-            logger.critical(f"MAPPING VIOLATION DETECTED: {total_violations} violations found")
+            logger.critical("MAPPING VIOLATION DETECTED: %d violations found", total_violations)
             self._send_alert(results)
         else:
             logger.info("✓ No mapping violations detected")
@@ -236,14 +446,15 @@ class MappingDetector:
         Args:
             results: Detection results
         """
-        logger.critical("=" * 80)
-        logger.critical("MAPPING WRITE VIOLATION ALERT")
-        logger.critical("=" * 80)
-        logger.critical(f"Total violations: {results['total_violations']}")
-        logger.critical(f"Audit events: {len(results['audit_events'])}")
-        logger.critical(f"File violations: {len(results['file_violations'])}")
-        logger.critical(f"Table violations: {len(results['table_violations'])}")
-        logger.critical("=" * 80)
+        if logger.isEnabledFor(logging.CRITICAL):
+            logger.critical("=" * 80)
+            logger.critical("MAPPING WRITE VIOLATION ALERT")
+            logger.critical("=" * 80)
+            logger.critical("Total violations: %d", results['total_violations'])
+            logger.critical("Audit events: %d", len(results['audit_events']))
+            logger.critical("File violations: %d", len(results['file_violations']))
+            logger.critical("Table violations: %d", len(results['table_violations']))
+            logger.critical("=" * 80)
         
         # TODO: Implement actual notification (email, Slack, PagerDuty, etc.)
         # For now, just log critically
@@ -253,6 +464,13 @@ class MappingDetector:
         logger.warning("Resetting mapping detector baselines...")
         self._initialize_baselines()
         logger.info("Baselines reset complete")
+    
+    def close(self):
+        """Stop the check worker threads and the inotify watch"""
+        self._executor.shutdown(wait=True)
+        if self._watcher is not None:
+            self._watcher.close()
+            self._watcher = None
 
 
 def run_detector_job():
@@ -269,10 +487,45 @@ def run_detector_job():
         exit(0)
 
 
+def run_detector_loop(
+    min_interval: float = DETECTOR_MIN_INTERVAL,
+    max_interval: float = DETECTOR_MAX_INTERVAL,
+    backoff: float = DETECTOR_BACKOFF
+):
+    """
+    Run detector as a long-lived polling loop with adaptive backoff
+    
+    The sleep between sweeps grows by backoff (up to max_interval) while
+    sweeps are clean, and drops back to min_interval on any violation.
+    
+    Args:
+        min_interval: Seconds between sweeps after a violation (and at start)
+        max_interval: Upper bound on seconds between idle sweeps
+        backoff: Interval multiplier per clean sweep
+    """
+    detector = MappingDetector()
+    interval = min_interval
+    
+    try:
+        while True:
+            results = detector.run_detection()
+            if results['total_violations'] > 0:
+                interval = min_interval
+            else:
+                interval = min(interval * backoff, max_interval)
+            logger.debug("Next mapping detection sweep in %.0fs", interval)
+            time.sleep(interval)
+    finally:
+        detector.close()
+
+
 if __name__ == "__main__":
     # Run detector when executed directly
     logging.basicConfig(
         level=logging.INFO,
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     )
-    run_detector_job()
+    if "--loop" in sys.argv:
+        run_detector_loop()
+    else:
+        run_detector_job()
@@ -6,7 +6,9 @@ Provides admin governance and system management endpoints
 from fastapi import APIRouter, HTTPException, Depends, Request
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
+import orjson
 import logging
+import threading
 import uuid
 from datetime import datetime
 from sqlalchemy import text
@@ -14,11 +16,17 @@ from sqlalchemy import text
 from backend.middleware.rbac import require_role, ActorContext, Roles
 from backend.decorators.audit import audit_action, audit_create
 from backend.services.claim_composer import get_claim_composer
-from models.database import SessionLocal
+from backend.utils.json_response import ORJSONResponse
+from backend.utils.ttl_cache import TTLCache
+from sqlalchemy.orm import Session
+from models.database import get_db
+from services.event_bus import event_bus, EventTopics
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/api/admin", tags=["admin"])
+router = APIRouter(prefix="/api/admin", tags=["admin"], default_response_class=ORJSONResponse)
+
+_claim_composer = get_claim_composer()
 
 
 # ==================== Request Models ====================
@@ -46,57 +54,73 @@ class UpdateConfigRequest(BaseModel):
 
 # ==================== Mapping Governance Routes ====================
 
+APPROVE_PROPOSAL_QUERY = text("""
+    UPDATE mapping_proposals
+    SET status = 'approved',
+        reviewed_by = :reviewed_by,
+        reviewed_at = :reviewed_at,
+        notes = :notes
+    WHERE id = :proposal_id
+    RETURNING id
+""")
+
+# Log admin action
+APPROVE_ACTION_QUERY = text("""
+    INSERT INTO admin_actions
+    (admin_user_id, action_type, resource_type, resource_id, details, created_at)
+    VALUES
+    (:reviewed_by, 'approve_proposal', 'mapping_proposal', :proposal_id, :details, :reviewed_at)
+""")
+
+# PostgreSQL: approval and its admin action in one statement
+APPROVE_PROPOSAL_WITH_ACTION_QUERY = text("""
+    WITH upd AS (
+        UPDATE mapping_proposals
+        SET status = 'approved',
+            reviewed_by = :reviewed_by,
+            reviewed_at = :reviewed_at,
+            notes = :notes
+        WHERE id = :proposal_id
+        RETURNING id
+    )
+    INSERT INTO admin_actions
+    (admin_user_id, action_type, resource_type, resource_id, details, created_at)
+    SELECT :reviewed_by, 'approve_proposal', 'mapping_proposal', id, :details, :reviewed_at
+    FROM upd
+""")
+
+
 @router.post("/mapping/proposals/{proposal_id}/approve")
 @audit_action(resource="mapping_proposal", action="approve")
 async def approve_mapping_proposal(
     request: Request,
     proposal_id: str,
     data: ApproveProposalRequest,
-    actor: ActorContext = Depends(require_role(Roles.ADMIN))
+    actor: ActorContext = Depends(require_role(Roles.ADMIN)),
+    db: Session = Depends(get_db)
 ):
     """
     Approve mapping proposal (Admin only)
     
     NOTE: This only marks as approved. Manual migration still required.
     """
-    session = SessionLocal()
+    params = {
+        "reviewed_by": actor.actor_id,
+        "reviewed_at": datetime.utcnow(),
+        "notes": data.notes,
+        "proposal_id": proposal_id,
+        "details": orjson.dumps({"notes": data.notes}).decode()
+    }
     
     try:
-        update_query = text("""
-            UPDATE mapping_proposals
-            SET status = 'approved',
-                reviewed_by = :reviewed_by,
-                reviewed_at = :reviewed_at,
-                notes = :notes
-            WHERE id = :proposal_id
-        """)
-        
-        session.execute(update_query, {
-            "reviewed_by": actor.actor_id,
-            "reviewed_at": datetime.utcnow(),
-            "notes": data.notes,
-            "proposal_id": proposal_id
-        })
-        
-        # Log admin action
-        admin_action_query = text("""
-            INSERT INTO admin_actions
-            (admin_user_id, action_type, resource_type, resource_id, details, created_at)
-            VALUES
-            (:admin_user_id, :action_type, :resource_type, :resource_id, :details, :created_at)
-        """)
-        
-        import json
-        session.execute(admin_action_query, {
-            "admin_user_id": actor.actor_id,
-            "action_type": "approve_proposal",
-            "resource_type": "mapping_proposal",
-            "resource_id": proposal_id,
-            "details": json.dumps({"notes": data.notes}),
-            "created_at": datetime.utcnow()
-        })
-        
-        session.commit()
+        with db.begin():
+            if db.get_bind().dialect.name == "postgresql":
+                db.execute(APPROVE_PROPOSAL_WITH_ACTION_QUERY, params)
+            else:
+                # SQLite can't chain INSERT after UPDATE in a CTE: two
+                # statements, one transaction and one commit
+                if db.execute(APPROVE_PROPOSAL_QUERY, params).first():
+                    db.execute(APPROVE_ACTION_QUERY, params)
         
         return {
             "status": "approved",
@@ -105,11 +129,8 @@ async def approve_mapping_proposal(
         }
         
     except Exception as e:
-        session.rollback()
         logger.error(f"Error approving proposal: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        session.close()
 
 
 @router.post("/mapping/proposals/{proposal_id}/reject")
@@ -118,31 +139,29 @@ async def reject_mapping_proposal(
     request: Request,
     proposal_id: str,
     data: RejectProposalRequest,
-    actor: ActorContext = Depends(require_role(Roles.ADMIN))
+    actor: ActorContext = Depends(require_role(Roles.ADMIN)),
+    db: Session = Depends(get_db)
 ):
     """
     Reject mapping proposal (Admin only)
     """
-    session = SessionLocal()
-    
     try:
-        update_query = text("""
-            UPDATE mapping_proposals
-            SET status = 'rejected',
-                reviewed_by = :reviewed_by,
-                reviewed_at = :reviewed_at,
-                notes = :notes
-            WHERE id = :proposal_id
-        """)
-        
-        session.execute(update_query, {
-            "reviewed_by": actor.actor_id,
-            "reviewed_at": datetime.utcnow(),
-            "notes": data.reason,
-            "proposal_id": proposal_id
-        })
+        with db.begin():
+            update_query = text("""
+                UPDATE mapping_proposals
+                SET status = 'rejected',
+                    reviewed_by = :reviewed_by,
+                    reviewed_at = :reviewed_at,
+                    notes = :notes
+                WHERE id = :proposal_id
+            """)
         
-        session.commit()
+            db.execute(update_query, {
+                "reviewed_by": actor.actor_id,
+                "reviewed_at": datetime.utcnow(),
+                "notes": data.reason,
+                "proposal_id": proposal_id
+            })
         
         return {
             "status": "rejected",
@@ -150,11 +169,8 @@ async def reject_mapping_proposal(
         }
         
     except Exception as e:
-        session.rollback()
         logger.error(f"Error rejecting proposal: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        session.close()
 
 
 # ==================== Claims Management Routes ====================
@@ -170,9 +186,7 @@ async def generate_claim(
     Generate claim packet from encounter
     """
     try:
-        claim_composer = get_claim_composer()
-        
-        result = claim_composer.generate_claim_packet(
+        result = await _claim_composer.generate_claim_packet(
             encounter_id=data.encounter_id,
             claim_type=data.claim_type,
             insurer_id=data.insurer_id
@@ -185,100 +199,147 @@ async def generate_claim(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+CLAIMS_QUERY = text("""
+    SELECT id, encounter_id, patient_id, claim_type, status,
+           amount_claimed, amount_approved, created_at, submitted_at
+    FROM claim_packets
+    ORDER BY created_at DESC
+    LIMIT :limit
+""")
+
+CLAIMS_BY_STATUS_QUERY = text("""
+    SELECT id, encounter_id, patient_id, claim_type, status,
+           amount_claimed, amount_approved, created_at, submitted_at
+    FROM claim_packets
+    WHERE status = :status
+    ORDER BY created_at DESC
+    LIMIT :limit
+""")
+
+
 @router.get("/claims")
 async def get_claims(
     status: Optional[str] = None,
     limit: int = 50,
-    actor: ActorContext = Depends(require_role(Roles.ADMIN))
+    actor: ActorContext = Depends(require_role(Roles.ADMIN)),
+    db: Session = Depends(get_db)
 ):
     """
     Get claim packets (Admin only)
     """
-    session = SessionLocal()
+    if status:
+        rows = db.execute(CLAIMS_BY_STATUS_QUERY, {"status": status, "limit": limit}).mappings().all()
+    else:
+        rows = db.execute(CLAIMS_QUERY, {"limit": limit}).mappings().all()
     
-    try:
-        if status:
-            query = text("""
-                SELECT id, encounter_id, patient_id, claim_type, status,
-                       amount_claimed, amount_approved, created_at, submitted_at
-                FROM claim_packets
-                WHERE status = :status
-                ORDER BY created_at DESC
-                LIMIT :limit
-            """)
-            results = session.execute(query, {"status": status, "limit": limit}).fetchall()
-        else:
-            query = text("""
-                SELECT id, encounter_id, patient_id, claim_type, status,
-                       amount_claimed, amount_approved, created_at, submitted_at
-                FROM claim_packets
-                ORDER BY created_at DESC
-                LIMIT :limit
-            """)
-            results = session.execute(query, {"limit": limit}).fetchall()
-        
-        claims = []
-        for row in results:
-            claims.append({
-                "claim_id": row[0],
-                "encounter_id": row[1],
-                "patient_id": row[2],
-                "claim_type": row[3],
-                "status": row[4],
-                "amount_claimed": row[5],
-                "amount_approved": row[6],
-                "created_at": row[7].isoformat() if row[7] else None,
-                "submitted_at": row[8].isoformat() if row[8] else None
-            })
-        
-        return {
-            "claims": claims,
-            "count": len(claims)
+    claims = [
+        {
+            "claim_id": r["id"],
+            "encounter_id": r["encounter_id"],
+            "patient_id": r["patient_id"],
+            "claim_type": r["claim_type"],
+            "status": r["status"],
+            "amount_claimed": r["amount_claimed"],
+            "amount_approved": r["amount_approved"],
+            "created_at": r["created_at"],
+            "submitted_at": r["submitted_at"]
         }
-        
-    finally:
-        session.close()
+        for r in rows
+    ]
+    
+    # Returned as a response so orjson encodes the datetimes itself
+    # (a plain dict would go through jsonable_encoder first)
+    return ORJSONResponse({
+        "claims": claims,
+        "count": len(claims)
+    })
 
 
 # ==================== System Configuration Routes ====================
 
+SYSTEM_CONFIG_QUERY = text("""
+    SELECT key, value, value_type, description, updated_at
+    FROM system_config
+    ORDER BY key
+""")
+
+# Parsed system config, cached per process; cleared by update_system_config
+# locally and by the config.invalidated event from other workers. The TTL
+# bounds staleness when that event can't arrive (no Redis, listener down).
+CONFIG_CACHE_TTL_SECONDS = 30
+
+_config_cache = TTLCache(maxsize=1, ttl=CONFIG_CACHE_TTL_SECONDS)
+_config_version = 0
+_config_listener: Optional[threading.Thread] = None
+
+
+def invalidate_config_cache():
+    """Drop the cached system config so the next read reloads it"""
+    global _config_version
+    _config_cache.clear()
+    _config_version += 1
+
+
+def _load_system_config(db: Session) -> Dict[str, Any]:
+    """Read and parse system_config rows"""
+    results = db.execute(SYSTEM_CONFIG_QUERY).fetchall()
+    
+    config = {}
+    for row in results:
+        key = row[0]
+        value = row[1]
+        value_type = row[2]
+        
+        # Parse value based on type
+        if value_type == "boolean":
+            config[key] = value.lower() == "true"
+        elif value_type == "number":
+            config[key] = float(value)
+        elif value_type == "json":
+            config[key] = orjson.loads(value)
+        else:
+            config[key] = value
+    
+    return config
+
+
+def start_config_invalidation_listener():
+    """
+    Clear this worker's config cache when another worker updates config
+    
+    Subscribes to EventTopics.CONFIG_INVALIDATED on a daemon thread; a no-op
+    without Redis (single-process deployments need no broadcast).
+    """
+    global _config_listener
+    if not event_bus.redis_client or (_config_listener and _config_listener.is_alive()):
+        return
+    
+    _config_listener = threading.Thread(
+        target=event_bus.subscribe,
+        args=(EventTopics.CONFIG_INVALIDATED, lambda payload: invalidate_config_cache()),
+        name="config-invalidation",
+        daemon=True
+    )
+    _config_listener.start()
+
+
 @router.get("/config")
-async def get_system_config(actor: ActorContext = Depends(require_role(Roles.ADMIN))):
+async def get_system_config(
+    actor: ActorContext = Depends(require_role(Roles.ADMIN)),
+    db: Session = Depends(get_db)
+):
     """
     Get system configuration (Admin only)
     """
-    session = SessionLocal()
+    config = _config_cache.get("config")
+    if config is None:
+        version = _config_version
+        config = _load_system_config(db)
+        # Don't keep a result that an update raced past while loading
+        if version == _config_version:
+            _config_cache.set("config", config)
     
-    try:
-        query = text("""
-            SELECT key, value, value_type, description, updated_at
-            FROM system_config
-            ORDER BY key
-        """)
-        
-        results = session.execute(query).fetchall()
-        
-        config = {}
-        for row in results:
-            key = row[0]
-            value = row[1]
-            value_type = row[2]
-            
-            # Parse value based on type
-            if value_type == "boolean":
-                config[key] = value.lower() == "true"
-            elif value_type == "number":
-                config[key] = float(value)
-            elif value_type == "json":
-                import json
-                config[key] = json.loads(value)
-            else:
-                config[key] = value
-        
-        return config
-        
-    finally:
-        session.close()
+    return config
 
 
 @router.put("/config")
@@ -286,30 +347,31 @@ async def get_system_config(actor: ActorContext = Depends(require_role(Roles.ADM
 async def update_system_config(
     request: Request,
     data: UpdateConfigRequest,
-    actor: ActorContext = Depends(require_role(Roles.ADMIN))
+    actor: ActorContext = Depends(require_role(Roles.ADMIN)),
+    db: Session = Depends(get_db)
 ):
     """
     Update system configuration (Admin only)
     """
-    session = SessionLocal()
-    
     try:
-        update_query = text("""
-            UPDATE system_config
-            SET value = :value,
-                updated_by = :updated_by,
-                updated_at = :updated_at
-            WHERE key = :key
-        """)
+        with db.begin():
+            update_query = text("""
+                UPDATE system_config
+                SET value = :value,
+                    updated_by = :updated_by,
+                    updated_at = :updated_at
+                WHERE key = :key
+            """)
         
-        session.execute(update_query, {
-            "value": data.value,
-            "updated_by": actor.actor_id,
-            "updated_at": datetime.utcnow(),
-            "key": data.key
-        })
+            db.execute(update_query, {
+                "value": data.value,
+                "updated_by": actor.actor_id,
+                "updated_at": datetime.utcnow(),
+                "key": data.key
+            })
         
-        session.commit()
+        invalidate_config_cache()
+        event_bus.publish(EventTopics.CONFIG_INVALIDATED, {"key": data.key})
         
         return {
             "status": "success",
@@ -318,85 +380,97 @@ async def update_system_config(
         }
         
     except Exception as e:
-        session.rollback()
         logger.error(f"Error updating config: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        session.close()
 
 
 # ==================== Audit Log Routes ====================
 
+def _audit_logs_query(*filters: str, keyset: bool = False):
+    """
+    Build the audit log SELECT with an equality predicate per filter column
+    
+    With keyset=True, rows strictly older than (:before_ts, :before_id) are
+    selected, so later pages are an index seek instead of an OFFSET scan.
+    """
+    predicates = [f"{column} = :{column}" for column in filters]
+    if keyset:
+        predicates.append("(timestamp, id) < (:before_ts, :before_id)")
+    where = " AND ".join(predicates)
+    return text(f"""
+        SELECT id, user_id, actor_type, action, resource, resource_id,
+               status, timestamp
+        FROM audit_logs
+        {"WHERE " + where if where else ""}
+        ORDER BY timestamp DESC, id DESC
+        LIMIT :limit
+    """)
+
+
+# One statement per filter combination, keyed by (user_id given, action given,
+# keyset cursor given). Separate statements (rather than "(:x IS NULL OR col = :x)")
+# keep SQLite's plan an index seek on idx_audit_user_ts when filtering by user.
+AUDIT_LOGS_QUERIES = {
+    (bool(user), bool(action), keyset): _audit_logs_query(
+        *[column for column, given in (("user_id", user), ("action", action)) if given],
+        keyset=keyset
+    )
+    for user in (False, True)
+    for action in (False, True)
+    for keyset in (False, True)
+}
+
+
 @router.get("/audit-logs")
 async def get_audit_logs(
     user_id: Optional[str] = None,
     action: Optional[str] = None,
     limit: int = 100,
-    actor: ActorContext = Depends(require_role(Roles.ADMIN))
+    before_ts: Optional[str] = None,
+    before_id: Optional[str] = None,
+    actor: ActorContext = Depends(require_role(Roles.ADMIN)),
+    db: Session = Depends(get_db)
 ):
     """
     Get audit logs (Admin only)
+    
+    Newest first. To page, pass the previous response's next_before_ts and
+    next_before_id back as before_ts/before_id.
     """
-    session = SessionLocal()
+    keyset = before_ts is not None and before_id is not None
+    if not keyset and (before_ts is not None or before_id is not None):
+        # Half a cursor would silently restart at page 1; paging clients would loop
+        raise HTTPException(status_code=400, detail="before_ts and before_id must be given together")
     
-    try:
-        if user_id and action:
-            query = text("""
-                SELECT id, user_id, actor_type, action, resource, resource_id,
-                       status, timestamp
-                FROM audit_logs
-                WHERE user_id = :user_id AND action = :action
-                ORDER BY timestamp DESC
-                LIMIT :limit
-            """)
-            results = session.execute(query, {"user_id": user_id, "action": action, "limit": limit}).fetchall()
-        elif user_id:
-            query = text("""
-                SELECT id, user_id, actor_type, action, resource, resource_id,
-                       status, timestamp
-                FROM audit_logs
-                WHERE user_id = :user_id
-                ORDER BY timestamp DESC
-                LIMIT :limit
-            """)
-            results = session.execute(query, {"user_id": user_id, "limit": limit}).fetchall()
-        elif action:
-            query = text("""
-                SELECT id, user_id, actor_type, action, resource, resource_id,
-                       status, timestamp
-                FROM audit_logs
-                WHERE action = :action
-                ORDER BY timestamp DESC
-                LIMIT :limit
-            """)
-            results = session.execute(query, {"action": action, "limit": limit}).fetchall()
-        else:
-            query = text("""
-                SELECT id, user_id, actor_type, action, resource, resource_id,
-                       status, timestamp
-                FROM audit_logs
-                ORDER BY timestamp DESC
-                LIMIT :limit
-            """)
-            results = session.execute(query, {"limit": limit}).fetchall()
-        
-        logs = []
-        for row in results:
-            logs.append({
-                "id": row[0],
-                "user_id": row[1],
-                "actor_type": row[2],
-                "action": row[3],
-                "resource": row[4],
-                "resource_id": row[5],
-                "status": row[6],
-                "timestamp": row[7].isoformat() if row[7] else None
-            })
-        
-        return {
-            "logs": logs,
-            "count": len(logs)
+    query = AUDIT_LOGS_QUERIES[(bool(user_id), bool(action), keyset)]
+    rows = db.execute(query, {
+        "user_id": user_id,
+        "action": action,
+        "before_ts": before_ts,
+        "before_id": before_id,
+        "limit": limit
+    }).mappings().all()
+    
+    logs = [
+        {
+            "id": r["id"],
+            "user_id": r["user_id"],
+            "actor_type": r["actor_type"],
+            "action": r["action"],
+            "resource": r["resource"],
+            "resource_id": r["resource_id"],
+            "status": r["status"],
+            "timestamp": r["timestamp"]
         }
-        
-    finally:
-        session.close()
+        for r in rows
+    ]
+    
+    # Keyset cursor: the last row's sort key, in its stored form
+    last = rows[-1] if rows else None
+    
+    return ORJSONResponse({
+        "logs": logs,
+        "count": len(logs),
+        "next_before_ts": str(last["timestamp"]) if last is not None and last["timestamp"] is not None else None,
+        "next_before_id": str(last["id"]) if last is not None else None
+    })
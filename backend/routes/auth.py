@@ -6,10 +6,14 @@ Handles user registration, login, token refresh, and logout
 from fastapi import APIRouter, HTTPException, Depends, Request
 from pydantic import BaseModel, EmailStr
 from typing import Optional
+import asyncio
 import logging
 
 from backend.services.jwt_auth_service import get_auth_service
-from backend.middleware.rbac import get_current_user, ActorContext, require_auth
+from fastapi.security import HTTPAuthorizationCredentials
+from backend.middleware.rbac import (
+    get_current_user, ActorContext, require_auth, security, invalidate_cached_token
+)
 from backend.decorators.audit import audit_action
 
 logger = logging.getLogger(__name__)
@@ -79,8 +83,10 @@ async def register(request: Request, data: RegisterRequest):
                 detail=f"Invalid role. Allowed roles: {', '.join(allowed_roles)}"
             )
         
-        # Register user
-        result = auth_service.register(
+        # Register user; bcrypt and the sync session run in a worker thread
+        # (bcrypt releases the GIL) so the event loop keeps serving requests
+        result = await asyncio.to_thread(
+            auth_service.register,
             email=data.email,
             password=data.password,
             name=data.name,
@@ -108,7 +114,9 @@ async def login(request: Request, data: LoginRequest):
     try:
         auth_service = get_auth_service()
         
-        result = auth_service.login(
+        # bcrypt check (and any rehash) off the event loop
+        result = await asyncio.to_thread(
+            auth_service.login,
             email=data.email,
             password=data.password
         )
@@ -132,7 +140,7 @@ async def refresh_token(data: RefreshTokenRequest):
     try:
         auth_service = get_auth_service()
         
-        result = auth_service.refresh_access_token(data.refresh_token)
+        result = await asyncio.to_thread(auth_service.refresh_access_token, data.refresh_token)
         
         return result
         
@@ -145,13 +153,20 @@ async def refresh_token(data: RefreshTokenRequest):
 
 @router.post("/logout")
 @audit_action(resource="user", action="logout")
-async def logout(request: Request, actor: ActorContext = Depends(require_auth)):
+async def logout(
+    request: Request,
+    actor: ActorContext = Depends(require_auth),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)
+):
     """
     Logout current user
     
     (In stateless JWT, this is mainly for audit logging.
      Client should discard tokens.)
     """
+    if credentials:
+        invalidate_cached_token(credentials.credentials)
+    
     return {
         "message": "Logged out successfully",
         "user_id": actor.actor_id
@@ -6,19 +6,31 @@ Integrates read-only mapping client and feedback mechanisms
 from fastapi import APIRouter, HTTPException, Depends, Request
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
+import json
 import logging
 import uuid
 from datetime import datetime
 from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from backend.clients.mapping_client import get_mapping_client
 from backend.middleware.rbac import require_auth, require_role, ActorContext, Roles
 from backend.decorators.audit import audit_create, audit_action
-from models.database import SessionLocal
+from backend.utils.ids import uuid4_strings
+from backend.utils.json_response import ORJSONResponse
+from backend.utils.ttl_cache import TTLCache
+from models.database import get_async_db
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/api/mapping", tags=["mapping", "copilot"])
+router = APIRouter(prefix="/api/mapping", tags=["mapping", "copilot"], default_response_class=ORJSONResponse)
+
+# Search results: (lowercased query, limit) -> shared result list (do not mutate)
+SEARCH_CACHE_TTL_SECONDS = 600
+_search_cache = TTLCache(maxsize=2000, ttl=SEARCH_CACHE_TTL_SECONDS)
+
+# Read-only client, loaded once at import by the client module
+_mapping_client = get_mapping_client()
 
 
 # ==================== Request/Response Models ====================
@@ -69,9 +81,7 @@ async def lookup_mapping(
     Uses read-only mapping client to ensure immutability
     """
     try:
-        mapping_client = get_mapping_client()
-        
-        result = mapping_client.lookup(ayush_term)
+        result = _mapping_client.lookup(ayush_term)
         
         if not result:
             return {
@@ -100,9 +110,13 @@ async def search_mappings(
     Search NAMASTE terms by keyword (READ-ONLY)
     """
     try:
-        mapping_client = get_mapping_client()
+        # Matching is case-insensitive, so the lowercased query is the key
+        cache_key = (query.lower(), limit)
+        results = _search_cache.get(cache_key)
         
-        results = mapping_client.search_namaste(query, limit=limit)
+        if results is None:
+            results = _mapping_client.search_namaste(query, limit=limit)
+            _search_cache.set(cache_key, results)
         
         return {
             "query": query,
@@ -121,9 +135,7 @@ async def get_mapping_stats(actor: ActorContext = Depends(require_role(Roles.ADM
     Get mapping statistics (READ-ONLY)
     """
     try:
-        mapping_client = get_mapping_client()
-        
-        stats = mapping_client.get_stats()
+        stats = _mapping_client.get_stats()
         
         return stats
         
@@ -134,13 +146,37 @@ async def get_mapping_stats(actor: ActorContext = Depends(require_role(Roles.ADM
 
 # ==================== Encounter Mapping Routes ====================
 
+ENCOUNTER_EXISTS_QUERY = text("SELECT id FROM encounters WHERE id = :encounter_id")
+
+ENCOUNTER_DIAGNOSIS_INSERT_QUERY = text("""
+    INSERT INTO encounter_diagnoses
+    (id, encounter_id, ayush_term_id, icd_code, diagnosis_type, 
+     accepted_from_ai, ai_suggestion_id, clinician_modified, 
+     confidence, provenance, created_at)
+    VALUES
+    (:id, :encounter_id, :ayush_term_id, :icd_code, :diagnosis_type,
+     :accepted_from_ai, :ai_suggestion_id, :clinician_modified,
+     :confidence, :provenance, :created_at)
+""")
+
+MAPPING_FEEDBACK_INSERT_QUERY = text("""
+    INSERT INTO mapping_feedback
+    (id, encounter_id, ayush_term, suggested_icd11, clinician_icd11,
+     clinician_id, feedback_type, confidence_score, notes, created_at)
+    VALUES
+    (:id, :encounter_id, :ayush_term, :suggested_icd11, :clinician_icd11,
+     :clinician_id, :feedback_type, :confidence_score, :notes, :created_at)
+""")
+
+
 @router.post("/encounters/{encounter_id}/accept")
 @audit_create(resource="encounter_diagnosis", extract_id=lambda r: r.get('encounter_id'))
 async def accept_mapping(
     request: Request,
     encounter_id: str,
     data: AcceptMappingRequest,
-    actor: ActorContext = Depends(require_role(Roles.DOCTOR))
+    actor: ActorContext = Depends(require_role(Roles.DOCTOR)),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Accept AI mapping suggestions for encounter (Doctor only)
@@ -148,86 +184,84 @@ async def accept_mapping(
     Writes ONLY to encounter_diagnoses table (additive)
     Does NOT modify mapping store
     """
-    session = SessionLocal()
-    
     try:
-        import json
-        
         # Verify encounter exists
-        check_query = text("SELECT id FROM encounters WHERE id = :encounter_id")
-        result = session.execute(check_query, {"encounter_id": encounter_id}).fetchone()
+        result = (await db.execute(ENCOUNTER_EXISTS_QUERY, {"encounter_id": encounter_id})).fetchone()
         
         if not result:
             raise HTTPException(status_code=404, detail="Encounter not found")
         
-        # Process each selected mapping
-        for mapping in data.selected_mappings:
-            ayush_term = mapping.get('ayush_term')
+        # One timestamp for every row written by this acceptance
+        now = datetime.utcnow()
+        accepted_at = now.isoformat()
+        
+        # Provenance only varies by clinician_edited: serialize each variant once
+        provenance_by_edit = {
+            edited: json.dumps({
+                "source": "copilot_suggestion",
+                "clinician_id": actor.actor_id,
+                "clinician_edited": edited,
+                "accepted_at": accepted_at
+            })
+            for edited in (False, True)
+        }
+        
+        diagnosis_rows = []
+        feedback_rows = []
+        diagnosis_ids = uuid4_strings(len(data.selected_mappings))
+        for mapping, diagnosis_id in zip(data.selected_mappings, diagnosis_ids):
             icd_code = mapping.get('icd_code')
             clinician_edited = mapping.get('clinician_edited', False)
-            ai_suggestion_id = mapping.get('ai_suggestion_id')
             confidence = mapping.get('confidence')
             
-            # Insert into encounter_diagnoses (additive only)
-            insert_query = text("""
-                INSERT INTO encounter_diagnoses
-                (id, encounter_id, ayush_term_id, icd_code, diagnosis_type, 
-                 accepted_from_ai, ai_suggestion_id, clinician_modified, 
-                 confidence, provenance, created_at)
-                VALUES
-                (:id, :encounter_id, :ayush_term_id, :icd_code, :diagnosis_type,
-                 :accepted_from_ai, :ai_suggestion_id, :clinician_modified,
-                 :confidence, :provenance, :created_at)
-            """)
-            
-            provenance = {
-                "source": "copilot_suggestion",
-                "clinician_id": actor.actor_id,
-                "clinician_edited": clinician_edited,
-                "accepted_at": datetime.utcnow().isoformat()
-            }
+            if isinstance(clinician_edited, bool):
+                provenance = provenance_by_edit[clinician_edited]
+            else:
+                provenance = json.dumps({
+                    "source": "copilot_suggestion",
+                    "clinician_id": actor.actor_id,
+                    "clinician_edited": clinician_edited,
+                    "accepted_at": accepted_at
+                })
             
-            session.execute(insert_query, {
-                "id": str(uuid.uuid4()),
+            diagnosis_rows.append({
+                "id": diagnosis_id,
                 "encounter_id": encounter_id,
                 "ayush_term_id": None,  # Could link to ayush_terms table if needed
                 "icd_code": icd_code,
                 "diagnosis_type": "primary",
                 "accepted_from_ai": not clinician_edited,
-                "ai_suggestion_id": ai_suggestion_id,
+                "ai_suggestion_id": mapping.get('ai_suggestion_id'),
                 "clinician_modified": clinician_edited,
                 "confidence": confidence,
-                "provenance": json.dumps(provenance),
-                "created_at": datetime.utcnow()
+                "provenance": provenance,
+                "created_at": now
             })
             
             # If clinician edited, create feedback entry
             if clinician_edited:
-                suggested_icd = mapping.get('original_suggested_icd11', '')
-                
-                feedback_query = text("""
-                    INSERT INTO mapping_feedback
-                    (id, encounter_id, ayush_term, suggested_icd11, clinician_icd11,
-                     clinician_id, feedback_type, confidence_score, notes, created_at)
-                    VALUES
-                    (:id, :encounter_id, :ayush_term, :suggested_icd11, :clinician_icd11,
-                     :clinician_id, :feedback_type, :confidence_score, :notes, :created_at)
-                """)
-                
-                session.execute(feedback_query, {
-                    "id": str(uuid.uuid4()),
+                feedback_rows.append({
                     "encounter_id": encounter_id,
-                    "ayush_term": ayush_term,
-                    "suggested_icd11": suggested_icd,
+                    "ayush_term": mapping.get('ayush_term'),
+                    "suggested_icd11": mapping.get('original_suggested_icd11', ''),
                     "clinician_icd11": icd_code,
                     "clinician_id": actor.actor_id,
                     "feedback_type": "correction",
                     "confidence_score": confidence,
                     "notes": mapping.get('notes', ''),
-                    "created_at": datetime.utcnow()
+                    "created_at": now
                 })
         
-        session.commit()
+        for row, feedback_id in zip(feedback_rows, uuid4_strings(len(feedback_rows))):
+            row["id"] = feedback_id
+        
+        # One executemany per table (additive only)
+        if diagnosis_rows:
+            await db.execute(ENCOUNTER_DIAGNOSIS_INSERT_QUERY, diagnosis_rows)
+        if feedback_rows:
+            await db.execute(MAPPING_FEEDBACK_INSERT_QUERY, feedback_rows)
+        
+        await db.commit()
         
         logger.info(f"Accepted {len(data.selected_mappings)} mappings for encounter {encounter_id}")
         
@@ -235,17 +269,15 @@ async def accept_mapping(
             "status": "success",
             "encounter_id": encounter_id,
             "mappings_accepted": len(data.selected_mappings),
-            "feedback_created": sum(1 for m in data.selected_mappings if m.get('clinician_edited'))
+            "feedback_created": len(feedback_rows)
         }
         
     except HTTPException:
         raise
     except Exception as e:
-        session.rollback()
+        await db.rollback()
         logger.error(f"Error accepting mapping: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        session.close()
 
 
 @router.post("/feedback")
@@ -253,7 +285,8 @@ async def accept_mapping(
 async def submit_mapping_feedback(
     request: Request,
     data: MappingFeedbackRequest,
-    actor: ActorContext = Depends(require_role(Roles.DOCTOR))
+    actor: ActorContext = Depends(require_role(Roles.DOCTOR)),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Submit mapping correction feedback (Doctor only)
@@ -261,23 +294,10 @@ async def submit_mapping_feedback(
     Stores feedback for future mapping improvements
     Does NOT modify mapping store
     """
-    session = SessionLocal()
-    
     try:
-        import json
-        
         feedback_id = str(uuid.uuid4())
         
-        insert_query = text("""
-            INSERT INTO mapping_feedback
-            (id, encounter_id, ayush_term, suggested_icd11, clinician_icd11,
-             clinician_id, feedback_type, confidence_score, notes, created_at)
-            VALUES
-            (:id, :encounter_id, :ayush_term, :suggested_icd11, :clinician_icd11,
-             :clinician_id, :feedback_type, :confidence_score, :notes, :created_at)
-        """)
-        
-        session.execute(insert_query, {
+        await db.execute(MAPPING_FEEDBACK_INSERT_QUERY, {
             "id": feedback_id,
             "encounter_id": data.encounter_id,
             "ayush_term": data.ayush_term,
@@ -290,7 +310,7 @@ async def submit_mapping_feedback(
             "created_at": datetime.utcnow()
         })
         
-        session.commit()
+        await db.commit()
         
         logger.info(f"Mapping feedback submitted: {feedback_id}")
         
@@ -300,44 +320,40 @@ async def submit_mapping_feedback(
         }
         
     except Exception as e:
-        session.rollback()
+        await db.rollback()
         logger.error(f"Error submitting feedback: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        session.close()
 
 
 # ==================== Admin Mapping Governance Routes ====================
 
+MAPPING_PROPOSAL_INSERT_QUERY = text("""
+    INSERT INTO mapping_proposals
+    (id, ayush_term, current_icd11, proposed_icd11, evidence, reason,
+     status, proposed_by, created_at)
+    VALUES
+    (:id, :ayush_term, :current_icd11, :proposed_icd11, :evidence, :reason,
+     :status, :proposed_by, :created_at)
+""")
+
+
 @router.post("/propose-update")
 @audit_create(resource="mapping_proposal", extract_id=lambda r: r.get('proposal_id'))
 async def propose_mapping_update(
     request: Request,
     data: ProposeMappingUpdateRequest,
-    actor: ActorContext = Depends(require_role(Roles.ADMIN))
+    actor: ActorContext = Depends(require_role(Roles.ADMIN)),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Propose mapping update (Admin only)
     
     Creates proposal for review - does NOT modify mapping
     """
-    session = SessionLocal()
-    
     try:
-        import json
-        
         proposal_id = str(uuid.uuid4())
         
-        insert_query = text("""
-            INSERT INTO mapping_proposals
-            (id, ayush_term, current_icd11, proposed_icd11, evidence, reason,
-             status, proposed_by, created_at)
-            VALUES
-            (:id, :ayush_term, :current_icd11, :proposed_icd11, :evidence, :reason,
-             :status, :proposed_by, :created_at)
-        """)
-        
-        session.execute(insert_query, {
+        await db.execute(MAPPING_PROPOSAL_INSERT_QUERY, {
             "id": proposal_id,
             "ayush_term": data.ayush_term,
             "current_icd11": data.current_icd11,
@@ -349,7 +365,7 @@ async def propose_mapping_update(
             "created_at": datetime.utcnow()
         })
         
-        session.commit()
+        await db.commit()
         
         logger.info(f"Mapping proposal created: {proposal_id}")
         
@@ -360,101 +376,72 @@ async def propose_mapping_update(
         }
         
     except Exception as e:
-        session.rollback()
+        await db.rollback()
         logger.error(f"Error creating proposal: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        session.close()
+
+
+# Maintained by triggers on mapping_feedback (migration 013), so the top
+# corrections are read off idx_feedback_summary_count without a GROUP BY.
+# A zero average is reported as null, as the route always has.
+FEEDBACK_SUMMARY_QUERY = text("""
+    SELECT ayush_term, suggested_icd11, clinician_icd11,
+           correction_count,
+           NULLIF(confidence_sum / NULLIF(confidence_count, 0), 0) as avg_confidence
+    FROM mapping_feedback_summary
+    ORDER BY correction_count DESC
+    LIMIT :limit
+""")
 
 
 @router.get("/feedback/summary")
 async def get_feedback_summary(
     limit: int = 50,
-    actor: ActorContext = Depends(require_role(Roles.ADMIN))
+    actor: ActorContext = Depends(require_role(Roles.ADMIN)),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get mapping feedback summary (Admin only)
     
     Shows most common corrections for mapping improvement
     """
-    session = SessionLocal()
+    results = (await db.execute(FEEDBACK_SUMMARY_QUERY, {"limit": limit})).mappings().all()
     
-    try:
-        query = text("""
-            SELECT ayush_term, suggested_icd11, clinician_icd11, 
-                   COUNT(*) as count,
-                   AVG(confidence_score) as avg_confidence
-            FROM mapping_feedback
-            GROUP BY ayush_term, suggested_icd11, clinician_icd11
-            ORDER BY count DESC
-            LIMIT :limit
-        """)
-        
-        results = session.execute(query, {"limit": limit}).fetchall()
-        
-        feedback_summary = []
-        for row in results:
-            feedback_summary.append({
-                "ayush_term": row[0],
-                "suggested_icd11": row[1],
-                "clinician_icd11": row[2],
-                "correction_count": row[3],
-                "avg_confidence": float(row[4]) if row[4] else None
-            })
-        
-        return {
-            "feedback_summary": feedback_summary,
-            "total_items": len(feedback_summary)
-        }
-        
-    finally:
-        session.close()
+    feedback_summary = [dict(row) for row in results]
+    
+    return {
+        "feedback_summary": feedback_summary,
+        "total_items": len(feedback_summary)
+    }
+
+
+# One statement for both call shapes; a NULL status lists every proposal
+MAPPING_PROPOSALS_QUERY = text("""
+    SELECT id AS proposal_id, ayush_term, current_icd11, proposed_icd11,
+           reason, status, created_at
+    FROM mapping_proposals
+    WHERE (:status IS NULL OR status = :status)
+    ORDER BY created_at DESC
+    LIMIT 100
+""")
 
 
 @router.get("/proposals")
 async def get_mapping_proposals(
     status: Optional[str] = None,
-    actor: ActorContext = Depends(require_role(Roles.ADMIN))
+    actor: ActorContext = Depends(require_role(Roles.ADMIN)),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get mapping proposals (Admin only)
     """
-    session = SessionLocal()
+    results = (await db.execute(
+        MAPPING_PROPOSALS_QUERY, {"status": status or None}
+    )).mappings().all()
     
-    try:
-        if status:
-            query = text("""
-                SELECT id, ayush_term, current_icd11, proposed_icd11, reason, status, created_at
-                FROM mapping_proposals
-                WHERE status = :status
-                ORDER BY created_at DESC
-            """)
-            results = session.execute(query, {"status": status}).fetchall()
-        else:
-            query = text("""
-                SELECT id, ayush_term, current_icd11, proposed_icd11, reason, status, created_at
-                FROM mapping_proposals
-                ORDER BY created_at DESC
-                LIMIT 100
-            """)
-            results = session.execute(query).fetchall()
-        
-        proposals = []
-        for row in results:
-            proposals.append({
-                "proposal_id": row[0],
-                "ayush_term": row[1],
-                "current_icd11": row[2],
-                "proposed_icd11": row[3],
-                "reason": row[4],
-                "status": row[5],
-                "created_at": row[6].isoformat() if row[6] else None
-            })
-        
-        return {
-            "proposals": proposals,
-            "count": len(proposals)
-        }
-        
-    finally:
-        session.close()
+    proposals = [dict(row) for row in results]
+    
+    return {
+        "proposals": proposals,
+        "count": len(proposals)
+    }
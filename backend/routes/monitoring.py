@@ -5,8 +5,16 @@ Provides health status and metrics endpoints
 
 from fastapi import APIRouter, Response
 from backend.services.monitoring_service import get_monitoring_service
+from backend.utils.json_response import ORJSONResponse
+from backend.utils.ttl_cache import TTLCache
 
-router = APIRouter(prefix="/api", tags=["monitoring"])
+router = APIRouter(prefix="/api", tags=["monitoring"], default_response_class=ORJSONResponse)
+
+# Rendered /metrics payload, shared by scrapes within the TTL
+METRICS_CACHE_TTL_SECONDS = 1.0
+_metrics_cache = TTLCache(maxsize=1, ttl=METRICS_CACHE_TTL_SECONDS)
+
+_monitoring_service = get_monitoring_service()
 
 
 @router.get("/health")
@@ -16,8 +24,7 @@ async def health_check():
     
     Returns application health status
     """
-    monitoring_service = get_monitoring_service()
-    return monitoring_service.get_health_status()
+    return _monitoring_service.get_health_status()
 
 
 @router.get("/metrics")
@@ -27,16 +34,18 @@ async def get_metrics():
     
     Returns metrics in Prometheus format
     """
-    monitoring_service = get_monitoring_service()
-    metrics = monitoring_service.get_metrics()
+    payload = _metrics_cache.get("metrics")
     
-    # Format as Prometheus text format
-    lines = []
-    for key, value in metrics.items():
-        lines.append(f"# TYPE {key} gauge")
-        lines.append(f"{key} {value}")
+    if payload is None:
+        metrics = _monitoring_service.get_metrics()
+        
+        # Format as Prometheus text format
+        payload = "\n".join(
+            f"# TYPE {key} gauge\n{key} {value}" for key, value in metrics.items()
+        ).encode("utf-8")
+        _metrics_cache.set("metrics", payload)
     
-    return Response(content="\n".join(lines), media_type="text/plain")
+    return Response(content=payload, media_type="text/plain")
 
 
 @router.get("/ready")
@@ -46,13 +55,12 @@ async def readiness_check():
     
     Returns 200 if app is ready to serve traffic
     """
-    monitoring_service = get_monitoring_service()
-    health = monitoring_service.get_health_status()
+    health = _monitoring_service.get_health_status()
     
     if health["status"] == "healthy":
         return {"ready": True}
     else:
-        return Response(status_code=503, content='{"ready": false}')
+        return ORJSONResponse({"ready": False}, status_code=503)
 
 
 @router.get("/live")
@@ -62,4 +70,4 @@ async def liveness_check():
     
     Returns 200 if app is alive
     """
-    return {"alive": True}
+    return ORJSONResponse({"alive": True})
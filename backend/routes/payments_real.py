@@ -6,23 +6,31 @@ Implements actual payment logic with transaction tracking and revenue updates
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from typing import Optional
+import asyncio
 import uuid
 import os
 import razorpay
 from datetime import datetime
-from sqlalchemy.orm import Session
-from models.database import SessionLocal
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.database import get_async_db
 from backend.middleware.rbac import get_current_user
 from backend.decorators.audit import audit_log
+from backend.utils.http_session import pooled_session
+from backend.utils.json_response import ORJSONResponse
+from backend.utils.razorpay_signature import CheckoutSignatureVerifier
 
-router = APIRouter(prefix="/api/payments", tags=["payments"])
+router = APIRouter(prefix="/api/payments", tags=["payments"], default_response_class=ORJSONResponse)
 
 # Razorpay Configuration
 RAZORPAY_KEY_ID = os.getenv("RAZORPAY_KEY_ID", "rzp_test_your_key_id")
 RAZORPAY_KEY_SECRET = os.getenv("RAZORPAY_KEY_SECRET", "your_secret_key")
 
-# Initialize Razorpay client
-razorpay_client = razorpay.Client(auth=(RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET))
+# Initialize Razorpay client (one keep-alive pool shared by worker threads)
+razorpay_client = razorpay.Client(session=pooled_session(), auth=(RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET))
+
+_signature_verifier = CheckoutSignatureVerifier(RAZORPAY_KEY_SECRET)
+
 
 class CreatePaymentRequest(BaseModel):
     appointment_id: str
@@ -43,17 +51,81 @@ class PaymentResponse(BaseModel):
     key_id: str
     success: bool
 
+
+# Statements are module-level so SQLAlchemy compiles each once and reuses it
+CREATE_PAYMENT_INTENT_QUERY = text("""
+    INSERT INTO payment_intents 
+    (id, user_id, appointment_id, amount, currency, razorpay_order_id, status, created_at)
+    VALUES (:id, :user_id, :appointment_id, :amount, :currency, :razorpay_order_id, 'created', :created_at)
+""")
+
+# Completes the intent and returns what the ledger writes need (amount,
+# patient, appointment's doctor) in the same round-trip; a scalar subquery
+# in RETURNING works on both SQLite 3.35+ and PostgreSQL
+COMPLETE_PAYMENT_INTENT_QUERY = text("""
+    UPDATE payment_intents 
+    SET razorpay_payment_id = :razorpay_payment_id,
+        status = 'completed',
+        verified_at = :verified_at
+    WHERE razorpay_order_id = :razorpay_order_id
+    RETURNING amount, user_id,
+              (SELECT staff_id FROM appointments WHERE id = :appointment_id) AS doctor_id
+""")
+
+INSERT_TRANSACTION_QUERY = text("""
+    INSERT INTO transactions 
+    (id, payment_id, patient_id, doctor_id, amount, type, status, created_at)
+    VALUES (:id, :payment_id, :patient_id, :doctor_id, :amount, 'consultation', 'completed', :created_at)
+""")
+
+UPSERT_DOCTOR_REVENUE_QUERY = text("""
+    INSERT INTO doctor_revenue (doctor_id, total_revenue, last_updated)
+    VALUES (:doctor_id, :amount, :now)
+    ON CONFLICT(doctor_id) DO UPDATE SET
+        total_revenue = total_revenue + :amount,
+        last_updated = :now
+""")
+
+MARK_APPOINTMENT_PAID_QUERY = text("""
+    UPDATE appointments 
+    SET status = 'paid'
+    WHERE id = :appointment_id
+""")
+
+PAYMENT_HISTORY_QUERY = text("""
+    SELECT 
+        pi.id,
+        pi.amount,
+        pi.currency,
+        pi.status,
+        pi.created_at,
+        pi.razorpay_payment_id AS payment_id,
+        a.appointment_date,
+        'Consultation Payment' AS description,
+        'Razorpay' AS method
+    FROM payment_intents pi
+    LEFT JOIN appointments a ON pi.appointment_id = a.id
+    WHERE pi.user_id = :user_id
+    ORDER BY pi.created_at DESC
+""")
+
+DOCTOR_REVENUE_QUERY = text("""
+    SELECT total_revenue, last_updated
+    FROM doctor_revenue
+    WHERE doctor_id = :doctor_id
+""")
+
+
 @router.post("/create-order", response_model=PaymentResponse)
 @audit_log
 async def create_payment_order(
     request: CreatePaymentRequest,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Create a Razorpay payment order
     """
-    db = SessionLocal()
-    
     try:
         # Create Razorpay order
         amount_in_paise = int(request.amount * 100)  # Convert to paise
@@ -69,26 +141,22 @@ async def create_payment_order(
             }
         }
         
-        razorpay_order = razorpay_client.order.create(data=order_data)
+        # Razorpay's SDK is blocking HTTPS: keep it off the event loop
+        razorpay_order = await asyncio.to_thread(razorpay_client.order.create, data=order_data)
         
         # Store payment intent in database
         payment_id = str(uuid.uuid4())
-        db.execute("""
-            INSERT INTO payment_intents 
-            (id, user_id, appointment_id, amount, currency, razorpay_order_id, status, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            payment_id,
-            current_user['id'],
-            request.appointment_id,
-            request.amount,
-            request.currency,
-            razorpay_order['id'],
-            'created',
-            datetime.utcnow()
-        ))
+        await db.execute(CREATE_PAYMENT_INTENT_QUERY, {
+            "id": payment_id,
+            "user_id": current_user['id'],
+            "appointment_id": request.appointment_id,
+            "amount": request.amount,
+            "currency": request.currency,
+            "razorpay_order_id": razorpay_order['id'],
+            "created_at": datetime.utcnow()
+        })
         
-        db.commit()
+        await db.commit()
         
         return PaymentResponse(
             order_id=razorpay_order['id'],
@@ -99,110 +167,67 @@ async def create_payment_order(
         )
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to create payment order: {str(e)}")
-    finally:
-        db.close()
 
 @router.post("/verify-payment")
 @audit_log
 async def verify_payment(
     request: VerifyPaymentRequest,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Verify Razorpay payment and update database
     """
-    db = SessionLocal()
-    
     try:
         # Verify payment signature
-        params_dict = {
-            'razorpay_order_id': request.razorpay_order_id,
-            'razorpay_payment_id': request.razorpay_payment_id,
-            'razorpay_signature': request.razorpay_signature
-        }
-        
-        try:
-            razorpay_client.utility.verify_payment_signature(params_dict)
-            payment_verified = True
-        except:
-            payment_verified = False
+        if not _signature_verifier.is_valid(
+            request.razorpay_order_id,
+            request.razorpay_payment_id,
+            request.razorpay_signature
+        ):
             raise HTTPException(status_code=400, detail="Payment verification failed")
         
         # Get payment details
-        payment = razorpay_client.payment.fetch(request.razorpay_payment_id)
+        payment = await asyncio.to_thread(razorpay_client.payment.fetch, request.razorpay_payment_id)
         
-        # Update payment intent
-        db.execute("""
-            UPDATE payment_intents 
-            SET razorpay_payment_id = ?,
-                status = 'completed',
-                verified_at = ?
-            WHERE razorpay_order_id = ?
-        """, (
-            request.razorpay_payment_id,
-            datetime.utcnow(),
-            request.razorpay_order_id
-        ))
+        now = datetime.utcnow()
         
-        # Get payment amount
-        result = db.execute("""
-            SELECT amount, user_id FROM payment_intents 
-            WHERE razorpay_order_id = ?
-        """, (request.razorpay_order_id,)).fetchone()
+        # Update payment intent, getting amount, patient and doctor back
+        result = (await db.execute(COMPLETE_PAYMENT_INTENT_QUERY, {
+            "razorpay_payment_id": request.razorpay_payment_id,
+            "verified_at": now,
+            "razorpay_order_id": request.razorpay_order_id,
+            "appointment_id": request.appointment_id
+        })).first()
         
         if result:
-            amount, patient_id = result
-            
-            # Get doctor ID from appointment
-            doctor_result = db.execute("""
-                SELECT staff_id FROM appointments WHERE id = ?
-            """, (request.appointment_id,)).fetchone()
+            amount, patient_id, doctor_id = result
             
-            if doctor_result:
-                doctor_id = doctor_result[0]
-                
+            if doctor_id is not None:
                 # Create transaction record
                 transaction_id = str(uuid.uuid4())
-                db.execute("""
-                    INSERT INTO transactions 
-                    (id, payment_id, patient_id, doctor_id, amount, type, status, created_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    transaction_id,
-                    request.razorpay_payment_id,
-                    patient_id,
-                    doctor_id,
-                    amount,
-                    'consultation',
-                    'completed',
-                    datetime.utcnow()
-                ))
+                await db.execute(INSERT_TRANSACTION_QUERY, {
+                    "id": transaction_id,
+                    "payment_id": request.razorpay_payment_id,
+                    "patient_id": patient_id,
+                    "doctor_id": doctor_id,
+                    "amount": amount,
+                    "created_at": now
+                })
                 
                 # Update doctor revenue
-                db.execute("""
-                    INSERT INTO doctor_revenue (doctor_id, total_revenue, last_updated)
-                    VALUES (?, ?, ?)
-                    ON CONFLICT(doctor_id) DO UPDATE SET
-                        total_revenue = total_revenue + ?,
-                        last_updated = ?
-                """, (
-                    doctor_id,
-                    amount,
-                    datetime.utcnow(),
-                    amount,
-                    datetime.utcnow()
-                ))
+                await db.execute(UPSERT_DOCTOR_REVENUE_QUERY, {
+                    "doctor_id": doctor_id,
+                    "amount": amount,
+                    "now": now
+                })
                 
                 # Update appointment status to paid
-                db.execute("""
-                    UPDATE appointments 
-                    SET status = 'paid'
-                    WHERE id = ?
-                """, (request.appointment_id,))
+                await db.execute(MARK_APPOINTMENT_PAID_QUERY, {"appointment_id": request.appointment_id})
         
-        db.commit()
+        await db.commit()
         
         return {
             "success": True,
@@ -212,64 +237,32 @@ async def verify_payment(
         }
         
     except HTTPException:
-        db.rollback()
+        await db.rollback()
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to verify payment: {str(e)}")
-    finally:
-        db.close()
 
 @router.get("/history")
 @audit_log
 async def get_payment_history(
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get payment history for current user
     """
-    db = SessionLocal()
+    # Get payments for this user
+    results = (await db.execute(PAYMENT_HISTORY_QUERY, {"user_id": current_user['id']})).mappings().all()
     
-    try:
-        # Get payments for this user
-        results = db.execute("""
-            SELECT 
-                pi.id,
-                pi.amount,
-                pi.currency,
-                pi.status,
-                pi.created_at,
-                pi.razorpay_payment_id,
-                a.appointment_date
-            FROM payment_intents pi
-            LEFT JOIN appointments a ON pi.appointment_id = a.id
-            WHERE pi.user_id = ?
-            ORDER BY pi.created_at DESC
-        """, (current_user['id'],)).fetchall()
-        
-        payments = []
-        for row in results:
-            payments.append({
-                "id": row[0],
-                "amount": row[1],
-                "currency": row[2],
-                "status": row[3],
-                "created_at": row[4],
-                "payment_id": row[5],
-                "appointment_date": row[6],
-                "description": "Consultation Payment",
-                "method": "Razorpay"
-            })
-        
-        return {"payments": payments}
-        
-    finally:
-        db.close()
+    # Column aliases match the response keys
+    return {"payments": [dict(row) for row in results]}
 
 @router.get("/revenue")
 @audit_log
 async def get_doctor_revenue(
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get revenue statistics for doctor
@@ -277,25 +270,15 @@ async def get_doctor_revenue(
     if current_user['role'] not in ['doctor', 'admin']:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    db = SessionLocal()
+    result = (await db.execute(DOCTOR_REVENUE_QUERY, {"doctor_id": current_user['id']})).fetchone()
     
-    try:
-        result = db.execute("""
-            SELECT total_revenue, last_updated
-            FROM doctor_revenue
-            WHERE doctor_id = ?
-        """, (current_user['id'],)).fetchone()
-        
-        if result:
-            return {
-                "total_revenue": result[0],
-                "last_updated": result[1]
-            }
-        else:
-            return {
-                "total_revenue": 0.0,
-                "last_updated": None
-            }
-        
-    finally:
-        db.close()
+    if result:
+        return {
+            "total_revenue": result[0],
+            "last_updated": result[1]
+        }
+    else:
+        return {
+            "total_revenue": 0.0,
+            "last_updated": None
+        }
@@ -3,13 +3,17 @@ Teleconsult & Payment Routes
 Handles teleconsult session management and payment processing
 """
 
-from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi import APIRouter, HTTPException, Depends, Request, Header
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
+import asyncio
 import logging
+import orjson
 
 from backend.services.teleconsult_service import get_teleconsult_service
 from backend.services.payment_service import get_payment_service
+from backend.services.session_queue import get_session_queue
+from backend.services.idempotency import get_idempotency_store, idempotency_lookup_key, IdempotencyKeyInUse
 from backend.middleware.rbac import require_auth, require_role, ActorContext, Roles
 from backend.decorators.audit import audit_create, audit_action
 
@@ -17,6 +21,12 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api", tags=["teleconsult", "payments"])
 
+# Built once at import, before any request can race the lazy getters
+_teleconsult_service = get_teleconsult_service()
+_session_queue = get_session_queue()
+_payment_service = get_payment_service()
+_idempotency_store = get_idempotency_store()
+
 
 # ==================== Teleconsult Models ====================
 
@@ -66,9 +76,10 @@ async def create_teleconsult_room(
     Returns room URL and JWT token for Jitsi
     """
     try:
-        teleconsult_service = get_teleconsult_service()
-        
-        result = teleconsult_service.create_room(
+        # Services use sync sessions (and Razorpay's blocking SDK): run them
+        # in worker threads so the event loop keeps serving other requests
+        result = await asyncio.to_thread(
+            _teleconsult_service.create_room,
             appointment_id=data.appointment_id,
             host_user_id=actor.actor_id,
             host_name=data.host_name
@@ -92,9 +103,8 @@ async def join_teleconsult_room(
     Returns join URL with JWT token
     """
     try:
-        teleconsult_service = get_teleconsult_service()
-        
-        result = teleconsult_service.get_participant_token(
+        result = await asyncio.to_thread(
+            _teleconsult_service.get_participant_token,
             appointment_id=data.appointment_id,
             user_id=actor.actor_id,
             user_name=data.user_name
@@ -120,9 +130,8 @@ async def start_teleconsult_session(
     Marks session as active and records start time
     """
     try:
-        teleconsult_service = get_teleconsult_service()
-        
-        result = teleconsult_service.start_session(data.appointment_id)
+        # Batched with other doctors' transitions; returns once committed
+        result = await _session_queue.submit("start", data.appointment_id)
         
         return result
         
@@ -144,9 +153,7 @@ async def end_teleconsult_session(
     Records end time and calculates duration
     """
     try:
-        teleconsult_service = get_teleconsult_service()
-        
-        result = teleconsult_service.end_session(data.appointment_id)
+        result = await _session_queue.submit("end", data.appointment_id)
         
         return result
         
@@ -157,22 +164,60 @@ async def end_teleconsult_session(
 
 # ==================== Payment Routes ====================
 
+async def _run_idempotent(
+    idempotency_key: Optional[str],
+    actor: ActorContext,
+    scope: str,
+    body: Dict[str, Any],
+    func,
+    **kwargs
+) -> Dict[str, Any]:
+    """
+    Run a blocking service call once per Idempotency-Key
+    
+    The key is claimed before the call, so a concurrent retry gets a 409
+    instead of repeating it, and a later retry gets the stored response.
+    A failed call releases the key so the client can retry it.
+    """
+    if not idempotency_key:
+        return await asyncio.to_thread(func, **kwargs)
+    
+    lookup_key = idempotency_lookup_key(idempotency_key, actor.actor_id, scope, body)
+    cached = await asyncio.to_thread(_idempotency_store.claim, lookup_key)
+    if cached is not None:
+        return cached
+    
+    try:
+        result = await asyncio.to_thread(func, **kwargs)
+    except Exception:
+        await asyncio.to_thread(_idempotency_store.release, lookup_key)
+        raise
+    
+    await asyncio.to_thread(_idempotency_store.complete, lookup_key, result)
+    return result
+
+
 @router.post("/payments/create")
 @audit_create(resource="payment_intent", extract_id=lambda r: r.get('payment_intent_id'))
 async def create_payment(
     request: Request,
     data: CreatePaymentRequest,
-    actor: ActorContext = Depends(require_auth)
+    actor: ActorContext = Depends(require_auth),
+    idempotency_key: Optional[str] = Header(None)
 ):
     """
     Create payment intent for appointment
     
-    Returns Razorpay order details for checkout
+    Returns Razorpay order details for checkout. Retries sent with the same
+    Idempotency-Key and body get the original response back.
     """
     try:
-        payment_service = get_payment_service()
-        
-        result = payment_service.create_payment_intent(
+        return await _run_idempotent(
+            idempotency_key,
+            actor,
+            "payments/create",
+            data.model_dump(),
+            _payment_service.create_payment_intent,
             appointment_id=data.appointment_id,
             patient_id=data.patient_id,
             amount=data.amount,
@@ -180,8 +225,8 @@ async def create_payment(
             description=data.description
         )
         
-        return result
-        
+    except IdempotencyKeyInUse:
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is in progress")
     except Exception as e:
         logger.error(f"Error creating payment: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -192,25 +237,30 @@ async def create_payment(
 async def verify_payment(
     request: Request,
     data: VerifyPaymentRequest,
-    actor: ActorContext = Depends(require_auth)
+    actor: ActorContext = Depends(require_auth),
+    idempotency_key: Optional[str] = Header(None)
 ):
     """
     Verify payment after Razorpay checkout
     
-    Validates payment signature and updates status
+    Validates payment signature and updates status. Retries sent with the
+    same Idempotency-Key and body get the original response back.
     """
     try:
-        payment_service = get_payment_service()
-        
-        result = payment_service.verify_payment(
+        return await _run_idempotent(
+            idempotency_key,
+            actor,
+            "payments/verify",
+            data.model_dump(),
+            _payment_service.verify_payment,
             payment_intent_id=data.payment_intent_id,
             provider_payment_id=data.razorpay_payment_id,
             provider_order_id=data.razorpay_order_id,
             signature=data.razorpay_signature
         )
         
-        return result
-        
+    except IdempotencyKeyInUse:
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is in progress")
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -227,13 +277,12 @@ async def payment_webhook(request: Request):
     """
     try:
         # Get webhook payload
-        payload = await request.json()
+        payload = orjson.loads(await request.body())
         signature = request.headers.get("X-Razorpay-Signature", "")
         event_type = payload.get("event", "")
         
-        payment_service = get_payment_service()
-        
-        result = payment_service.handle_webhook(
+        result = await asyncio.to_thread(
+            _payment_service.handle_webhook,
             event_type=event_type,
             payload=payload,
             signature=signature
@@ -257,9 +306,7 @@ async def get_payment_status(
     Returns current payment status and details
     """
     try:
-        payment_service = get_payment_service()
-        
-        result = payment_service.get_payment_status(payment_intent_id)
+        result = await asyncio.to_thread(_payment_service.get_payment_status, payment_intent_id)
         
         return result
         
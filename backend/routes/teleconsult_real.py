@@ -7,13 +7,17 @@ from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from typing import Optional
 import uuid
-import jwt
 import os
-from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-from models.database import SessionLocal
-from backend.middleware.rbac import get_current_user
+import time
+import secrets
+from datetime import datetime
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.database import get_async_db
+from backend.middleware.rbac import require_auth, ActorContext
 from backend.decorators.audit import audit_log
+from backend.utils.jwt_signer import HS256Signer
+from backend.utils.ttl_cache import TTLCache
 
 router = APIRouter(prefix="/api/teleconsult", tags=["teleconsult"])
 
@@ -21,6 +25,27 @@ router = APIRouter(prefix="/api/teleconsult", tags=["teleconsult"])
 JITSI_APP_ID = os.getenv("JITSI_APP_ID", "vpaas-magic-cookie-your-app-id")
 JITSI_API_KEY = os.getenv("JITSI_API_KEY", "your-api-key")
 JITSI_DOMAIN = "8x8.vc"  # or "meet.jit.si" for free tier
+JITSI_TOKEN_TTL_SECONDS = 2 * 60 * 60
+
+# Keyed once; tokens match jwt.encode(payload, JITSI_API_KEY, algorithm="HS256")
+_jitsi_signer = HS256Signer(JITSI_API_KEY)
+
+# Claims shared by every Jitsi token; per-call fields are merged in
+_JITSI_STATIC_CLAIMS = {
+    "aud": "jitsi",
+    "iss": JITSI_APP_ID,
+    "sub": JITSI_DOMAIN,
+}
+_JITSI_FEATURES = {
+    "livestreaming": "false",
+    "recording": "false",
+    "transcription": "false"
+}
+
+# Room info polled by call pages: appointment_id -> response dict. Dropped by
+# start/end-call here; the TTL bounds staleness across worker processes
+ROOM_INFO_CACHE_TTL_SECONDS = 60
+_room_info_cache = TTLCache(maxsize=10000, ttl=ROOM_INFO_CACHE_TTL_SECONDS)
 
 class StartCallRequest(BaseModel):
     appointment_id: str
@@ -36,76 +61,124 @@ class CallResponse(BaseModel):
     jwt_token: str
     meeting_started: bool
 
-def generate_jitsi_jwt(room_name: str, user_name: str, is_moderator: bool = False) -> str:
+# Statements are module-level so SQLAlchemy compiles each once and reuses it
+
+# Only booked appointments can start a call; a second start (or a start after
+# the call ended) matches no row instead of overwriting the live room
+START_CALL_QUERY = text("""
+    UPDATE appointments 
+    SET teleconsult_enabled = 1,
+        room_token = :room_token,
+        room_url = :room_url,
+        session_started_at = :started_at,
+        status = 'in-progress'
+    WHERE id = :appointment_id
+      AND COALESCE(status, 'scheduled') IN ('scheduled', 'confirmed')
+    RETURNING id
+""")
+
+APPOINTMENT_STATUS_QUERY = text("""
+    SELECT status FROM appointments WHERE id = :appointment_id
+""")
+
+# Duration is computed from the stored (naive UTC) start time in the same
+# statement; whole minutes, 0 if the call was never started
+END_CALL_QUERY = text("""
+    UPDATE appointments 
+    SET session_ended_at = :ended_at,
+        duration_minutes = COALESCE(
+            CAST((julianday(:ended_at) - julianday(session_started_at)) * 1440 AS INTEGER), 0
+        ),
+        status = 'completed'
+    WHERE id = :appointment_id
+    RETURNING duration_minutes
+""")
+
+ROOM_INFO_QUERY = text("""
+    SELECT room_token, room_url, session_started_at, teleconsult_enabled
+    FROM appointments 
+    WHERE id = :appointment_id
+""")
+
+def generate_jitsi_jwt(room_name: str, user_name: str, is_moderator: bool = False,
+                       user_id: Optional[str] = None) -> str:
     """
     Generate JWT token for Jitsi Meet authentication
+    
+    user_id is the authenticated caller's id; a random one is used if omitted
     """
-    now = datetime.utcnow()
+    now = int(time.time())
     
     payload = {
-        "aud": "jitsi",
-        "iss": JITSI_APP_ID,
-        "sub": JITSI_DOMAIN,
+        **_JITSI_STATIC_CLAIMS,
         "room": room_name,
-        "exp": int((now + timedelta(hours=2)).timestamp()),
-        "nbf": int(now.timestamp()),
+        "exp": now + JITSI_TOKEN_TTL_SECONDS,
+        "nbf": now,
         "context": {
             "user": {
                 "name": user_name,
                 "moderator": str(is_moderator).lower(),
-                "id": str(uuid.uuid4())
+                "id": user_id or uuid.uuid4().hex
             },
-            "features": {
-                "livestreaming": "false",
-                "recording": "false",
-                "transcription": "false"
-            }
+            "features": _JITSI_FEATURES
         }
     }
     
     # For production, use your actual Jitsi API key
     # For development, we'll use a simple token
-    token = jwt.encode(payload, JITSI_API_KEY, algorithm="HS256")
-    return token
+    return _jitsi_signer.encode(payload)
 
 @router.post("/start-call", response_model=CallResponse)
 @audit_log
 async def start_video_call(
     request: StartCallRequest,
-    current_user: dict = Depends(get_current_user)
+    current_user: ActorContext = Depends(require_auth),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Start a video call for an appointment
     Doctor initiates the call and gets moderator privileges
     """
-    db = SessionLocal()
-    
     try:
+        # Token and URL are built before the session checks out a connection,
+        # so the write transaction spans only the UPDATE and COMMIT
+        
         # Generate unique room ID
-        room_id = f"caresync-{request.appointment_id}-{uuid.uuid4().hex[:8]}"
+        room_id = f"caresync-{request.appointment_id}-{secrets.token_hex(4)}"
         
         # Generate Jitsi JWT token (doctor is moderator)
         jwt_token = generate_jitsi_jwt(
             room_name=room_id,
             user_name=request.participant_name,
-            is_moderator=True
+            is_moderator=True,
+            user_id=current_user.actor_id
         )
         
         # Create room URL
         room_url = f"https://{JITSI_DOMAIN}/{room_id}"
         
-        # Update appointment with room details
-        db.execute("""
-            UPDATE appointments 
-            SET teleconsult_enabled = 1,
-                room_token = ?,
-                room_url = ?,
-                session_started_at = ?,
-                status = 'in-progress'
-            WHERE id = ?
-        """, (jwt_token, room_url, datetime.utcnow(), request.appointment_id))
+        # Update appointment with room details; RETURNING confirms it was startable
+        updated = (await db.execute(START_CALL_QUERY, {
+            "room_token": jwt_token,
+            "room_url": room_url,
+            "started_at": datetime.utcnow(),
+            "appointment_id": request.appointment_id
+        })).fetchone()
         
-        db.commit()
+        if not updated:
+            # Failure path only: tell a missing appointment from a wrong state
+            status = (await db.execute(
+                APPOINTMENT_STATUS_QUERY, {"appointment_id": request.appointment_id}
+            )).fetchone()
+            if not status:
+                raise HTTPException(status_code=404, detail="Appointment not found")
+            raise HTTPException(
+                status_code=409,
+                detail=f"Appointment not in startable state ({status[0]})"
+            )
+        
+        await db.commit()
+        _room_info_cache.pop(request.appointment_id)
         
         return CallResponse(
             room_id=room_id,
@@ -114,30 +187,30 @@ async def start_video_call(
             meeting_started=True
         )
         
+    except HTTPException:
+        await db.rollback()
+        raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to start call: {str(e)}")
-    finally:
-        db.close()
 
 @router.post("/join-call", response_model=CallResponse)
 @audit_log
 async def join_video_call(
     request: JoinCallRequest,
-    current_user: dict = Depends(get_current_user)
+    current_user: ActorContext = Depends(require_auth)
 ):
     """
     Join an existing video call
     Patient joins as participant (not moderator)
     """
-    db = SessionLocal()
-    
     try:
         # Generate JWT token for participant
         jwt_token = generate_jitsi_jwt(
             room_name=request.room_id,
             user_name=request.participant_name,
-            is_moderator=False
+            is_moderator=False,
+            user_id=current_user.actor_id
         )
         
         # Get room URL
@@ -152,42 +225,31 @@ async def join_video_call(
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to join call: {str(e)}")
-    finally:
-        db.close()
 
 @router.post("/end-call/{appointment_id}")
 @audit_log
 async def end_video_call(
     appointment_id: str,
-    current_user: dict = Depends(get_current_user)
+    current_user: ActorContext = Depends(require_auth),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     End a video call and update appointment status
     """
-    db = SessionLocal()
-    
     try:
-        # Calculate duration
-        result = db.execute("""
-            SELECT session_started_at FROM appointments WHERE id = ?
-        """, (appointment_id,)).fetchone()
-        
-        if result and result[0]:
-            started_at = datetime.fromisoformat(result[0])
-            duration = int((datetime.utcnow() - started_at).total_seconds() / 60)
-        else:
-            duration = 0
-        
-        # Update appointment
-        db.execute("""
-            UPDATE appointments 
-            SET session_ended_at = ?,
-                duration_minutes = ?,
-                status = 'completed'
-            WHERE id = ?
-        """, (datetime.utcnow(), duration, appointment_id))
-        
-        db.commit()
+        # Update appointment; RETURNING gives the computed duration
+        ended = (await db.execute(END_CALL_QUERY, {
+            "ended_at": datetime.utcnow(),
+            "appointment_id": appointment_id
+        })).fetchone()
+        
+        if not ended:
+            raise HTTPException(status_code=404, detail="Appointment not found")
+        
+        duration = ended[0]
+        
+        await db.commit()
+        _room_info_cache.pop(appointment_id)
         
         return {
             "success": True,
@@ -195,38 +257,36 @@ async def end_video_call(
             "message": "Call ended successfully"
         }
         
+    except HTTPException:
+        await db.rollback()
+        raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to end call: {str(e)}")
-    finally:
-        db.close()
 
 @router.get("/appointment/{appointment_id}/room-info")
 async def get_room_info(
     appointment_id: str,
-    current_user: dict = Depends(get_current_user)
+    current_user: ActorContext = Depends(require_auth),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get room information for an appointment
     """
-    db = SessionLocal()
+    room_info = _room_info_cache.get(appointment_id)
+    if room_info is not None:
+        return room_info
     
-    try:
-        result = db.execute("""
-            SELECT room_token, room_url, session_started_at, teleconsult_enabled
-            FROM appointments 
-            WHERE id = ?
-        """, (appointment_id,)).fetchone()
-        
-        if not result:
-            raise HTTPException(status_code=404, detail="Appointment not found")
-        
-        return {
-            "room_token": result[0],
-            "room_url": result[1],
-            "session_started_at": result[2],
-            "teleconsult_enabled": bool(result[3])
-        }
-        
-    finally:
-        db.close()
+    result = (await db.execute(ROOM_INFO_QUERY, {"appointment_id": appointment_id})).fetchone()
+    
+    if not result:
+        raise HTTPException(status_code=404, detail="Appointment not found")
+    
+    room_info = {
+        "room_token": result[0],
+        "room_url": result[1],
+        "session_started_at": result[2],
+        "teleconsult_enabled": bool(result[3])
+    }
+    _room_info_cache.set(appointment_id, room_info)
+    return room_info
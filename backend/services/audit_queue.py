@@ -0,0 +1,138 @@
+"""
+Audit Queue Service
+Buffers audit records in memory and writes them to audit_logs in batches
+"""
+
+import asyncio
+import logging
+from typing import Optional, Dict, Any, List
+from sqlalchemy import text
+from models.database import engine
+
+logger = logging.getLogger(__name__)
+
+# Queue configuration
+AUDIT_QUEUE_MAXSIZE = 10000
+AUDIT_BATCH_SIZE = 500
+AUDIT_FLUSH_INTERVAL = 0.05  # seconds to wait for a batch to fill
+
+AUDIT_INSERT_QUERY = text("""
+    INSERT INTO audit_logs
+    (user_id, actor_type, action, resource, resource_id, payload,
+     ip_address, user_agent, status, error_message, timestamp)
+    VALUES
+    (:user_id, :actor_type, :action, :resource, :resource_id, :payload,
+     :ip_address, :user_agent, :status, :error_message, :timestamp)
+""")
+
+
+class AuditQueue:
+    """Bounded in-memory queue drained by a background batch writer"""
+
+    def __init__(self, maxsize: int = AUDIT_QUEUE_MAXSIZE):
+        self.maxsize = maxsize
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.dropped_count = 0
+
+    def is_running(self) -> bool:
+        """Check whether the background writer is draining the queue"""
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Start the background writer on the running event loop"""
+        if self.is_running():
+            return
+
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._task = asyncio.create_task(self._drain())
+        logger.info("Audit queue writer started")
+
+    async def stop(self):
+        """Stop the background writer and flush pending records"""
+        if not self.is_running():
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        pending = []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        if pending:
+            self._write_batch(pending)
+
+        logger.info("Audit queue writer stopped")
+
+    def enqueue(self, record: Dict[str, Any]) -> bool:
+        """
+        Queue an audit record without blocking the caller
+
+        Args:
+            record: Bound parameters for AUDIT_INSERT_QUERY
+
+        Returns:
+            True if the record was accepted, False if it was dropped
+        """
+        if not self.is_running():
+            # No writer (scripts, tests): write inline
+            self._write_batch([record])
+            return True
+
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except asyncio.QueueFull:
+            self.dropped_count += 1
+            logger.warning("Audit queue full, dropping audit record")
+            return False
+
+    async def _drain(self):
+        """Collect records into batches and write them"""
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + AUDIT_FLUSH_INTERVAL
+
+            while len(batch) < AUDIT_BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+                except asyncio.CancelledError:
+                    # Shutting down: keep what was already collected
+                    self._write_batch(batch)
+                    raise
+
+            # Write off the event loop so requests keep enqueuing meanwhile
+            await asyncio.to_thread(self._write_batch, batch)
+
+    def _write_batch(self, batch: List[Dict[str, Any]]):
+        """Insert a batch of audit records in one executemany"""
+        try:
+            # Pooled connection, single transaction: no Session construction
+            with engine.begin() as conn:
+                conn.execute(AUDIT_INSERT_QUERY, batch)
+        except Exception as e:
+            logger.error(f"Audit logging error: {str(e)}")
+            # Don't fail the request if audit logging fails
+
+
+# Global audit queue instance
+_audit_queue: Optional[AuditQueue] = None
+
+
+def get_audit_queue() -> AuditQueue:
+    """Get global audit queue instance"""
+    global _audit_queue
+    if _audit_queue is None:
+        _audit_queue = AuditQueue()
+    return _audit_queue
@@ -0,0 +1,160 @@
+"""
+Idempotency Store
+Replays the stored response for retried requests carrying an Idempotency-Key
+"""
+
+import time
+import hashlib
+import logging
+import orjson
+from typing import Optional, Dict, Any
+from sqlalchemy import text
+from models.database import engine
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_TTL_SECONDS = 24 * 60 * 60
+# A claim whose request died without completing frees the key after this
+IDEMPOTENCY_PENDING_TTL_SECONDS = 60
+
+IDEMPOTENCY_LOOKUP_QUERY = text("""
+    SELECT response FROM idempotency_keys
+    WHERE key = :key AND expires_at > :now
+""")
+
+# The primary key decides which of two racing requests does the work
+IDEMPOTENCY_CLAIM_QUERY = text("""
+    INSERT OR IGNORE INTO idempotency_keys (key, response, created_at, expires_at)
+    VALUES (:key, NULL, :created_at, :expires_at)
+""")
+
+IDEMPOTENCY_COMPLETE_QUERY = text("""
+    UPDATE idempotency_keys
+    SET response = :response, expires_at = :expires_at
+    WHERE key = :key
+""")
+
+IDEMPOTENCY_RELEASE_QUERY = text("""
+    DELETE FROM idempotency_keys WHERE key = :key AND response IS NULL
+""")
+
+IDEMPOTENCY_PURGE_QUERY = text("""
+    DELETE FROM idempotency_keys WHERE expires_at <= :now
+""")
+
+
+class IdempotencyKeyInUse(Exception):
+    """Raised when another request holding the same key is still in flight"""
+
+
+def idempotency_lookup_key(idempotency_key: str, user_id: str, scope: str, body: Dict[str, Any]) -> str:
+    """
+    Derive the stored key for a request
+
+    The client key is bound to the caller, the route and the request body, so
+    one user can't replay another's response and a reused key with a
+    different body is treated as a new request.
+
+    Args:
+        idempotency_key: Idempotency-Key header value
+        user_id: Authenticated caller id
+        scope: Route identifier (e.g. 'payments/create')
+        body: Request body
+
+    Returns:
+        128-bit BLAKE2b hex digest
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (idempotency_key, user_id, scope):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    digest.update(orjson.dumps(body, option=orjson.OPT_SORT_KEYS))
+    return digest.hexdigest()
+
+
+class IdempotencyStore:
+    """Responses keyed by idempotency_lookup_key, claimed before the work runs"""
+
+    def __init__(self, ttl: int = IDEMPOTENCY_TTL_SECONDS, pending_ttl: int = IDEMPOTENCY_PENDING_TTL_SECONDS):
+        self.ttl = ttl
+        self.pending_ttl = pending_ttl
+
+    def claim(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Claim a key before doing the work it guards
+
+        Args:
+            key: Lookup key
+
+        Returns:
+            None if the caller now owns the key and should do the work,
+            otherwise the stored response to replay
+
+        Raises:
+            IdempotencyKeyInUse: If the request that claimed the key is still running
+        """
+        now = int(time.time())
+        try:
+            with engine.begin() as conn:
+                conn.execute(IDEMPOTENCY_PURGE_QUERY, {"now": now})
+                claimed = conn.execute(IDEMPOTENCY_CLAIM_QUERY, {
+                    "key": key,
+                    "created_at": now,
+                    "expires_at": now + self.pending_ttl
+                }).rowcount == 1
+                if claimed:
+                    return None
+                response = conn.execute(IDEMPOTENCY_LOOKUP_QUERY, {"key": key, "now": now}).scalar()
+        except Exception as e:
+            # Without the store the request still runs, it just isn't deduplicated
+            logger.error(f"Idempotency claim error: {str(e)}")
+            return None
+
+        if response is None:
+            raise IdempotencyKeyInUse(key)
+        return orjson.loads(response)
+
+    def complete(self, key: str, response: Dict[str, Any]):
+        """
+        Store the response for a claimed key
+
+        Args:
+            key: Lookup key
+            response: JSON-serializable route result
+        """
+        try:
+            with engine.begin() as conn:
+                conn.execute(IDEMPOTENCY_COMPLETE_QUERY, {
+                    "key": key,
+                    "response": orjson.dumps(response).decode(),
+                    "expires_at": int(time.time()) + self.ttl
+                })
+        except Exception as e:
+            # The request itself succeeded; a missing entry only loses replay
+            logger.error(f"Idempotency store error: {str(e)}")
+
+    def release(self, key: str):
+        """
+        Drop a claim whose request failed, so a retry can run it again
+
+        Args:
+            key: Lookup key
+        """
+        try:
+            with engine.begin() as conn:
+                conn.execute(IDEMPOTENCY_RELEASE_QUERY, {"key": key})
+        except Exception as e:
+            # The claim still lapses after pending_ttl
+            logger.error(f"Idempotency release error: {str(e)}")
+
+
+# Global store instance
+_idempotency_store: Optional[IdempotencyStore] = None
+
+
+def get_idempotency_store() -> IdempotencyStore:
+    """Get global idempotency store instance"""
+    global _idempotency_store
+    if _idempotency_store is None:
+        _idempotency_store = IdempotencyStore()
+    return _idempotency_store
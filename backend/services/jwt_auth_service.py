@@ -5,12 +5,17 @@ Handles user registration, login, token generation and validation
 
 import os
 import jwt
+import time
 import bcrypt
 import uuid
-from datetime import datetime, timedelta
+import hashlib
+from datetime import datetime
 from typing import Optional, Dict, Any
+from sqlalchemy import select, update, bindparam
 from sqlalchemy.orm import Session
 from models.database import User, SessionLocal
+from backend.utils.ttl_cache import TTLCache
+from backend.utils.jwt_signer import HS256Signer
 import logging
 
 logger = logging.getLogger(__name__)
@@ -21,6 +26,38 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
+# bcrypt work factor (log2 rounds) for new hashes; stored hashes below it are
+# upgraded on the next successful login
+BCRYPT_COST = int(os.getenv("BCRYPT_COST", "12"))
+
+# Decoded-token cache: token digest -> claims (shared dicts, do not mutate)
+TOKEN_CACHE_TTL_SECONDS = 30
+_token_cache = TTLCache(maxsize=10000, ttl=TOKEN_CACHE_TTL_SECONDS)
+
+
+def token_cache_key(token: str) -> str:
+    """Digest token so raw bearer tokens are not kept as cache keys"""
+    return hashlib.blake2b(token.encode(), digest_size=16).hexdigest()
+
+
+# Core statements built once: login and user lookups read plain rows instead
+# of hydrating User objects (email and id are both indexed, via UNIQUE and PK)
+_USER_COLUMNS = (User.id, User.name, User.email, User.role, User.phone, User.is_active)
+USER_BY_EMAIL_STMT = select(*_USER_COLUMNS, User.password_hash).where(User.email == bindparam("email"))
+USER_BY_ID_STMT = select(*_USER_COLUMNS).where(User.id == bindparam("user_id"))
+PASSWORD_HASH_UPDATE_STMT = (
+    update(User.__table__)
+    .where(User.__table__.c.id == bindparam("user_id"))
+    .values(password_hash=bindparam("new_hash"))
+)
+
+
+# Active-user cache: user id -> user dict (shared dicts, do not mutate).
+# Only active users are cached. Nothing here edits or deactivates users, and
+# the cache is per worker, so the TTL is what bounds staleness
+USER_CACHE_TTL_SECONDS = 60
+_user_cache = TTLCache(maxsize=5000, ttl=USER_CACHE_TTL_SECONDS)
+
 
 class AuthenticationService:
     """JWT-based authentication service"""
@@ -28,6 +65,10 @@ class AuthenticationService:
     def __init__(self):
         self.secret_key = SECRET_KEY
         self.algorithm = ALGORITHM
+        
+        # Keyed once; tokens match jwt.encode(payload, SECRET_KEY, algorithm="HS256")
+        self._signer = HS256Signer(self.secret_key)
+        self.bcrypt_cost = BCRYPT_COST
     
     def hash_password(self, password: str) -> str:
         """
@@ -39,10 +80,25 @@ class AuthenticationService:
         Returns:
             Hashed password
         """
-        salt = bcrypt.gensalt()
+        salt = bcrypt.gensalt(rounds=self.bcrypt_cost)
         hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
         return hashed.decode('utf-8')
     
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """
+        Check whether a stored hash uses a lower cost than configured
+        
+        Args:
+            hashed_password: bcrypt hash ($2b$<cost>$<salt+digest>)
+            
+        Returns:
+            True if the hash should be replaced
+        """
+        try:
+            return int(hashed_password.split('$')[2]) < self.bcrypt_cost
+        except (IndexError, ValueError):
+            return False
+    
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
         """
         Verify password against hash
@@ -63,7 +119,7 @@ class AuthenticationService:
             logger.error(f"Password verification error: {str(e)}")
             return False
     
-    def create_access_token(self, user_id: str, email: str, role: str) -> str:
+    def create_access_token(self, user_id: str, email: str, role: str, name: Optional[str] = None) -> str:
         """
         Create JWT access token
         
@@ -71,23 +127,26 @@ class AuthenticationService:
             user_id: User ID
             email: User email
             role: User role
+            name: Optional user name (carried as a claim)
             
         Returns:
             JWT access token
         """
-        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        # Integer epoch claims: what PyJWT would emit for datetimes, without them
+        now = int(time.time())
         
         payload = {
             "sub": user_id,
             "email": email,
             "role": role,
             "type": "access",
-            "exp": expire,
-            "iat": datetime.utcnow()
+            "exp": now + ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+            "iat": now
         }
+        if name is not None:
+            payload["name"] = name
         
-        token = jwt.encode(payload, self.secret_key, algorithm=self.algorithm)
-        return token
+        return self._signer.encode(payload)
     
     def create_refresh_token(self, user_id: str) -> str:
         """
@@ -99,18 +158,17 @@ class AuthenticationService:
         Returns:
             JWT refresh token
         """
-        expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+        now = int(time.time())
         
         payload = {
             "sub": user_id,
             "type": "refresh",
-            "exp": expire,
-            "iat": datetime.utcnow(),
+            "exp": now + REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60,
+            "iat": now,
             "jti": str(uuid.uuid4())  # Unique token ID
         }
         
-        token = jwt.encode(payload, self.secret_key, algorithm=self.algorithm)
-        return token
+        return self._signer.encode(payload)
     
     def verify_token(self, token: str) -> Optional[Dict[str, Any]]:
         """
@@ -122,15 +180,31 @@ class AuthenticationService:
         Returns:
             Decoded payload if valid, None otherwise
         """
+        cache_key = token_cache_key(token)
+        
+        payload = _token_cache.get(cache_key)
+        if payload is not None:
+            return payload
+        
         try:
             payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
-            return payload
         except jwt.ExpiredSignatureError:
             logger.warning("Token has expired")
             return None
         except jwt.InvalidTokenError as e:
             logger.warning(f"Invalid token: {str(e)}")
             return None
+        
+        # Cache until token expiry, capped at the cache TTL
+        ttl = min(payload.get('exp', 0) - time.time(), TOKEN_CACHE_TTL_SECONDS)
+        if ttl > 0:
+            _token_cache.set(cache_key, payload, ttl=ttl)
+        
+        return payload
+    
+    def invalidate_token(self, token: str):
+        """Drop a token from the decoded-token cache (e.g. on logout)"""
+        _token_cache.pop(token_cache_key(token))
     
     def register(
         self,
@@ -157,7 +231,7 @@ class AuthenticationService:
         
         try:
             # Check if user already exists
-            existing_user = session.query(User).filter(User.email == email).first()
+            existing_user = session.execute(USER_BY_EMAIL_STMT, {"email": email}).first()
             if existing_user:
                 raise ValueError("User with this email already exists")
             
@@ -181,7 +255,7 @@ class AuthenticationService:
             session.commit()
             
             # Generate tokens
-            access_token = self.create_access_token(user.id, user.email, user.role)
+            access_token = self.create_access_token(user.id, user.email, user.role, user.name)
             refresh_token = self.create_refresh_token(user.id)
             
             logger.info(f"User registered: {email} (role: {role})")
@@ -221,7 +295,7 @@ class AuthenticationService:
         
         try:
             # Find user
-            user = session.query(User).filter(User.email == email).first()
+            user = session.execute(USER_BY_EMAIL_STMT, {"email": email}).first()
             
             if not user:
                 raise ValueError("Invalid email or password")
@@ -236,12 +310,24 @@ class AuthenticationService:
             if not user.is_active:
                 raise ValueError("User account is inactive")
             
+            # Upgrade hashes made with a lower cost while the password is at hand
+            if self.needs_rehash(user.password_hash):
+                try:
+                    session.execute(PASSWORD_HASH_UPDATE_STMT, {
+                        "user_id": user.id,
+                        "new_hash": self.hash_password(password)
+                    })
+                    session.commit()
+                except Exception as e:
+                    session.rollback()
+                    logger.warning(f"Password rehash failed for {email}: {str(e)}")
+            
             # Update last login
             # user.last_login = datetime.utcnow()
             # session.commit()
             
             # Generate tokens
-            access_token = self.create_access_token(user.id, user.email, user.role)
+            access_token = self.create_access_token(user.id, user.email, user.role, user.name)
             refresh_token = self.create_refresh_token(user.id)
             
             logger.info(f"User logged in: {email}")
@@ -286,13 +372,13 @@ class AuthenticationService:
         # Get user
         session = SessionLocal()
         try:
-            user = session.query(User).filter(User.id == user_id).first()
+            user = session.execute(USER_BY_ID_STMT, {"user_id": user_id}).first()
             
             if not user or not user.is_active:
                 raise ValueError("User not found or inactive")
             
             # Generate new access token
-            access_token = self.create_access_token(user.id, user.email, user.role)
+            access_token = self.create_access_token(user.id, user.email, user.role, user.name)
             
             return {
                 "access_token": access_token,
@@ -317,22 +403,39 @@ class AuthenticationService:
         if not payload or payload.get("type") != "access":
             return None
         
-        user_id = payload.get("sub")
+        return self.get_user_by_id(payload.get("sub"))
+    
+    def get_user_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get active user by ID
+        
+        Args:
+            user_id: User ID
+            
+        Returns:
+            User dict if found and active, None otherwise
+        """
+        cached = _user_cache.get(user_id)
+        if cached is not None:
+            return cached
         
         session = SessionLocal()
         try:
-            user = session.query(User).filter(User.id == user_id).first()
+            user = session.execute(USER_BY_ID_STMT, {"user_id": user_id}).first()
             
             if not user or not user.is_active:
                 return None
             
-            return {
+            user_dict = {
                 "id": user.id,
                 "name": user.name,
                 "email": user.email,
                 "role": user.role,
                 "phone": user.phone
             }
+            _user_cache.set(user_id, user_dict)
+            
+            return user_dict
             
         finally:
             session.close()
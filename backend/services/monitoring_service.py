@@ -12,6 +12,13 @@ from models.database import SessionLocal
 
 logger = logging.getLogger(__name__)
 
+# Mapping safeguards are optional; health and metrics degrade without them
+try:
+    from services.safeguards import orchestrator_state, MAPPING_DATA_RESOURCES
+except Exception:
+    orchestrator_state = None
+    MAPPING_DATA_RESOURCES = None
+
 
 class MonitoringService:
     """Service for application monitoring and metrics"""
@@ -42,11 +49,11 @@ class MonitoringService:
             
             # Get mapping protection status
             mapping_protected = True
-            try:
-                from services.safeguards import orchestrator_state
-                mapping_protected = not orchestrator_state.is_paused()
-            except:
-                pass
+            if orchestrator_state is not None:
+                try:
+                    mapping_protected = not orchestrator_state.is_paused()
+                except:
+                    pass
             
             # Calculate uptime
             uptime_seconds = int(time.time() - self.start_time)
@@ -104,13 +111,13 @@ class MonitoringService:
                     stats[f"{table}_total"] = 0
             
             # Get mapping protection stats
-            try:
-                from services.safeguards import orchestrator_state, MAPPING_DATA_RESOURCES
-                stats['mapping_resources_protected'] = len(MAPPING_DATA_RESOURCES)
-                stats['orchestrator_blocked_writes'] = orchestrator_state._blocked_write_count
-                stats['orchestrator_active'] = 1 if orchestrator_state.is_active() else 0
-            except:
-                pass
+            if orchestrator_state is not None:
+                try:
+                    stats['mapping_resources_protected'] = len(MAPPING_DATA_RESOURCES)
+                    stats['orchestrator_blocked_writes'] = orchestrator_state._blocked_write_count
+                    stats['orchestrator_active'] = 1 if orchestrator_state.is_active() else 0
+                except:
+                    pass
             
             # Application metrics
             stats['app_uptime_seconds'] = int(time.time() - self.start_time)
@@ -5,13 +5,14 @@ Handles payment processing with Razorpay integration
 
 import os
 import uuid
-import hmac
-import hashlib
 import logging
+import orjson
 from datetime import datetime
 from typing import Optional, Dict, Any
 from sqlalchemy import text
 from models.database import SessionLocal
+from backend.utils.ttl_cache import TTLCache
+from backend.utils.razorpay_signature import CheckoutSignatureVerifier
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +21,13 @@ RAZORPAY_KEY_ID = os.getenv("RAZORPAY_KEY_ID", "rzp_test_key")
 RAZORPAY_KEY_SECRET = os.getenv("RAZORPAY_KEY_SECRET", "rzp_test_secret")
 RAZORPAY_WEBHOOK_SECRET = os.getenv("RAZORPAY_WEBHOOK_SECRET", "webhook_secret")
 
+# Status polled by the checkout page: payment_intent_id -> response dict.
+# Entries are dropped here on verify/webhook; the short TTL bounds staleness
+# across worker processes, and succeeded is final so it is kept longer
+PAYMENT_STATUS_CACHE_TTL_SECONDS = 30
+PAYMENT_STATUS_FINAL_TTL_SECONDS = 3600
+_payment_status_cache = TTLCache(maxsize=10000, ttl=PAYMENT_STATUS_CACHE_TTL_SECONDS)
+
 
 class PaymentService:
     """Service for handling payments via Razorpay"""
@@ -29,10 +37,13 @@ class PaymentService:
         self.key_secret = RAZORPAY_KEY_SECRET
         self.webhook_secret = RAZORPAY_WEBHOOK_SECRET
         
+        self._signature_verifier = CheckoutSignatureVerifier(self.key_secret)
+        
         # Try to import razorpay client
         try:
             import razorpay
-            self.client = razorpay.Client(auth=(self.key_id, self.key_secret))
+            from backend.utils.http_session import pooled_session
+            self.client = razorpay.Client(session=pooled_session(), auth=(self.key_id, self.key_secret))
             self.razorpay_available = True
         except ImportError:
             logger.warning("Razorpay SDK not installed. Payment processing will use mock mode.")
@@ -102,7 +113,6 @@ class PaymentService:
                  :provider_order_id, :status, :metadata, :created_at)
             """)
             
-            import json
             metadata = {
                 "description": description or f"Appointment payment",
                 "created_by": "payment_service"
@@ -117,7 +127,7 @@ class PaymentService:
                 "provider": "razorpay" if self.razorpay_available else "mock",
                 "provider_order_id": provider_order_id,
                 "status": "pending",
-                "metadata": json.dumps(metadata),
+                "metadata": orjson.dumps(metadata).decode(),
                 "created_at": datetime.utcnow()
             })
             
@@ -165,14 +175,9 @@ class PaymentService:
         try:
             # Verify signature
             if self.razorpay_available:
-                message = f"{provider_order_id}|{provider_payment_id}"
-                expected_signature = hmac.new(
-                    self.key_secret.encode(),
-                    message.encode(),
-                    hashlib.sha256
-                ).hexdigest()
-                
-                signature_valid = hmac.compare_digest(signature, expected_signature)
+                signature_valid = self._signature_verifier.is_valid(
+                    provider_order_id, provider_payment_id, signature
+                )
             else:
                 # Mock mode - always valid
                 signature_valid = True
@@ -200,6 +205,7 @@ class PaymentService:
             })
             
             session.commit()
+            _payment_status_cache.pop(payment_intent_id)
             
             logger.info(f"Payment verified for intent {payment_intent_id}")
             
@@ -237,9 +243,9 @@ class PaymentService:
         
         try:
             webhook_id = str(uuid.uuid4())
+            now = datetime.utcnow()
             
             # Store webhook event
-            import json
             insert_query = text("""
                 INSERT INTO payment_webhooks
                 (id, provider, event_type, payload, signature, processed, created_at)
@@ -251,10 +257,10 @@ class PaymentService:
                 "id": webhook_id,
                 "provider": "razorpay",
                 "event_type": event_type,
-                "payload": json.dumps(payload),
+                "payload": orjson.dumps(payload).decode(),
                 "signature": signature,
                 "processed": False,
-                "created_at": datetime.utcnow()
+                "created_at": now
             })
             
             session.commit()
@@ -274,15 +280,18 @@ class PaymentService:
                             status = 'succeeded',
                             paid_at = :paid_at
                         WHERE provider_order_id = :order_id
+                        RETURNING id
                     """)
                     
-                    session.execute(update_query, {
+                    updated = session.execute(update_query, {
                         "payment_id": payment_id,
-                        "paid_at": datetime.utcnow(),
+                        "paid_at": now,
                         "order_id": order_id
-                    })
+                    }).fetchall()
                     
                     session.commit()
+                    for row in updated:
+                        _payment_status_cache.pop(row[0])
             
             elif event_type == "payment.failed":
                 # Payment failed
@@ -296,14 +305,17 @@ class PaymentService:
                         SET status = 'failed',
                             error_message = :error_message
                         WHERE provider_order_id = :order_id
+                        RETURNING id
                     """)
                     
-                    session.execute(update_query, {
+                    updated = session.execute(update_query, {
                         "error_message": error_description,
                         "order_id": order_id
-                    })
+                    }).fetchall()
                     
                     session.commit()
+                    for row in updated:
+                        _payment_status_cache.pop(row[0])
             
             # Mark webhook as processed
             mark_processed_query = text("""
@@ -334,6 +346,10 @@ class PaymentService:
         Returns:
             Payment status
         """
+        cached = _payment_status_cache.get(payment_intent_id)
+        if cached is not None:
+            return cached
+        
         session = SessionLocal()
         
         try:
@@ -349,17 +365,27 @@ class PaymentService:
             if not result:
                 raise ValueError("Payment intent not found")
             
-            return {
+            # SQLite returns the stored text, other drivers a datetime
+            paid_at = result[6]
+            if isinstance(paid_at, datetime):
+                paid_at = paid_at.isoformat()
+            
+            payment_status = {
                 "payment_intent_id": result[0],
                 "appointment_id": result[1],
                 "amount": result[2],
                 "currency": result[3],
                 "status": result[4],
                 "provider_payment_id": result[5],
-                "paid_at": result[6].isoformat() if result[6] else None,
+                "paid_at": paid_at,
                 "error_message": result[7]
             }
             
+            ttl = PAYMENT_STATUS_FINAL_TTL_SECONDS if result[4] == "succeeded" else None
+            _payment_status_cache.set(payment_intent_id, payment_status, ttl=ttl)
+            
+            return payment_status
+            
         finally:
             session.close()
 
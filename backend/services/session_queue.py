@@ -0,0 +1,238 @@
+"""
+Session Transition Queue
+Coalesces teleconsult session start/end writes into batched transactions
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from itertools import groupby
+from typing import Optional, Dict, Any, List, Tuple, Union
+from sqlalchemy import text, bindparam
+from models.database import engine
+
+logger = logging.getLogger(__name__)
+
+# Queue configuration
+SESSION_QUEUE_MAXSIZE = 1000
+SESSION_BATCH_SIZE = 200
+SESSION_FLUSH_INTERVAL = 0.01  # seconds to wait for a batch to fill
+
+START_SESSION_QUERY = text("""
+    UPDATE teleconsult_sessions
+    SET status = 'active',
+        started_at = :ts
+    WHERE appointment_id = :appointment_id
+""")
+
+START_APPOINTMENT_QUERY = text("""
+    UPDATE appointments
+    SET session_started_at = :ts,
+        status = 'in_progress'
+    WHERE id = :appointment_id
+""")
+
+SESSION_STARTED_AT_QUERY = text("""
+    SELECT appointment_id, started_at FROM teleconsult_sessions
+    WHERE appointment_id IN :appointment_ids
+""").bindparams(bindparam("appointment_ids", expanding=True))
+
+END_SESSION_QUERY = text("""
+    UPDATE teleconsult_sessions
+    SET status = 'ended',
+        ended_at = :ts,
+        duration_seconds = :duration
+    WHERE appointment_id = :appointment_id
+""")
+
+END_APPOINTMENT_QUERY = text("""
+    UPDATE appointments
+    SET session_ended_at = :ts,
+        duration_minutes = :duration_minutes,
+        status = 'completed'
+    WHERE id = :appointment_id
+""")
+
+# (kind, appointment_id, timestamp); kind is 'start' or 'end'
+Transition = Tuple[str, str, datetime]
+
+
+def _start_run(conn, run: List[Transition]) -> List[Dict[str, Any]]:
+    """Apply consecutive start transitions with one executemany per table"""
+    params = [{"appointment_id": appointment_id, "ts": ts} for _, appointment_id, ts in run]
+    conn.execute(START_SESSION_QUERY, params)
+    conn.execute(START_APPOINTMENT_QUERY, params)
+    return [{"status": "active", "started_at": ts.isoformat()} for _, _, ts in run]
+
+
+def _end_run(conn, run: List[Transition]) -> List[Union[Dict[str, Any], Exception]]:
+    """Apply consecutive end transitions: one start-time read, one executemany per table"""
+    started = dict(conn.execute(
+        SESSION_STARTED_AT_QUERY, {"appointment_ids": list({e[1] for e in run})}
+    ).fetchall())
+
+    results: List[Union[Dict[str, Any], Exception]] = []
+    params = []
+    for _, appointment_id, ts in run:
+        started_at = started.get(appointment_id)
+        if not started_at:
+            results.append(ValueError("Session not started"))
+            continue
+
+        # SQLite returns the stored text, other drivers a datetime
+        if not isinstance(started_at, datetime):
+            started_at = datetime.fromisoformat(started_at)
+        duration = int((ts - started_at).total_seconds())
+
+        params.append({
+            "appointment_id": appointment_id,
+            "ts": ts,
+            "duration": duration,
+            "duration_minutes": duration // 60
+        })
+        results.append({
+            "status": "ended",
+            "ended_at": ts.isoformat(),
+            "duration_seconds": duration,
+            "duration_minutes": duration // 60
+        })
+
+    if params:
+        conn.execute(END_SESSION_QUERY, params)
+        conn.execute(END_APPOINTMENT_QUERY, params)
+    return results
+
+
+def write_session_transitions(events: List[Transition]) -> List[Union[Dict[str, Any], Exception]]:
+    """
+    Apply session transitions in one transaction, in submission order
+
+    Args:
+        events: Transitions to apply
+
+    Returns:
+        Per-event result dict, or the exception for events that were rejected
+    """
+    results: List[Union[Dict[str, Any], Exception]] = []
+    with engine.begin() as conn:
+        if conn.dialect.name == "sqlite":
+            # End runs read before they write: take the write lock up front
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+        for kind, run in groupby(events, key=lambda e: e[0]):
+            run = list(run)
+            results.extend(_start_run(conn, run) if kind == "start" else _end_run(conn, run))
+    return results
+
+
+class SessionTransitionQueue:
+    """Queue of session transitions drained by a background batch writer"""
+
+    def __init__(self, maxsize: int = SESSION_QUEUE_MAXSIZE):
+        self.maxsize = maxsize
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def is_running(self) -> bool:
+        """Check whether the background writer is draining the queue"""
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Start the background writer on the running event loop"""
+        if self.is_running():
+            return
+
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._task = asyncio.create_task(self._drain())
+        logger.info("Session transition writer started")
+
+    async def stop(self):
+        """Write queued transitions and stop the background writer"""
+        if not self.is_running():
+            return
+
+        # Sentinel: the writer finishes everything queued ahead of it
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        logger.info("Session transition writer stopped")
+
+    async def submit(self, kind: str, appointment_id: str) -> Dict[str, Any]:
+        """
+        Apply a session transition and wait until its batch is committed
+
+        Args:
+            kind: 'start' or 'end'
+            appointment_id: Appointment ID
+
+        Returns:
+            Transition result
+
+        Raises:
+            ValueError: If an end is submitted for a session that never started
+        """
+        event = (kind, appointment_id, datetime.utcnow())
+
+        if not self.is_running():
+            # No writer (scripts, tests): write inline
+            result = (await asyncio.to_thread(write_session_transitions, [event]))[0]
+        else:
+            future = asyncio.get_running_loop().create_future()
+            await self._queue.put((event, future))
+            result = await future
+
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def _drain(self):
+        """Collect transitions into batches and write them"""
+        loop = asyncio.get_running_loop()
+        stopping = False
+
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+
+            batch = [item]
+            deadline = loop.time() + SESSION_FLUSH_INTERVAL
+
+            while len(batch) < SESSION_BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            # Write off the event loop so requests keep queuing meanwhile
+            try:
+                results = await asyncio.to_thread(write_session_transitions, [e for e, _ in batch])
+            except Exception as e:
+                logger.error(f"Session transition batch error: {str(e)}")
+                results = [e] * len(batch)
+
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+
+# Global session transition queue instance
+_session_queue: Optional[SessionTransitionQueue] = None
+
+
+def get_session_queue() -> SessionTransitionQueue:
+    """Get global session transition queue instance"""
+    global _session_queue
+    if _session_queue is None:
+        _session_queue = SessionTransitionQueue()
+    return _session_queue
@@ -4,13 +4,14 @@ Handles video consultation room creation and management using Jitsi
 """
 
 import os
-import jwt
 import uuid
 import logging
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 from sqlalchemy import text
 from models.database import SessionLocal
+from backend.utils.jwt_signer import HS256Signer
+from backend.services.session_queue import write_session_transitions
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +28,7 @@ class TeleconsultService:
         self.jitsi_domain = JITSI_DOMAIN
         self.app_id = JITSI_APP_ID
         self.secret = JITSI_SECRET
+        self._signer = HS256Signer(self.secret)
     
     def generate_room_name(self, appointment_id: str) -> str:
         """
@@ -82,7 +84,7 @@ class TeleconsultService:
             }
         }
         
-        token = jwt.encode(payload, self.secret, algorithm="HS256")
+        token = self._signer.encode(payload)
         return token
     
     def create_room(
@@ -235,132 +237,45 @@ class TeleconsultService:
         """
         Mark session as started
         
+        Routes go through the batched SessionTransitionQueue; this writes
+        the same transition inline
+        
         Args:
             appointment_id: Appointment ID
             
         Returns:
             Updated session details
         """
-        session = SessionLocal()
-        
-        try:
-            now = datetime.utcnow()
-            
-            # Update teleconsult session
-            update_session_query = text("""
-                UPDATE teleconsult_sessions
-                SET status = 'active',
-                    started_at = :started_at
-                WHERE appointment_id = :appointment_id
-            """)
-            
-            session.execute(update_session_query, {
-                "started_at": now,
-                "appointment_id": appointment_id
-            })
-            
-            # Update appointment
-            update_appt_query = text("""
-                UPDATE appointments
-                SET session_started_at = :started_at,
-                    status = 'in_progress'
-                WHERE id = :appointment_id
-            """)
-            
-            session.execute(update_appt_query, {
-                "started_at": now,
-                "appointment_id": appointment_id
-            })
-            
-            session.commit()
-            
-            logger.info(f"Started teleconsult session for appointment {appointment_id}")
-            
-            return {"status": "active", "started_at": now.isoformat()}
-            
-        except Exception as e:
-            session.rollback()
-            logger.error(f"Error starting session: {str(e)}")
-            raise
-        finally:
-            session.close()
+        return self._write_transition("start", appointment_id)
     
     def end_session(self, appointment_id: str) -> Dict[str, Any]:
         """
         End teleconsult session
         
+        Routes go through the batched SessionTransitionQueue; this writes
+        the same transition inline
+        
         Args:
             appointment_id: Appointment ID
             
         Returns:
             Session summary
         """
-        session = SessionLocal()
-        
+        return self._write_transition("end", appointment_id)
+    
+    def _write_transition(self, kind: str, appointment_id: str) -> Dict[str, Any]:
+        """Apply one session transition in its own transaction"""
         try:
-            now = datetime.utcnow()
-            
-            # Get session start time
-            query = text("""
-                SELECT started_at FROM teleconsult_sessions
-                WHERE appointment_id = :appointment_id
-            """)
-            
-            result = session.execute(query, {"appointment_id": appointment_id}).fetchone()
-            
-            if not result or not result[0]:
-                raise ValueError("Session not started")
-            
-            started_at = result[0]
-            duration = int((now - started_at).total_seconds())
-            
-            # Update teleconsult session
-            update_session_query = text("""
-                UPDATE teleconsult_sessions
-                SET status = 'ended',
-                    ended_at = :ended_at,
-                    duration_seconds = :duration
-                WHERE appointment_id = :appointment_id
-            """)
-            
-            session.execute(update_session_query, {
-                "ended_at": now,
-                "duration": duration,
-                "appointment_id": appointment_id
-            })
-            
-            # Update appointment
-            update_appt_query = text("""
-                UPDATE appointments
-                SET session_ended_at = :ended_at,
-                    duration_minutes = :duration_minutes,
-                    status = 'completed'
-                WHERE id = :appointment_id
-            """)
-            
-            session.execute(update_appt_query, {
-                "ended_at": now,
-                "duration_minutes": duration // 60,
-                "appointment_id": appointment_id
-            })
-            
-            session.commit()
-            
-            logger.info(f"Ended teleconsult session for appointment {appointment_id}, duration: {duration}s")
-            
-            return {
-                "status": "ended",
-                "ended_at": now.isoformat(),
-                "duration_seconds": duration,
-                "duration_minutes": duration // 60
-            }
-            
+            result = write_session_transitions([(kind, appointment_id, datetime.utcnow())])[0]
         except Exception as e:
-            session.rollback()
-            logger.error(f"Error ending session: {str(e)}")
+            logger.error(f"Error writing session {kind}: {str(e)}")
             raise
-        finally:
-            session.close()
+        
+        if isinstance(result, Exception):
+            raise result
+        
+        logger.info(f"Session {kind} for appointment {appointment_id}")
+        return result
 
 
 # Global service instance
@@ -0,0 +1 @@
+# Backend utils package
@@ -0,0 +1,50 @@
+"""
+HTTP Session
+Keep-alive requests sessions sized for threaded callers
+"""
+
+from typing import Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Matches the default asyncio.to_thread / Starlette threadpool ceiling, so
+# concurrent calls to one host reuse connections instead of discarding them
+# (requests' default pool keeps only 10 per host)
+HTTP_POOL_MAXSIZE = 32
+
+# (connect, read) seconds. requests waits forever by default, and a hung
+# upstream would pin one of those pool threads per call
+HTTP_TIMEOUT_SECONDS = (3.05, 10.0)
+
+
+class _TimeoutHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that applies a default timeout when the caller passes none"""
+
+    def __init__(self, *args, timeout: Union[float, Tuple[float, float]] = HTTP_TIMEOUT_SECONDS, **kwargs):
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, timeout=None, **kwargs):
+        return super().send(request, timeout=self.timeout if timeout is None else timeout, **kwargs)
+
+
+def pooled_session(
+    pool_maxsize: int = HTTP_POOL_MAXSIZE,
+    timeout: Union[float, Tuple[float, float]] = HTTP_TIMEOUT_SECONDS
+) -> requests.Session:
+    """
+    Create a requests Session with a larger per-host connection pool
+
+    Args:
+        pool_maxsize: Kept-alive connections per host
+        timeout: Default (connect, read) timeout for requests that set none
+
+    Returns:
+        Session with HTTPS/HTTP adapters mounted
+    """
+    session = requests.Session()
+    adapter = _TimeoutHTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize, timeout=timeout)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
@@ -0,0 +1,32 @@
+"""
+ID Generation
+Batched random UUID strings for bulk inserts
+"""
+
+import os
+from typing import List
+
+
+def uuid4_strings(count: int) -> List[str]:
+    """
+    Generate random (version 4) UUID strings from a single urandom read
+
+    Same format as str(uuid.uuid4()), about twice as fast per ID for
+    batches; for a single ID use uuid.uuid4().
+
+    Args:
+        count: Number of IDs
+
+    Returns:
+        List of canonical 36-character UUID strings
+    """
+    raw = bytearray(os.urandom(16 * count))
+    # RFC 4122 version (4) and variant (10xx) bits
+    raw[6::16] = bytes((b & 0x0F) | 0x40 for b in raw[6::16])
+    raw[8::16] = bytes((b & 0x3F) | 0x80 for b in raw[8::16])
+
+    h = raw.hex()
+    return [
+        f"{h[i:i + 8]}-{h[i + 8:i + 12]}-{h[i + 12:i + 16]}-{h[i + 16:i + 20]}-{h[i + 20:i + 32]}"
+        for i in range(0, 32 * count, 32)
+    ]
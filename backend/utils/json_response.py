@@ -0,0 +1,23 @@
+"""
+ORJSON Response
+JSON response class rendered with orjson
+"""
+
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered by orjson.
+
+    Like FastAPI's (now deprecated) ORJSONResponse: datetimes, dates and
+    UUIDs are encoded natively, and non-string dict keys are allowed.
+    Naive datetimes are stored as UTC (utcnow()) and are rendered with a
+    +00:00 offset.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_NAIVE_UTC)
@@ -0,0 +1,52 @@
+"""
+HS256 JWT Signer
+Encodes JWTs with a precomputed header segment and a pre-keyed HMAC
+"""
+
+import hmac
+import base64
+import hashlib
+import orjson
+from typing import Dict, Any
+
+
+def _b64url(data: bytes) -> bytes:
+    """Base64url encode without padding (RFC 7515)"""
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+# Same compact, key-sorted header PyJWT emits for HS256
+_HS256_HEADER_SEGMENT = _b64url(b'{"alg":"HS256","typ":"JWT"}')
+
+
+class HS256Signer:
+    """
+    Reusable HS256 token encoder.
+
+    The HMAC is keyed once and copied per token, and the header segment is
+    built once, so encoding only serializes (orjson) and signs the payload.
+    Tokens verify with jwt.decode and are byte-identical to jwt.encode's for
+    ASCII claims; non-ASCII text is emitted as UTF-8 rather than \\u escapes.
+    Claims must already be JSON-native (e.g. exp/nbf as int timestamps).
+    """
+
+    def __init__(self, key: str):
+        self._mac = hmac.new(key.encode("utf-8"), digestmod=hashlib.sha256)
+
+    def encode(self, payload: Dict[str, Any]) -> str:
+        """
+        Encode and sign payload
+
+        Args:
+            payload: JWT claims
+
+        Returns:
+            Compact JWT string
+        """
+        body = _b64url(orjson.dumps(payload))
+        signing_input = _HS256_HEADER_SEGMENT + b"." + body
+
+        mac = self._mac.copy()
+        mac.update(signing_input)
+
+        return (signing_input + b"." + _b64url(mac.digest())).decode("ascii")
@@ -0,0 +1,35 @@
+"""
+Razorpay Checkout Signature
+Verifies checkout signatures with a pre-keyed HMAC
+"""
+
+import hmac
+import hashlib
+
+
+class CheckoutSignatureVerifier:
+    """
+    Reusable Razorpay checkout signature check.
+
+    Checkout signatures are HMAC-SHA256(key_secret, "order_id|payment_id") as
+    hex. The HMAC is keyed once and copied per check.
+    """
+
+    def __init__(self, key_secret: str):
+        self._mac = hmac.new(key_secret.encode("utf-8"), digestmod=hashlib.sha256)
+
+    def is_valid(self, order_id: str, payment_id: str, signature: str) -> bool:
+        """
+        Check a checkout signature in constant time
+
+        Args:
+            order_id: Razorpay order ID
+            payment_id: Razorpay payment ID
+            signature: Signature returned by checkout
+
+        Returns:
+            True if the signature matches
+        """
+        mac = self._mac.copy()
+        mac.update(f"{order_id}|{payment_id}".encode("utf-8"))
+        return hmac.compare_digest(mac.hexdigest().encode("ascii"), signature.encode("utf-8"))
@@ -0,0 +1,79 @@
+"""
+TTL Cache
+Small in-process LRU cache with per-entry expiry
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries expire after a time-to-live.
+
+    Entries are evicted least-recently-used first once maxsize is reached,
+    and lazily dropped on access once expired.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get cached value
+
+        Args:
+            key: Cache key
+            default: Value returned on miss or expiry
+
+        Returns:
+            Cached value if present and fresh, default otherwise
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """
+        Store value
+
+        Args:
+            key: Cache key
+            value: Value to cache
+            ttl: Optional per-entry TTL in seconds (defaults to cache TTL)
+        """
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove and return cached value"""
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -5,11 +5,12 @@ FHIR R4-compliant service for integrating NAMASTE and ICD-11 codes
 
 from fastapi import FastAPI, HTTPException, Depends, Security
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials, OAuth2PasswordBearer
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi import Request as FastAPIRequest
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from fhir.resources.codesystem import CodeSystem
 from fhir.resources.valueset import ValueSet
 from fhir.resources.bundle import Bundle
@@ -48,6 +49,8 @@ import os
 from dotenv import load_dotenv
 from datetime import datetime
 import logging
+import time
+from sqlalchemy import text
 
 from services.terminology_service import TerminologyService
 from services.icd11_service import ICD11Service
@@ -56,7 +59,7 @@ from services.audit_service import AuditService
 from services.faiss_index import FaissIndex
 from services.mapping_engine import MappingEngine
 from services.orchestrator import Orchestrator
-from models.database import init_db, get_db, ClinicalRecord, MappingFeedback, User, AyushTerm
+from models.database import init_db, SessionLocal, ClinicalRecord, MappingFeedback, User, AyushTerm
 
 # Import clinic management routes
 from routes import (
@@ -79,6 +82,11 @@ from backend.routes import admin
 # Import Phase 5-6 monitoring routes
 from backend.routes import monitoring
 
+from backend.middleware.rbac import require_auth, require_role, ActorContext, Roles
+from backend.services.audit_queue import get_audit_queue
+from backend.services.session_queue import get_session_queue
+from backend.services.teleconsult_service import get_teleconsult_service
+
 load_dotenv()
 
 app = FastAPI(
@@ -190,9 +198,25 @@ async def startup_event():
     asyncio.create_task(orchestrator.run())
     logger.info("Orchestrator agent started")
     
+    # Start batched audit log writer
+    get_audit_queue().start()
+    
+    # Start batched teleconsult session transition writer
+    get_session_queue().start()
+    
+    # Drop cached system config when another worker updates it
+    admin.start_config_invalidation_listener()
+    
     logger.info("Service initialized successfully")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Flush pending work on shutdown"""
+    await get_session_queue().stop()
+    await get_audit_queue().stop()
+
+
 # ==================== FHIR Resources ====================
 
 @app.get("/fhir/CodeSystem/namaste", response_model=CodeSystem)
@@ -504,61 +528,136 @@ async def upload_fhir_bundle(
 
 # ==================== Teleconsult Routes ====================
 
-@app.get("/api/teleconsult/appointments")
-async def get_teleconsult_appointments(request: FastAPIRequest):
-    """Get appointments for teleconsult"""
+TELECONSULT_APPOINTMENTS_QUERY = text("""
+    SELECT json_group_array(json_object(
+        'id', a.id, 'patient_id', a.patient_id, 'staff_id', a.staff_id,
+        'date', a.date, 'time', a.time,
+        'status', a.status, 'reason', a.reason, 'room_url', a.room_url,
+        'teleconsult_enabled', json(CASE WHEN a.teleconsult_enabled THEN 'true' ELSE 'false' END),
+        'patient_name', a.patient_name, 'doctor_name', a.doctor_name
+    ))
+    FROM (
+        SELECT
+            a.id, a.patient_id, a.staff_id,
+            a.appointment_date AS date, a.appointment_time AS time,
+            a.status, a.reason, a.room_url, a.teleconsult_enabled,
+            COALESCE(u1.name, 'Unknown') AS patient_name,
+            COALESCE(u2.name, 'Unknown') AS doctor_name
+        FROM appointments a
+        LEFT JOIN users u1 ON a.patient_id = u1.id
+        LEFT JOIN users u2 ON a.staff_id = u2.id
+        WHERE a.teleconsult_enabled = 1
+        AND a.status IN ('scheduled', 'in-progress')
+        ORDER BY a.appointment_date, a.appointment_time
+        LIMIT :limit OFFSET :offset
+    ) a
+""")
+
+
+def _fetch_teleconsult_appointments(limit: int, offset: int) -> str:
+    """Run the teleconsult list query (blocking; call via threadpool)"""
+    session = SessionLocal()
     try:
-        db = get_db()
-        
-        query = """
-            SELECT 
-                a.id, a.patient_id, a.staff_id, a.appointment_date,
-                a.appointment_time, a.status, a.reason, a.notes,
-                a.room_url, a.teleconsult_enabled,
-                u1.name as patient_name, u2.name as doctor_name
-            FROM appointments a
-            LEFT JOIN users u1 ON a.patient_id = u1.id
-            LEFT JOIN users u2 ON a.staff_id = u2.id
-            WHERE a.teleconsult_enabled = 1
-            AND a.status IN ('scheduled', 'in-progress')
-            ORDER BY a.appointment_date, a.appointment_time
-        """
+        return session.execute(
+            TELECONSULT_APPOINTMENTS_QUERY, {"limit": limit, "offset": offset}
+        ).scalar()
+    finally:
+        session.close()
+
+
+END_TELECONSULT_CALL_QUERY = text("""
+    UPDATE appointments 
+    SET session_ended_at = :ended_at,
+        duration_minutes = COALESCE(
+            CAST((julianday(:ended_at) - julianday(session_started_at)) * 1440 AS INTEGER), 0
+        ),
+        status = 'completed'
+    WHERE id = :appointment_id
+    RETURNING duration_minutes
+""")
+
+
+def _mark_teleconsult_started(appointment_id: str, room_token: str, room_url: str):
+    """Record call start on the appointment (blocking; call via threadpool)"""
+    session = SessionLocal()
+    try:
+        session.execute(text("""
+            UPDATE appointments 
+            SET room_token = :room_token, room_url = :room_url,
+                session_started_at = :started_at, status = 'in-progress'
+            WHERE id = :appointment_id
+        """), {
+            "room_token": room_token,
+            "room_url": room_url,
+            "started_at": datetime.utcnow(),
+            "appointment_id": appointment_id
+        })
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+def _mark_teleconsult_ended(appointment_id: str) -> Optional[int]:
+    """Record call end and return duration in minutes, None if no such appointment (blocking; call via threadpool)"""
+    session = SessionLocal()
+    try:
+        # Duration is computed in SQL from session_started_at, as teleconsult_real does
+        duration = session.execute(END_TELECONSULT_CALL_QUERY, {
+            "ended_at": datetime.utcnow(),
+            "appointment_id": appointment_id
+        }).scalar()
+        session.commit()
         
-        results = db.execute(query).fetchall()
-        appointments = []
-        for row in results:
-            appointments.append({
-                "id": row[0], "patient_id": row[1], "staff_id": row[2],
-                "date": row[3], "time": row[4], "status": row[5],
-                "reason": row[6], "notes": row[7], "room_url": row[8],
-                "teleconsult_enabled": bool(row[9]),
-                "patient_name": row[10] or "Unknown",
-                "doctor_name": row[11] or "Unknown"
-            })
+        return duration
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+@app.get("/api/teleconsult/appointments")
+async def get_teleconsult_appointments(
+    request: FastAPIRequest,
+    limit: int = 100,
+    offset: int = 0
+):
+    """Get appointments for teleconsult (single JOIN, paginated, JSON built by SQLite)"""
+    try:
+        appointments_json = await run_in_threadpool(_fetch_teleconsult_appointments, limit, offset)
         
-        return {"appointments": appointments}
+        return Response(
+            content=f'{{"appointments":{appointments_json}}}',
+            media_type="application/json"
+        )
     except Exception as e:
         logger.error(f"Error fetching teleconsult appointments: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/api/teleconsult/start-call")
-async def start_teleconsult_call(request: FastAPIRequest):
-    """Start a teleconsult video call"""
+async def start_teleconsult_call(
+    request: FastAPIRequest,
+    actor: ActorContext = Depends(require_role(Roles.DOCTOR))
+):
+    """Start a teleconsult video call (Doctor only)"""
     try:
         data = await request.json()
         appointment_id = data.get("appointment_id")
-        room_id = f"caresync-{appointment_id}-{uuid.uuid4().hex[:8]}"
-        jwt_token = f"demo-token-{uuid.uuid4().hex[:16]}"
-        room_url = f"https://meet.jit.si/{room_id}"
+        teleconsult_service = get_teleconsult_service()
+        room_id = teleconsult_service.generate_room_name(appointment_id)
+        jwt_token = teleconsult_service.create_jitsi_token(
+            room_name=room_id,
+            user_id=actor.actor_id,
+            user_name=data.get("participant_name", "User"),
+            is_moderator=True
+        )
+        room_url = f"https://{teleconsult_service.jitsi_domain}/{room_id}"
         
-        db = get_db()
-        db.execute("""
-            UPDATE appointments 
-            SET room_token = ?, room_url = ?, session_started_at = ?, status = 'in-progress'
-            WHERE id = ?
-        """, (jwt_token, room_url, datetime.utcnow(), appointment_id))
-        db.commit()
+        await run_in_threadpool(_mark_teleconsult_started, appointment_id, jwt_token, room_url)
         
         return {"room_id": room_id, "room_url": room_url, "jwt_token": jwt_token, "meeting_started": True}
     except Exception as e:
@@ -567,15 +666,24 @@ async def start_teleconsult_call(request: FastAPIRequest):
 
 
 @app.post("/api/teleconsult/join-call")
-async def join_teleconsult_call(request: FastAPIRequest):
+async def join_teleconsult_call(
+    request: FastAPIRequest,
+    actor: ActorContext = Depends(require_auth)
+):
     """Join teleconsult call"""
     try:
         data = await request.json()
         room_id = data.get("room_id")
+        teleconsult_service = get_teleconsult_service()
         return {
             "room_id": room_id,
-            "room_url": f"https://meet.jit.si/{room_id}",
-            "jwt_token": f"demo-token-{uuid.uuid4().hex[:16]}",
+            "room_url": f"https://{teleconsult_service.jitsi_domain}/{room_id}",
+            "jwt_token": teleconsult_service.create_jitsi_token(
+                room_name=room_id,
+                user_id=actor.actor_id,
+                user_name=data.get("participant_name", "User"),
+                is_moderator=False
+            ),
             "meeting_started": True
         }
     except Exception as e:
@@ -586,21 +694,13 @@ async def join_teleconsult_call(request: FastAPIRequest):
 async def end_teleconsult_call(appointment_id: str):
     """End teleconsult call"""
     try:
-        db = get_db()
-        result = db.execute("SELECT session_started_at FROM appointments WHERE id = ?", (appointment_id,)).fetchone()
-        duration = 0
-        if result and result[0]:
-            started_at = datetime.fromisoformat(result[0])
-            duration = int((datetime.utcnow() - started_at).total_seconds() / 60)
-        
-        db.execute("""
-            UPDATE appointments 
-            SET session_ended_at = ?, duration_minutes = ?, status = 'completed'
-            WHERE id = ?
-        """, (datetime.utcnow(), duration, appointment_id))
-        db.commit()
+        duration = await run_in_threadpool(_mark_teleconsult_ended, appointment_id)
+        if duration is None:
+            raise HTTPException(status_code=404, detail="Appointment not found")
         
         return {"success": True, "duration_minutes": duration}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -0,0 +1,9 @@
+-- Performance: Query-matching composite indices
+-- Compound indices whose column order matches hot WHERE/ORDER BY clauses
+
+-- Teleconsult appointment list: filter on (teleconsult_enabled, status), order by (date, time)
+CREATE INDEX IF NOT EXISTS idx_appt_tele_status_date ON appointments(teleconsult_enabled, status, appointment_date, appointment_time);
+
+-- Audit log lookups: per-user history newest-first, and per-resource trail
+CREATE INDEX IF NOT EXISTS idx_audit_user_ts ON audit_logs(user_id, timestamp DESC);
+CREATE INDEX IF NOT EXISTS idx_audit_resource ON audit_logs(resource, resource_id);
@@ -0,0 +1,4 @@
+-- Performance: Audit log keyset pagination
+-- Matches ORDER BY timestamp DESC, id DESC so each page is an index seek
+
+CREATE INDEX IF NOT EXISTS idx_audit_ts_id ON audit_logs(timestamp DESC, id DESC);
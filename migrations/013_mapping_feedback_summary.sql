@@ -0,0 +1,95 @@
+-- Performance: Mapping feedback summary
+-- Per-(term, suggested, corrected) counts maintained by trigger, so the
+-- feedback summary reads the top rows of an index instead of grouping and
+-- sorting all of mapping_feedback
+
+CREATE TABLE IF NOT EXISTS mapping_feedback_summary (
+    ayush_term TEXT,
+    suggested_icd11 TEXT,
+    clinician_icd11 TEXT,
+    correction_count INTEGER NOT NULL DEFAULT 0,
+    confidence_sum REAL NOT NULL DEFAULT 0,
+    confidence_count INTEGER NOT NULL DEFAULT 0  -- rows with a confidence_score (AVG ignores NULLs)
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_feedback_summary_key
+    ON mapping_feedback_summary(ayush_term, suggested_icd11, clinician_icd11);
+CREATE INDEX IF NOT EXISTS idx_feedback_summary_count
+    ON mapping_feedback_summary(correction_count DESC);
+
+-- Backfill from existing feedback
+INSERT INTO mapping_feedback_summary
+    (ayush_term, suggested_icd11, clinician_icd11, correction_count, confidence_sum, confidence_count)
+SELECT ayush_term, suggested_icd11, clinician_icd11,
+       COUNT(*), COALESCE(SUM(confidence_score), 0), COUNT(confidence_score)
+FROM mapping_feedback
+WHERE NOT EXISTS (SELECT 1 FROM mapping_feedback_summary)
+GROUP BY ayush_term, suggested_icd11, clinician_icd11;
+
+-- Keys are matched with IS so NULL terms group together, as in GROUP BY
+CREATE TRIGGER IF NOT EXISTS trg_mapping_feedback_summary_insert
+AFTER INSERT ON mapping_feedback
+BEGIN
+    INSERT INTO mapping_feedback_summary (ayush_term, suggested_icd11, clinician_icd11)
+    SELECT NEW.ayush_term, NEW.suggested_icd11, NEW.clinician_icd11
+    WHERE NOT EXISTS (
+        SELECT 1 FROM mapping_feedback_summary
+        WHERE ayush_term IS NEW.ayush_term
+          AND suggested_icd11 IS NEW.suggested_icd11
+          AND clinician_icd11 IS NEW.clinician_icd11
+    );
+    
+    UPDATE mapping_feedback_summary
+    SET correction_count = correction_count + 1,
+        confidence_sum = confidence_sum + COALESCE(NEW.confidence_score, 0),
+        confidence_count = confidence_count + (NEW.confidence_score IS NOT NULL)
+    WHERE ayush_term IS NEW.ayush_term
+      AND suggested_icd11 IS NEW.suggested_icd11
+      AND clinician_icd11 IS NEW.clinician_icd11;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_mapping_feedback_summary_delete
+AFTER DELETE ON mapping_feedback
+BEGIN
+    UPDATE mapping_feedback_summary
+    SET correction_count = correction_count - 1,
+        confidence_sum = confidence_sum - COALESCE(OLD.confidence_score, 0),
+        confidence_count = confidence_count - (OLD.confidence_score IS NOT NULL)
+    WHERE ayush_term IS OLD.ayush_term
+      AND suggested_icd11 IS OLD.suggested_icd11
+      AND clinician_icd11 IS OLD.clinician_icd11;
+    
+    DELETE FROM mapping_feedback_summary WHERE correction_count <= 0;
+END;
+
+-- An edit moves the row from its old key to its new one (delete, then insert)
+CREATE TRIGGER IF NOT EXISTS trg_mapping_feedback_summary_update
+AFTER UPDATE OF ayush_term, suggested_icd11, clinician_icd11, confidence_score ON mapping_feedback
+BEGIN
+    UPDATE mapping_feedback_summary
+    SET correction_count = correction_count - 1,
+        confidence_sum = confidence_sum - COALESCE(OLD.confidence_score, 0),
+        confidence_count = confidence_count - (OLD.confidence_score IS NOT NULL)
+    WHERE ayush_term IS OLD.ayush_term
+      AND suggested_icd11 IS OLD.suggested_icd11
+      AND clinician_icd11 IS OLD.clinician_icd11;
+    
+    DELETE FROM mapping_feedback_summary WHERE correction_count <= 0;
+    
+    INSERT INTO mapping_feedback_summary (ayush_term, suggested_icd11, clinician_icd11)
+    SELECT NEW.ayush_term, NEW.suggested_icd11, NEW.clinician_icd11
+    WHERE NOT EXISTS (
+        SELECT 1 FROM mapping_feedback_summary
+        WHERE ayush_term IS NEW.ayush_term
+          AND suggested_icd11 IS NEW.suggested_icd11
+          AND clinician_icd11 IS NEW.clinician_icd11
+    );
+    
+    UPDATE mapping_feedback_summary
+    SET correction_count = correction_count + 1,
+        confidence_sum = confidence_sum + COALESCE(NEW.confidence_score, 0),
+        confidence_count = confidence_count + (NEW.confidence_score IS NOT NULL)
+    WHERE ayush_term IS NEW.ayush_term
+      AND suggested_icd11 IS NEW.suggested_icd11
+      AND clinician_icd11 IS NEW.clinician_icd11;
+END;
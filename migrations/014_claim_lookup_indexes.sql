@@ -0,0 +1,6 @@
+-- Performance: Claim packet lookups
+-- Claim generation reads an encounter's diagnoses and prescriptions by encounter_id;
+-- without these both tables are scanned in full
+
+CREATE INDEX IF NOT EXISTS idx_encounter_diagnoses_encounter ON encounter_diagnoses(encounter_id);
+CREATE INDEX IF NOT EXISTS idx_prescriptions_encounter ON prescriptions(encounter_id);
@@ -0,0 +1,14 @@
+-- Idempotency keys for payment writes
+-- Stores the response of the first request per (Idempotency-Key, user, route, body)
+-- so client retries replay it instead of creating a second intent/order.
+-- The row is claimed (response NULL) before the work runs, so concurrent
+-- retries see the claim rather than repeating the work.
+
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key TEXT PRIMARY KEY,
+    response TEXT,  -- NULL while the first request is in flight
+    created_at INTEGER NOT NULL,
+    expires_at INTEGER NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires ON idempotency_keys(expires_at);
@@ -5,9 +5,10 @@ Database models and initialization
 import os
 import uuid
 from datetime import datetime
-from sqlalchemy import create_engine, Column, String, Text, Boolean, Float, Integer, DateTime, ForeignKey, JSON
+from sqlalchemy import create_engine, event, Column, String, Text, Boolean, Float, Integer, DateTime, ForeignKey, JSON
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 
 Base = declarative_base()
 
@@ -17,10 +18,49 @@ engine = create_engine(
     connect_args={
         "check_same_thread": False,
         "timeout": 30  # Increase timeout to 30 seconds to handle locks
-    }
+    },
+    # Pooled connections shared by get_db() request sessions
+    pool_size=20,
+    max_overflow=10,
+    pool_pre_ping=True
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for handlers that await their queries instead of blocking the
+# event loop; ASYNC_DATABASE_URL selects the driver for non-SQLite databases
+async_database_url = os.getenv("ASYNC_DATABASE_URL") or database_url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+async_engine = create_async_engine(
+    async_database_url,
+    connect_args={"timeout": 30},
+    pool_size=20,
+    max_overflow=40,
+    pool_pre_ping=True
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+# Per-connection SQLite settings, applied once when the pool opens a connection
+# (journal_mode=WAL is persistent in the file, see enable_wal.py). NORMAL sync is
+# corruption-safe under WAL; a 64 MB page cache keeps hot tables in memory.
+SQLITE_CONNECT_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-64000",
+)
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Apply SQLITE_CONNECT_PRAGMAS to a new pooled connection"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in SQLITE_CONNECT_PRAGMAS:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+for _engine in (engine, async_engine.sync_engine):
+    if _engine.dialect.name == "sqlite":
+        event.listen(_engine, "connect", _apply_sqlite_pragmas)
+
 
 class User(Base):
     """User model for clinicians and admins"""
@@ -457,3 +497,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """Get async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
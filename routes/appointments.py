@@ -7,6 +7,7 @@ from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime
 from models.database import SessionLocal, Appointment, Patient, Staff, Clinic
+from backend.services.jwt_auth_service import get_auth_service
 import uuid
 import logging
 
@@ -104,8 +105,7 @@ async def list_appointments(
     """List appointments with filtering - FILTERED BY LOGGED-IN USER"""
     try:
         # Get user from token
-        from backend.services.jwt_auth_service import AuthenticationService
-        auth_service = AuthenticationService()
+        auth_service = get_auth_service()
         
         auth_header = request.headers.get("Authorization", "") if request else ""
         if not auth_header.startswith("Bearer "):
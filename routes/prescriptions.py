@@ -7,6 +7,7 @@ from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime
 from models.database import SessionLocal, Prescription, PrescriptionItem, Encounter, Medicine
+from backend.services.jwt_auth_service import get_auth_service
 import uuid
 import logging
 
@@ -37,8 +38,7 @@ async def get_all_prescriptions(limit: int = 50, request: Request = None):
     """Get prescriptions - FILTERED BY LOGGED-IN USER"""
     try:
         # Get user from token
-        from backend.services.jwt_auth_service import AuthenticationService
-        auth_service = AuthenticationService()
+        auth_service = get_auth_service()
         
         auth_header = request.headers.get("Authorization", "") if request else ""
         if not auth_header.startswith("Bearer "):
@@ -54,6 +54,7 @@ class AppointmentsService:
             
             # Create appointment
             appointment_id = str(uuid.uuid4())
+            now = datetime.utcnow().isoformat()
             cursor.execute("""
                 INSERT INTO appointments_v2 
                 (id, patient_id, doctor_id, start_time, end_time, 
@@ -68,8 +69,8 @@ class AppointmentsService:
                 'scheduled',
                 reason,
                 notes,
-                datetime.utcnow().isoformat(),
-                datetime.utcnow().isoformat()
+                now,
+                now
             ))
             
             conn.commit()
@@ -39,6 +39,9 @@ class BillingService:
             # Calculate total amount
             total_amount = sum(item.get('amount', 0) for item in (items or []))
             
+            # One timestamp for the bill and its items
+            now = datetime.utcnow().isoformat()
+            
             # Create bill
             bill_id = str(uuid.uuid4())
             cursor.execute("""
@@ -56,7 +59,7 @@ class BillingService:
                 'unpaid',
                 None,
                 notes,
-                datetime.utcnow().isoformat()
+                now
             ))
             
             # Create bill items
@@ -74,7 +77,7 @@ class BillingService:
                         item.get('quantity', 1),
                         item.get('unit_price', 0),
                         item.get('amount', 0),
-                        datetime.utcnow().isoformat()
+                        now
                     ))
             
             conn.commit()
@@ -142,3 +142,4 @@ class EventTopics:
     CLAIM_PREVIEWED = "claim.previewed"
     MODEL_DRIFT = "model.drift"
     ORCHESTRATOR_PAUSED = "orchestrator.paused"
+    CONFIG_INVALIDATED = "config.invalidated"
@@ -37,6 +37,9 @@ class PrescriptionsService:
         cursor = conn.cursor()
         
         try:
+            # One timestamp for the prescription and its items
+            now = datetime.utcnow().isoformat()
+            
             # Create prescription
             prescription_id = str(uuid.uuid4())
             cursor.execute("""
@@ -48,10 +51,10 @@ class PrescriptionsService:
                 patient_id,
                 doctor_id,
                 appointment_id,
-                datetime.utcnow().isoformat(),
+                now,
                 diagnosis,
                 notes,
-                datetime.utcnow().isoformat()
+                now
             ))
             
             # Create prescription items
@@ -71,7 +74,7 @@ class PrescriptionsService:
                         item.get('frequency'),
                         item.get('duration'),
                         item.get('instructions'),
-                        datetime.utcnow().isoformat()
+                        now
                     ))
             
             conn.commit()
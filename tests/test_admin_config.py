@@ -0,0 +1,218 @@
+"""
+Tests for admin system config caching, responses and claim generation
+"""
+
+import pytest
+import pytest_asyncio
+import sqlite3
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from backend.routes import admin
+from backend.middleware.rbac import ActorContext
+
+
+class TestSystemConfigCache:
+    """Test in-process system config cache"""
+    
+    @pytest.fixture
+    def loads(self, monkeypatch):
+        """Count config loads and start from an empty cache"""
+        calls = []
+        
+        def fake_load(db):
+            calls.append(db)
+            return {"enable_claims": True, "version": len(calls)}
+        
+        monkeypatch.setattr(admin, "_load_system_config", fake_load)
+        admin.invalidate_config_cache()
+        yield calls
+        admin.invalidate_config_cache()
+    
+    @pytest.fixture
+    def actor(self):
+        return ActorContext(user_id="admin_1", email="admin@example.com", role="admin")
+    
+    @pytest.mark.asyncio
+    async def test_config_loaded_once(self, loads, actor):
+        """Test that repeated reads are served from cache"""
+        first = await admin.get_system_config(actor=actor, db=None)
+        second = await admin.get_system_config(actor=actor, db=None)
+        
+        assert first == second == {"enable_claims": True, "version": 1}
+        assert len(loads) == 1
+    
+    @pytest.mark.asyncio
+    async def test_invalidation_forces_reload(self, loads, actor):
+        """Test that invalidation makes the next read hit the database"""
+        await admin.get_system_config(actor=actor, db=None)
+        admin.invalidate_config_cache()
+        config = await admin.get_system_config(actor=actor, db=None)
+        
+        assert config["version"] == 2
+        assert len(loads) == 2
+    
+    @pytest.mark.asyncio
+    async def test_expired_config_reloads(self, loads, actor, monkeypatch):
+        """Test that the TTL reloads config even without an invalidation event"""
+        from backend.utils.ttl_cache import TTLCache
+        monkeypatch.setattr(admin, "_config_cache", TTLCache(maxsize=1, ttl=0))
+        
+        await admin.get_system_config(actor=actor, db=None)
+        config = await admin.get_system_config(actor=actor, db=None)
+        
+        assert config["version"] == 2
+        assert len(loads) == 2
+
+
+class TestAuditLogs:
+    """Test audit log paging parameters"""
+    
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("cursor", [{"before_ts": "2024-01-02 03:04:05"}, {"before_id": "log_1"}])
+    async def test_partial_cursor_rejected(self, cursor):
+        """Test that a cursor missing one of its two parts is a 400, not page 1"""
+        from fastapi import HTTPException
+        actor = ActorContext(user_id="admin_1", email="admin@example.com", role="admin")
+        
+        with pytest.raises(HTTPException) as exc:
+            await admin.get_audit_logs(actor=actor, db=None, **cursor)
+        
+        assert exc.value.status_code == 400
+
+
+class TestORJSONResponse:
+    """Test admin router response rendering"""
+    
+    def test_router_renders_with_orjson(self):
+        """Test that admin routes default to the orjson response class"""
+        from backend.utils.json_response import ORJSONResponse
+        
+        assert admin.router.default_response_class is ORJSONResponse
+    
+    def test_datetimes_encoded_natively(self):
+        """Test that naive datetimes are rendered as ISO 8601 UTC strings"""
+        from datetime import datetime
+        from backend.utils.json_response import ORJSONResponse
+        
+        response = ORJSONResponse({"timestamp": datetime(2024, 1, 2, 3, 4, 5), "id": None})
+        
+        assert response.body == b'{"timestamp":"2024-01-02T03:04:05+00:00","id":null}'
+    
+    @pytest.mark.asyncio
+    async def test_claims_datetimes_rendered_by_orjson(self):
+        """Test that claim timestamps reach orjson as datetimes"""
+        from datetime import datetime
+        
+        row = {
+            "id": "claim_1", "encounter_id": "enc_1", "patient_id": "pat_1",
+            "claim_type": "dual", "status": "draft", "amount_claimed": 100.0,
+            "amount_approved": None, "created_at": datetime(2024, 1, 2, 3, 4, 5),
+            "submitted_at": None
+        }
+        
+        class FakeResult:
+            def mappings(self):
+                return self
+            
+            def all(self):
+                return [row]
+        
+        class FakeDB:
+            def execute(self, query, params=None):
+                return FakeResult()
+        
+        actor = ActorContext(user_id="admin_1", email="admin@example.com", role="admin")
+        response = await admin.get_claims(status=None, limit=50, actor=actor, db=FakeDB())
+        
+        assert b'"created_at":"2024-01-02T03:04:05+00:00","submitted_at":null' in response.body
+
+
+class TestClaimComposer:
+    """Test claim packet generation on async connections"""
+    
+    @pytest_asyncio.fixture
+    async def composer(self, tmp_path, monkeypatch):
+        """ClaimComposer bound to a temporary database with one encounter"""
+        from backend.services import claim_composer
+        
+        db_path = tmp_path / "claims.db"
+        conn = sqlite3.connect(str(db_path))
+        conn.executescript("""
+            CREATE TABLE patients (id TEXT PRIMARY KEY, name TEXT, date_of_birth TEXT, gender TEXT);
+            CREATE TABLE users (id TEXT PRIMARY KEY, name TEXT);
+            CREATE TABLE encounters (
+                id TEXT PRIMARY KEY, patient_id TEXT, clinician_id TEXT, encounter_date TEXT,
+                chief_complaint TEXT, notes TEXT, diagnosis TEXT
+            );
+            CREATE TABLE encounter_diagnoses (
+                encounter_id TEXT, ayush_term_id TEXT, icd_code TEXT, diagnosis_type TEXT,
+                confidence REAL, accepted_from_ai BOOLEAN, clinician_modified BOOLEAN
+            );
+            CREATE TABLE prescriptions (
+                encounter_id TEXT, medication TEXT, dosage TEXT, frequency TEXT,
+                duration TEXT, instructions TEXT
+            );
+            CREATE TABLE claim_packets (
+                id TEXT PRIMARY KEY, encounter_id TEXT, patient_id TEXT, clinician_id TEXT,
+                insurer_id TEXT, claim_type TEXT, payload TEXT, status TEXT, created_at TIMESTAMP
+            );
+            INSERT INTO patients VALUES ('pat_1', 'Asha', '1990-01-01', 'F');
+            INSERT INTO users VALUES ('doc_1', 'Dr. Rao');
+            INSERT INTO encounters VALUES ('enc_1', 'pat_1', 'doc_1', '2024-01-02', 'Fever', '', 'Jwara');
+            INSERT INTO encounter_diagnoses VALUES ('enc_1', 'ay_1', NULL, 'primary', 0.9, 1, 0);
+            INSERT INTO encounter_diagnoses VALUES ('enc_1', NULL, 'SM00', 'primary', 0.8, 1, 1);
+            INSERT INTO prescriptions VALUES ('enc_1', 'Sudarshan', '1 tab', 'BD', '5 days', '');
+        """)
+        conn.close()
+        
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+        monkeypatch.setattr(claim_composer, "async_engine", engine)
+        yield claim_composer.ClaimComposer(), db_path
+        await engine.dispose()
+    
+    @pytest.mark.asyncio
+    async def test_packet_built_and_stored(self, composer):
+        """Test that the concurrent reads assemble the packet and it is persisted"""
+        composer, db_path = composer
+        
+        result = await composer.generate_claim_packet("enc_1", claim_type="icd11", insurer_id="ins_1")
+        
+        payload = result["payload"]
+        assert payload["encounter"]["date"] == "2024-01-02"
+        assert payload["patient"]["name"] == "Asha"
+        assert payload["clinician"]["name"] == "Dr. Rao"
+        assert [d["icd_code"] for d in payload["diagnoses"]] == ["SM00"]
+        assert payload["diagnoses"][0]["clinician_modified"] is True
+        assert [rx["medication"] for rx in payload["prescriptions"]] == ["Sudarshan"]
+        
+        stored = sqlite3.connect(str(db_path)).execute(
+            "SELECT id, insurer_id, status FROM claim_packets"
+        ).fetchall()
+        assert stored == [(result["claim_id"], "ins_1", "draft")]
+    
+    @pytest.mark.asyncio
+    async def test_diagnoses_filtered_by_claim_type(self, composer):
+        """Test that each claim type keeps only diagnoses carrying its code"""
+        composer, _ = composer
+        
+        ayush = await composer.generate_claim_packet("enc_1", claim_type="ayush")
+        dual = await composer.generate_claim_packet("enc_1", claim_type="dual")
+        
+        assert [d["ayush_term_id"] for d in ayush["payload"]["diagnoses"]] == ["ay_1"]
+        assert len(dual["payload"]["diagnoses"]) == 2
+    
+    @pytest.mark.asyncio
+    async def test_missing_encounter_raises(self, composer):
+        """Test that an unknown encounter is reported without writing a packet"""
+        composer, db_path = composer
+        
+        with pytest.raises(ValueError):
+            await composer.generate_claim_packet("missing")
+        
+        assert sqlite3.connect(str(db_path)).execute("SELECT COUNT(*) FROM claim_packets").fetchone() == (0,)
@@ -0,0 +1,137 @@
+"""
+Tests for batched audit logging
+"""
+
+import asyncio
+import pytest
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.services.audit_queue import AuditQueue, AUDIT_BATCH_SIZE
+
+
+class RecordingAuditQueue(AuditQueue):
+    """AuditQueue that records batches instead of writing to the database"""
+
+    def __init__(self, maxsize: int = 100):
+        super().__init__(maxsize=maxsize)
+        self.batches = []
+
+    def _write_batch(self, batch):
+        self.batches.append(list(batch))
+
+
+class TestAuditQueue:
+    """Test AuditQueue batching behaviour"""
+
+    def test_enqueue_without_writer_writes_inline(self):
+        """Records are written immediately when no writer is running"""
+        queue = RecordingAuditQueue()
+
+        assert queue.enqueue({"action": "create"})
+        assert queue.batches == [[{"action": "create"}]]
+
+    @pytest.mark.asyncio
+    async def test_records_are_batched(self):
+        """Records queued together are written in a single batch"""
+        queue = RecordingAuditQueue()
+        queue.start()
+
+        for i in range(5):
+            queue.enqueue({"action": "create", "resource_id": str(i)})
+
+        await asyncio.sleep(0.2)
+        await queue.stop()
+
+        assert len(queue.batches) == 1
+        assert [r["resource_id"] for r in queue.batches[0]] == ["0", "1", "2", "3", "4"]
+
+    @pytest.mark.asyncio
+    async def test_batches_are_capped(self):
+        """A backlog larger than the batch size is written in several batches"""
+        queue = RecordingAuditQueue(maxsize=AUDIT_BATCH_SIZE * 2)
+        queue.start()
+
+        for i in range(AUDIT_BATCH_SIZE + 1):
+            queue.enqueue({"action": "create", "resource_id": str(i)})
+
+        await asyncio.sleep(0.2)
+        await queue.stop()
+
+        assert [len(b) for b in queue.batches] == [AUDIT_BATCH_SIZE, 1]
+
+    @pytest.mark.asyncio
+    async def test_stop_flushes_pending_records(self):
+        """Stopping the writer flushes records still in the queue"""
+        queue = RecordingAuditQueue()
+        queue.start()
+
+        queue.enqueue({"action": "update"})
+        await queue.stop()
+
+        assert sum(len(b) for b in queue.batches) == 1
+
+    @pytest.mark.asyncio
+    async def test_overflow_drops_records(self):
+        """Records beyond maxsize are dropped instead of blocking"""
+        queue = RecordingAuditQueue(maxsize=2)
+        queue.start()
+
+        accepted = [queue.enqueue({"action": "read"}) for _ in range(3)]
+
+        assert accepted == [True, True, False]
+        assert queue.dropped_count == 1
+
+        await queue.stop()
+
+
+class TestAuditDecorator:
+    """Test audit_action record construction"""
+
+    @pytest.mark.asyncio
+    async def test_payload_records_argument_shape_only(self, monkeypatch):
+        """Payload lists arg types and kwarg names, never argument values"""
+        from backend.decorators import audit
+
+        queue = RecordingAuditQueue()
+        monkeypatch.setattr(audit, "get_audit_queue", lambda: queue)
+
+        @audit.audit_create("encounter", extract_id=lambda r: r["id"])
+        async def create_encounter(*args, **kwargs):
+            return {"id": 42}
+
+        await create_encounter("x" * 1000, data={"secret": "value"})
+
+        record = queue.batches[0][0]
+        assert record["resource_id"] == "42"
+        assert record["status"] == "success"
+        assert record["payload"] == '{"args_count":1,"args_types":["str"],"kwargs_keys":["data"]}'
+
+    @pytest.mark.asyncio
+    async def test_audit_log_uses_current_user(self, monkeypatch):
+        """Bare audit_log records the route name and the get_current_user actor"""
+        from pydantic import BaseModel
+        from backend.decorators import audit
+        from backend.middleware.rbac import ActorContext
+
+        class StartCallRequest(BaseModel):
+            appointment_id: str
+
+        queue = RecordingAuditQueue()
+        monkeypatch.setattr(audit, "get_audit_queue", lambda: queue)
+
+        @audit.audit_log
+        async def start_video_call(request, current_user):
+            return {"success": True}
+
+        actor = ActorContext(user_id="doc_1", email="doc@example.com", role="doctor")
+        await start_video_call(request=StartCallRequest(appointment_id="a1"), current_user=actor)
+
+        record = queue.batches[0][0]
+        assert record["action"] == "start_video_call"
+        assert record["resource"] == "test_audit_queue"
+        assert record["user_id"] == "doc_1"
+        assert record["ip_address"] is None
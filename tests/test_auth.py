@@ -9,8 +9,16 @@ from pathlib import Path
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+import jwt
+import time
+from types import SimpleNamespace
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
 from backend.services.jwt_auth_service import AuthenticationService
+from backend.middleware import rbac
 from backend.middleware.rbac import ActorContext, Roles
+from backend.utils.jwt_signer import HS256Signer
 
 
 class TestAuthenticationService:
@@ -37,6 +45,51 @@ class TestAuthenticationService:
         # Should not verify wrong password
         assert not auth_service.verify_password("wrong_password", hashed)
     
+    def test_bcrypt_cost_and_rehash(self, auth_service):
+        """Test that hashes use the configured cost and older costs need rehash"""
+        auth_service.bcrypt_cost = 4
+        cheap = auth_service.hash_password("pw")
+        
+        assert cheap.split('$')[2] == "04"
+        assert not auth_service.needs_rehash(cheap)
+        
+        auth_service.bcrypt_cost = 5
+        assert auth_service.needs_rehash(cheap)
+        assert not auth_service.needs_rehash("not-a-bcrypt-hash")
+    
+    def test_login_upgrades_low_cost_hash(self, auth_service, monkeypatch):
+        """Test that a successful login re-hashes a lower-cost password hash"""
+        from backend.services import jwt_auth_service
+        
+        auth_service.bcrypt_cost = 4
+        user = SimpleNamespace(id="u1", name="User", email="u1@example.com", role="patient",
+                               phone=None, is_active=True, password_hash=auth_service.hash_password("pw"))
+        commits = []
+        
+        class FakeSession:
+            def execute(self, statement, params):
+                if "new_hash" in params:
+                    user.password_hash = params["new_hash"]
+                return self
+            
+            def first(self):
+                return user
+            
+            def commit(self):
+                commits.append(user.password_hash)
+            
+            def close(self):
+                pass
+        
+        monkeypatch.setattr(jwt_auth_service, "SessionLocal", FakeSession)
+        auth_service.bcrypt_cost = 5
+        
+        auth_service.login("u1@example.com", "pw")
+        
+        assert user.password_hash.split('$')[2] == "05"
+        assert auth_service.verify_password("pw", user.password_hash)
+        assert commits == [user.password_hash]
+    
     def test_create_access_token(self, auth_service):
         """Test access token creation"""
         token = auth_service.create_access_token(
@@ -49,6 +102,18 @@ class TestAuthenticationService:
         assert isinstance(token, str)
         assert len(token) > 0
     
+    def test_access_token_matches_pyjwt(self, auth_service):
+        """Test that pre-keyed signing yields the token PyJWT would"""
+        token = auth_service.create_access_token(
+            user_id="test_user_123",
+            email="test@example.com",
+            role="patient",
+            name="Test"
+        )
+        payload = jwt.decode(token, auth_service.secret_key, algorithms=[auth_service.algorithm])
+        
+        assert token == jwt.encode(payload, auth_service.secret_key, algorithm=auth_service.algorithm)
+    
     def test_create_refresh_token(self, auth_service):
         """Test refresh token creation"""
         token = auth_service.create_refresh_token(user_id="test_user_123")
@@ -99,6 +164,104 @@ class TestAuthenticationService:
         
         assert access_payload['type'] == "access"
         assert refresh_payload['type'] == "refresh"
+    
+    def test_verified_token_is_cached(self, auth_service, monkeypatch):
+        """Test that a repeated token is decoded once until invalidated"""
+        token = auth_service.create_access_token(
+            user_id="cached_user",
+            email="cached@example.com",
+            role="patient"
+        )
+        decodes = []
+        real_decode = jwt.decode
+        
+        def counting_decode(*args, **kwargs):
+            decodes.append(args[0])
+            return real_decode(*args, **kwargs)
+        
+        monkeypatch.setattr(jwt, "decode", counting_decode)
+        auth_service.invalidate_token(token)
+        
+        first = auth_service.verify_token(token)
+        second = auth_service.verify_token(token)
+        
+        assert first == second
+        assert first['sub'] == "cached_user"
+        assert len(decodes) == 1
+        
+        auth_service.invalidate_token(token)
+        auth_service.verify_token(token)
+        assert len(decodes) == 2
+        
+        auth_service.invalidate_token(token)
+    
+    def test_user_lookup_is_cached(self, auth_service, monkeypatch):
+        """Test that an active user is loaded once until the entry expires"""
+        from backend.services import jwt_auth_service
+        from backend.utils.ttl_cache import TTLCache
+        
+        lookups = []
+        user = SimpleNamespace(id="cached_user", name="Cached", email="cached@example.com",
+                               role="patient", phone=None, is_active=True)
+        
+        class FakeSession:
+            def execute(self, statement, params):
+                lookups.append(params)
+                return self
+            
+            def first(self):
+                return user
+            
+            def close(self):
+                pass
+        
+        monkeypatch.setattr(jwt_auth_service, "SessionLocal", FakeSession)
+        monkeypatch.setattr(jwt_auth_service, "_user_cache", TTLCache(maxsize=10, ttl=60))
+        
+        assert auth_service.get_user_by_id("cached_user")["email"] == "cached@example.com"
+        assert auth_service.get_user_by_id("cached_user")["email"] == "cached@example.com"
+        assert len(lookups) == 1
+        
+        # Once the entry expires a deactivated user is rejected, and never cached
+        user.is_active = False
+        jwt_auth_service._user_cache.clear()
+        assert auth_service.get_user_by_id("cached_user") is None
+        assert auth_service.get_user_by_id("cached_user") is None
+        assert len(lookups) == 3
+    
+    def test_expired_token_not_cached(self, auth_service):
+        """Test that an expired token is rejected and not cached"""
+        token = jwt.encode(
+            {"sub": "expired_user", "type": "access", "exp": int(time.time()) - 10},
+            auth_service.secret_key,
+            algorithm=auth_service.algorithm
+        )
+        
+        assert auth_service.verify_token(token) is None
+        assert auth_service.verify_token(token) is None
+
+
+class TestHS256Signer:
+    """Test precomputed-header JWT signer"""
+    
+    def test_signer_matches_pyjwt(self):
+        """Test that signer output is identical to jwt.encode"""
+        key = "test-signing-key-with-32-bytes-min"
+        payload = {"iss": "caresync", "room": "room-1", "exp": 4102444800, "context": {"user": {"name": "Dr. Test"}}}
+        
+        token = HS256Signer(key).encode(payload)
+        
+        assert token == jwt.encode(payload, key, algorithm="HS256")
+        assert jwt.decode(token, key, algorithms=["HS256"]) == payload
+    
+    def test_signer_non_ascii_claims_decode(self):
+        """Test that UTF-8 encoded non-ASCII claims verify with jwt.decode"""
+        key = "test-signing-key-with-32-bytes-min"
+        payload = {"room": "room-1", "exp": 4102444800, "context": {"user": {"name": "Dr. Müller 医生"}}}
+        
+        token = HS256Signer(key).encode(payload)
+        
+        assert jwt.decode(token, key, algorithms=["HS256"]) == payload
 
 
 class TestActorContext:
@@ -134,6 +297,149 @@ class TestRoles:
         assert Roles.STAFF == "staff"
 
 
+class TestRequireRole:
+    """Test role dependencies"""
+    
+    def test_same_roles_share_dependency(self):
+        """Test that identical role sets reuse one dependency"""
+        assert rbac.require_role("admin", "doctor") is rbac.require_role("admin", "doctor")
+        assert rbac.require_any_role("admin", "doctor") is rbac.require_role("admin", "doctor")
+        assert rbac.require_role("admin") is not rbac.require_role("doctor")
+    
+    @pytest.mark.asyncio
+    async def test_role_checker(self):
+        """Test that allowed roles pass and others get 403"""
+        checker = rbac.require_role(Roles.ADMIN, Roles.DOCTOR)
+        doctor = ActorContext(user_id="u1", email="d@example.com", role="doctor")
+        patient = ActorContext(user_id="u2", email="p@example.com", role="patient")
+        
+        assert await checker(actor=doctor) is doctor
+        
+        with pytest.raises(HTTPException) as exc_info:
+            await checker(actor=patient)
+        assert exc_info.value.status_code == 403
+        assert exc_info.value.detail == "Access denied. Required role: admin, doctor"
+
+
+class TestActorCache:
+    """Test verified-token caching in get_current_user"""
+    
+    @pytest.fixture
+    def access_token(self):
+        """Create access token for a test user"""
+        return AuthenticationService().create_access_token(
+            user_id="cache_user",
+            email="cache@example.com",
+            role="doctor",
+            name="Dr. Cache"
+        )
+    
+    @pytest.fixture
+    def claimless_token(self):
+        """Create access token without email/role claims"""
+        auth_service = AuthenticationService()
+        return jwt.encode(
+            {"sub": "cache_user", "type": "access", "exp": int(time.time()) + 300},
+            auth_service.secret_key,
+            algorithm=auth_service.algorithm
+        )
+    
+    @pytest.mark.asyncio
+    async def test_claims_build_actor_without_lookup(self, access_token, monkeypatch):
+        """Test that a token carrying role claims needs no user lookup"""
+        def fail_lookup(self, user_id):
+            raise AssertionError("unexpected user lookup")
+        
+        monkeypatch.setattr(AuthenticationService, "get_user_by_id", fail_lookup)
+        rbac.invalidate_cached_token(access_token)
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=access_token)
+        
+        actor = await rbac.get_current_user(SimpleNamespace(state=SimpleNamespace()), credentials)
+        
+        assert actor.actor_id == "cache_user"
+        assert actor.actor_email == "cache@example.com"
+        assert actor.actor_role == "doctor"
+        assert actor.actor_name == "Dr. Cache"
+        
+        rbac.invalidate_cached_token(access_token)
+    
+    @pytest.mark.asyncio
+    async def test_refresh_token_rejected(self):
+        """Test that a refresh token does not authenticate requests"""
+        refresh_token = AuthenticationService().create_refresh_token("cache_user")
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=refresh_token)
+        
+        assert await rbac.get_current_user(SimpleNamespace(state=SimpleNamespace()), credentials) is None
+    
+    @pytest.mark.asyncio
+    async def test_repeated_token_hits_cache(self, claimless_token, monkeypatch):
+        """Test that a repeated token skips the user lookup"""
+        calls = []
+        
+        def fake_get_user_by_id(self, user_id):
+            calls.append(user_id)
+            return {"id": "cache_user", "email": "cache@example.com", "role": "doctor", "name": "Dr. Cache"}
+        
+        monkeypatch.setattr(AuthenticationService, "get_user_by_id", fake_get_user_by_id)
+        rbac.invalidate_cached_token(claimless_token)
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=claimless_token)
+        
+        for _ in range(3):
+            request = SimpleNamespace(state=SimpleNamespace())
+            actor = await rbac.get_current_user(request, credentials)
+            assert actor.actor_id == "cache_user"
+            assert request.state.actor is actor
+        
+        assert len(calls) == 1
+        
+        # Logout invalidation forces a fresh lookup
+        rbac.invalidate_cached_token(claimless_token)
+        await rbac.get_current_user(SimpleNamespace(state=SimpleNamespace()), credentials)
+        assert len(calls) == 2
+        
+        rbac.invalidate_cached_token(claimless_token)
+    
+    @pytest.mark.asyncio
+    async def test_invalid_token_not_cached(self):
+        """Test that invalid tokens are rejected and not cached"""
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials="invalid.token.here")
+        
+        actor = await rbac.get_current_user(SimpleNamespace(state=SimpleNamespace()), credentials)
+        
+        assert actor is None
+        assert rbac._actor_cache.get(rbac._token_cache_key("invalid.token.here")) is None
+
+
+class TestAuthRoutes:
+    """Test auth route handlers"""
+    
+    @pytest.mark.asyncio
+    async def test_login_runs_off_event_loop(self, monkeypatch):
+        """Test that login (bcrypt) runs in a worker thread, not on the event loop"""
+        import threading
+        from backend.routes import auth
+        from backend.decorators import audit
+        
+        threads = []
+        
+        class FakeAuthService:
+            def login(self, email, password):
+                threads.append(threading.get_ident())
+                return {"user": {"id": "u1"}, "access_token": "a", "refresh_token": "r", "token_type": "bearer"}
+        
+        class NullAuditQueue:
+            def enqueue(self, record):
+                return True
+        
+        monkeypatch.setattr(auth, "get_auth_service", lambda: FakeAuthService())
+        monkeypatch.setattr(audit, "get_audit_queue", lambda: NullAuditQueue())
+        
+        result = await auth.login(request=None, data=auth.LoginRequest(email="u1@example.com", password="pw"))
+        
+        assert result["user"]["id"] == "u1"
+        assert threads and threads[0] != threading.get_ident()
+
+
 class TestAuthenticationIntegration:
     """Integration tests for authentication flow"""
     
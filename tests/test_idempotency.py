@@ -0,0 +1,214 @@
+"""
+Tests for idempotent payment writes
+"""
+
+import time
+import asyncio
+import pytest
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine, text
+
+from backend.services import idempotency
+from backend.services.idempotency import IdempotencyStore, IdempotencyKeyInUse, idempotency_lookup_key
+from backend.middleware.rbac import ActorContext
+
+MIGRATION_015 = Path(__file__).parent.parent / "migrations" / "015_idempotency_keys.sql"
+
+
+class NullAuditQueue:
+    """Audit queue that discards records"""
+
+    def enqueue(self, record):
+        return True
+
+
+@pytest.fixture
+def idempotency_engine(tmp_path, monkeypatch):
+    """Point the idempotency store at a fresh database with migration 015 applied"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'idempotency.db'}")
+    with engine.begin() as conn:
+        conn.connection.executescript(MIGRATION_015.read_text())
+    monkeypatch.setattr(idempotency, "engine", engine)
+    yield engine
+    engine.dispose()
+
+
+class TestIdempotencyLookupKey:
+    """Test derivation of stored keys"""
+
+    def test_key_is_stable_across_body_key_order(self):
+        """Test that the same body in a different key order maps to the same key"""
+        first = idempotency_lookup_key("k1", "user_1", "payments/create", {"a": 1, "b": 2})
+        second = idempotency_lookup_key("k1", "user_1", "payments/create", {"b": 2, "a": 1})
+
+        assert first == second
+        assert len(first) == 32
+
+    def test_key_is_bound_to_user_scope_and_body(self):
+        """Test that a different user, route or body yields a different key"""
+        base = idempotency_lookup_key("k1", "user_1", "payments/create", {"a": 1})
+
+        assert idempotency_lookup_key("k1", "user_2", "payments/create", {"a": 1}) != base
+        assert idempotency_lookup_key("k1", "user_1", "payments/verify", {"a": 1}) != base
+        assert idempotency_lookup_key("k1", "user_1", "payments/create", {"a": 2}) != base
+
+
+class TestIdempotencyStore:
+    """Test key claims and stored response replay"""
+
+    def test_claim_then_replay(self, idempotency_engine):
+        """Test that a completed key replays its response to later claims"""
+        store = IdempotencyStore()
+
+        assert store.claim("key") is None
+
+        store.complete("key", {"payment_intent_id": "pi_1", "amount": 500.0})
+
+        assert store.claim("key") == {"payment_intent_id": "pi_1", "amount": 500.0}
+        assert store.claim("other") is None
+
+    def test_second_claim_while_in_flight_is_rejected(self, idempotency_engine):
+        """Test that a key can't be claimed twice before the first request completes"""
+        store = IdempotencyStore()
+        store.claim("key")
+
+        with pytest.raises(IdempotencyKeyInUse):
+            store.claim("key")
+
+    def test_released_key_can_be_claimed_again(self, idempotency_engine):
+        """Test that releasing a failed request's claim lets a retry run"""
+        store = IdempotencyStore()
+        store.claim("key")
+        store.release("key")
+
+        assert store.claim("key") is None
+
+    def test_expired_entries_are_purged(self, idempotency_engine):
+        """Test that an expired response is not replayed and the key can be claimed again"""
+        store = IdempotencyStore()
+        store.claim("key")
+        store.complete("key", {"payment_intent_id": "pi_1"})
+        with idempotency_engine.begin() as conn:
+            conn.execute(text("UPDATE idempotency_keys SET expires_at = :t"), {"t": int(time.time()) - 1})
+
+        assert store.claim("key") is None
+
+
+class TestIdempotentPaymentRoutes:
+    """Test Idempotency-Key handling on payment routes"""
+
+    @pytest.mark.asyncio
+    async def test_retry_replays_first_intent(self, idempotency_engine, monkeypatch):
+        """Test that a retried create returns the first intent without a second call"""
+        from backend.routes import teleconsult_payments
+        from backend.decorators import audit
+
+        class FakePaymentService:
+            def __init__(self):
+                self.calls = 0
+
+            def create_payment_intent(self, **kwargs):
+                self.calls += 1
+                return {"payment_intent_id": f"pi_{self.calls}", "status": "pending"}
+
+        service = FakePaymentService()
+        monkeypatch.setattr(teleconsult_payments, "_payment_service", service)
+        monkeypatch.setattr(teleconsult_payments, "_idempotency_store", IdempotencyStore())
+        monkeypatch.setattr(audit, "get_audit_queue", lambda: NullAuditQueue())
+
+        actor = ActorContext(user_id="user_1", email="patient@example.com", role="patient")
+        data = teleconsult_payments.CreatePaymentRequest(
+            appointment_id="appt_1", patient_id="pat_1", amount=500.0
+        )
+
+        first = await teleconsult_payments.create_payment(
+            request=None, data=data, actor=actor, idempotency_key="retry-1"
+        )
+        second = await teleconsult_payments.create_payment(
+            request=None, data=data, actor=actor, idempotency_key="retry-1"
+        )
+        third = await teleconsult_payments.create_payment(
+            request=None, data=data, actor=actor, idempotency_key=None
+        )
+
+        assert first == second == {"payment_intent_id": "pi_1", "status": "pending"}
+        assert third["payment_intent_id"] == "pi_2"
+        assert service.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_concurrent_retries_create_one_intent(self, idempotency_engine, monkeypatch):
+        """Test that two racing retries run the create once; the loser replays or gets a 409"""
+        from backend.routes import teleconsult_payments
+        from backend.decorators import audit
+
+        class FakePaymentService:
+            def __init__(self):
+                self.calls = 0
+
+            def create_payment_intent(self, **kwargs):
+                self.calls += 1
+                time.sleep(0.05)
+                return {"payment_intent_id": f"pi_{self.calls}", "status": "pending"}
+
+        service = FakePaymentService()
+        monkeypatch.setattr(teleconsult_payments, "_payment_service", service)
+        monkeypatch.setattr(teleconsult_payments, "_idempotency_store", IdempotencyStore())
+        monkeypatch.setattr(audit, "get_audit_queue", lambda: NullAuditQueue())
+
+        actor = ActorContext(user_id="user_1", email="patient@example.com", role="patient")
+        data = teleconsult_payments.CreatePaymentRequest(
+            appointment_id="appt_1", patient_id="pat_1", amount=500.0
+        )
+
+        results = await asyncio.gather(*(
+            teleconsult_payments.create_payment(request=None, data=data, actor=actor, idempotency_key="race-1")
+            for _ in range(2)
+        ), return_exceptions=True)
+
+        assert service.calls == 1
+        for result in results:
+            if isinstance(result, HTTPException):
+                assert result.status_code == 409
+            else:
+                assert result == {"payment_intent_id": "pi_1", "status": "pending"}
+
+    @pytest.mark.asyncio
+    async def test_failed_request_can_be_retried(self, idempotency_engine, monkeypatch):
+        """Test that a failed create releases its key so the retry runs"""
+        from backend.routes import teleconsult_payments
+        from backend.decorators import audit
+
+        class FlakyPaymentService:
+            def __init__(self):
+                self.calls = 0
+
+            def create_payment_intent(self, **kwargs):
+                self.calls += 1
+                if self.calls == 1:
+                    raise RuntimeError("provider timeout")
+                return {"payment_intent_id": f"pi_{self.calls}", "status": "pending"}
+
+        service = FlakyPaymentService()
+        monkeypatch.setattr(teleconsult_payments, "_payment_service", service)
+        monkeypatch.setattr(teleconsult_payments, "_idempotency_store", IdempotencyStore())
+        monkeypatch.setattr(audit, "get_audit_queue", lambda: NullAuditQueue())
+
+        actor = ActorContext(user_id="user_1", email="patient@example.com", role="patient")
+        data = teleconsult_payments.CreatePaymentRequest(
+            appointment_id="appt_1", patient_id="pat_1", amount=500.0
+        )
+
+        with pytest.raises(HTTPException) as exc:
+            await teleconsult_payments.create_payment(request=None, data=data, actor=actor, idempotency_key="retry-2")
+        retried = await teleconsult_payments.create_payment(
+            request=None, data=data, actor=actor, idempotency_key="retry-2"
+        )
+
+        assert exc.value.status_code == 500
+        assert retried["payment_intent_id"] == "pi_2"
@@ -0,0 +1,197 @@
+"""
+Tests for mapping feedback and proposal routes on async sessions
+"""
+
+import json
+import pytest
+import pytest_asyncio
+import sqlite3
+import sys
+import uuid
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from backend.routes import mapping_enhanced
+from backend.middleware.rbac import ActorContext
+
+MIGRATION_013 = Path(__file__).parent.parent / "migrations" / "013_mapping_feedback_summary.sql"
+
+
+class TestMappingRoutes:
+    """Test mapping routes against an async SQLite session"""
+    
+    @pytest_asyncio.fixture
+    async def db(self, tmp_path):
+        """AsyncSession over a temporary database with the feedback tables"""
+        db_path = tmp_path / "mapping.db"
+        conn = sqlite3.connect(str(db_path))
+        conn.execute("""
+            CREATE TABLE mapping_feedback (
+                id TEXT PRIMARY KEY, encounter_id TEXT, ayush_term TEXT,
+                suggested_icd11 TEXT, clinician_icd11 TEXT, clinician_id TEXT,
+                feedback_type TEXT, confidence_score REAL, notes TEXT, created_at TIMESTAMP
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE mapping_proposals (
+                id TEXT PRIMARY KEY, ayush_term TEXT, current_icd11 TEXT, proposed_icd11 TEXT,
+                evidence TEXT, reason TEXT, status TEXT, proposed_by TEXT, created_at TIMESTAMP
+            )
+        """)
+        conn.execute("CREATE TABLE encounters (id TEXT PRIMARY KEY)")
+        conn.execute("""
+            CREATE TABLE encounter_diagnoses (
+                id TEXT PRIMARY KEY, encounter_id TEXT, ayush_term_id TEXT, icd_code TEXT,
+                diagnosis_type TEXT, accepted_from_ai BOOLEAN, ai_suggestion_id TEXT,
+                clinician_modified BOOLEAN, confidence REAL, provenance TEXT, created_at TIMESTAMP
+            )
+        """)
+        conn.execute("INSERT INTO encounters (id) VALUES ('enc_1')")
+        conn.executescript(MIGRATION_013.read_text())
+        conn.commit()
+        conn.close()
+        
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+        async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+            yield session
+        await engine.dispose()
+    
+    @pytest.fixture
+    def doctor(self):
+        return ActorContext(user_id="doc_1", email="doc@example.com", role="doctor")
+    
+    @pytest.mark.asyncio
+    async def test_accept_writes_all_rows(self, db, doctor):
+        """Test that accepted mappings and edit feedback are inserted in bulk"""
+        from sqlalchemy import text
+        
+        data = mapping_enhanced.AcceptMappingRequest(encounter_id="enc_1", selected_mappings=[
+            {"ayush_term": "Jwara", "icd_code": "SM00", "confidence": 0.9},
+            {"ayush_term": "Kasa", "icd_code": "SM10", "confidence": 0.8},
+            {"ayush_term": "Atisara", "icd_code": "SM21", "clinician_edited": True,
+             "original_suggested_icd11": "SM20", "confidence": 0.4}
+        ])
+        
+        result = await mapping_enhanced.accept_mapping(
+            request=None, encounter_id="enc_1", data=data, actor=doctor, db=db
+        )
+        
+        assert result["mappings_accepted"] == 3
+        assert result["feedback_created"] == 1
+        
+        diagnoses = (await db.execute(text(
+            "SELECT icd_code, clinician_modified, provenance FROM encounter_diagnoses ORDER BY icd_code"
+        ))).fetchall()
+        feedback = (await db.execute(text(
+            "SELECT ayush_term, suggested_icd11, clinician_icd11 FROM mapping_feedback"
+        ))).fetchall()
+        ids = (await db.execute(text(
+            "SELECT id FROM encounter_diagnoses UNION ALL SELECT id FROM mapping_feedback"
+        ))).scalars().all()
+        
+        assert [tuple(r[:2]) for r in diagnoses] == [("SM00", 0), ("SM10", 0), ("SM21", 1)]
+        provenance = [json.loads(r[2]) for r in diagnoses]
+        assert [p["clinician_edited"] for p in provenance] == [False, False, True]
+        assert {p["clinician_id"] for p in provenance} == {"doc_1"}
+        assert [tuple(r) for r in feedback] == [("Atisara", "SM20", "SM21")]
+        assert len(set(ids)) == 4
+        assert all(str(uuid.UUID(i)) == i and uuid.UUID(i).version == 4 for i in ids)
+    
+    @pytest.mark.asyncio
+    async def test_feedback_is_summarized(self, db, doctor):
+        """Test that submitted feedback is committed and aggregated"""
+        data = mapping_enhanced.MappingFeedbackRequest(
+            encounter_id="enc_1",
+            ayush_term="Jwara",
+            suggested_icd11="SM00",
+            clinician_icd11="SM01",
+            feedback_type="correction",
+            confidence_score=0.5
+        )
+        for _ in range(2):
+            result = await mapping_enhanced.submit_mapping_feedback(request=None, data=data, actor=doctor, db=db)
+            assert result["status"] == "success"
+        
+        summary = await mapping_enhanced.get_feedback_summary(limit=10, actor=doctor, db=db)
+        
+        assert summary["total_items"] == 1
+        assert summary["feedback_summary"][0]["correction_count"] == 2
+        assert summary["feedback_summary"][0]["avg_confidence"] == pytest.approx(0.5)
+    
+    @pytest.mark.asyncio
+    async def test_edited_feedback_moves_in_summary(self, db, doctor):
+        """Test that editing a feedback row's codes moves its count to the new key"""
+        from sqlalchemy import text
+        
+        data = mapping_enhanced.MappingFeedbackRequest(
+            encounter_id="enc_1",
+            ayush_term="Jwara",
+            suggested_icd11="SM00",
+            clinician_icd11="SM01",
+            feedback_type="correction",
+            confidence_score=0.5
+        )
+        for _ in range(2):
+            await mapping_enhanced.submit_mapping_feedback(request=None, data=data, actor=doctor, db=db)
+        
+        await db.execute(text("""
+            UPDATE mapping_feedback SET clinician_icd11 = 'SM02', confidence_score = 0.9
+            WHERE id = (SELECT id FROM mapping_feedback LIMIT 1)
+        """))
+        await db.commit()
+        
+        summary = await mapping_enhanced.get_feedback_summary(limit=10, actor=doctor, db=db)
+        by_code = {row["clinician_icd11"]: row for row in summary["feedback_summary"]}
+        
+        assert {code: row["correction_count"] for code, row in by_code.items()} == {"SM01": 1, "SM02": 1}
+        assert by_code["SM01"]["avg_confidence"] == pytest.approx(0.5)
+        assert by_code["SM02"]["avg_confidence"] == pytest.approx(0.9)
+    
+    @pytest.mark.asyncio
+    async def test_proposals_listed_by_status(self, db):
+        """Test that proposals can be listed with and without a status filter"""
+        admin = ActorContext(user_id="admin_1", email="admin@example.com", role="admin")
+        data = mapping_enhanced.ProposeMappingUpdateRequest(
+            ayush_term="Jwara",
+            current_icd11="SM00",
+            proposed_icd11="SM01",
+            reason="Clinician consensus"
+        )
+        created = await mapping_enhanced.propose_mapping_update(request=None, data=data, actor=admin, db=db)
+        
+        pending = await mapping_enhanced.get_mapping_proposals(status="pending", actor=admin, db=db)
+        approved = await mapping_enhanced.get_mapping_proposals(status="approved", actor=admin, db=db)
+        everything = await mapping_enhanced.get_mapping_proposals(status=None, actor=admin, db=db)
+        
+        assert [p["proposal_id"] for p in pending["proposals"]] == [created["proposal_id"]]
+        assert approved["count"] == 0
+        assert everything["proposals"] == pending["proposals"]
+
+
+class TestMappingSearchCache:
+    """Test caching of mapping search results"""
+    
+    @pytest.mark.asyncio
+    async def test_repeat_search_skips_client(self, monkeypatch):
+        """Test that a repeated search (any case) is served from the cache"""
+        calls = []
+        
+        class CountingClient:
+            def search_namaste(self, query, limit=10):
+                calls.append((query, limit))
+                return [{"ayush_term": "Jwara"}]
+        
+        monkeypatch.setattr(mapping_enhanced, "_mapping_client", CountingClient())
+        mapping_enhanced._search_cache.clear()
+        
+        first = await mapping_enhanced.search_mappings(query="Jwa", limit=5, actor=None)
+        second = await mapping_enhanced.search_mappings(query="jWA", limit=5, actor=None)
+        await mapping_enhanced.search_mappings(query="jwa", limit=10, actor=None)
+        
+        assert first["results"] == second["results"]
+        assert second["query"] == "jWA"
+        assert calls == [("Jwa", 5), ("jwa", 10)]
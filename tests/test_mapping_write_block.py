@@ -5,6 +5,7 @@ Verifies that mapping resources are protected from unauthorized writes
 
 import pytest
 import os
+import sqlite3
 import sys
 from pathlib import Path
 
@@ -13,6 +14,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from services.safeguards import safe_write, is_mapping_resource, orchestrator_state, MAPPING_DATA_RESOURCES
 from backend.clients.mapping_client import MappingClient, get_mapping_client
+from backend.monitoring.mapping_detector import MappingDetector
 
 
 class TestMappingResourceDetection:
@@ -134,9 +136,16 @@ class TestMappingClient:
     
     def test_mapping_client_loads_data(self, client):
         """Test that MappingClient loads data from CSV"""
-        assert len(client.namaste_map) > 0
+        assert len(client.rows) > 0
         assert len(client.icd11_map) > 0
     
+    def test_mapping_client_indexes_point_to_rows(self, client):
+        """Test that name and code indexes resolve to the same stored row"""
+        row = client.rows[0]
+        
+        assert client.by_code[row.code.lower()] == 0
+        assert client.lookup(row.code) == client.lookup(row.ayush)
+    
     def test_mapping_client_lookup(self, client):
         """Test MappingClient lookup method"""
         # Try looking up a common AYUSH term
@@ -175,6 +184,26 @@ class TestMappingClient:
         assert isinstance(results, list)
         assert len(results) <= 5
     
+    def test_mapping_client_search_matches_substring_scan(self, client):
+        """Test that indexed search returns every substring match"""
+        for query in ["kasa", "vAta", "ja", "K", "characterised by"]:
+            expected = {
+                row.ayush for row in client.rows
+                if row.ayush and (query.lower() in row.ayush.lower() or query.lower() in row.definition.lower())
+            }
+            results = client.search_namaste(query, limit=len(client.rows))
+            
+            assert {r['ayush_term'] for r in results if r['ayush_term']} == expected
+    
+    def test_mapping_client_all_terms(self, client):
+        """Test that all terms are sorted, unique and safe to mutate"""
+        terms = client.get_all_namaste_terms()
+        
+        assert terms == sorted({row.ayush for row in client.rows if row.ayush})
+        
+        terms.clear()
+        assert client.get_all_namaste_terms()
+    
     def test_mapping_client_get_stats(self, client):
         """Test getting mapping statistics"""
         stats = client.get_stats()
@@ -203,6 +232,209 @@ class TestMappingClient:
         
         # Should be same instance
         assert client1 is client2
+    
+    def test_mapping_client_is_frozen(self, client):
+        """Test that a loaded client rejects attribute assignment"""
+        with pytest.raises(AttributeError):
+            client.rows = []
+        with pytest.raises(AttributeError):
+            del client.by_name
+
+
+class TestMappingDetector:
+    """Test mapping file modification detection"""
+    
+    @pytest.fixture(params=[True, False], ids=["inotify", "stat"])
+    def detector(self, request, tmp_path):
+        """Detector over a temporary data dir, with and without inotify"""
+        (tmp_path / "namaste.csv").write_text("code,display,definition,icd11_tm2_code\n")
+        (tmp_path / "icd11_codes.csv").write_text("code,title,description\n")
+        detector = MappingDetector(
+            database_url=f"sqlite:///{tmp_path / 'detector.db'}",
+            data_dir=str(tmp_path),
+            use_inotify=request.param
+        )
+        yield detector
+        detector.close()
+    
+    def test_untouched_files_report_nothing(self, detector):
+        """Test that unchanged mapping files produce no violations"""
+        assert detector.check_file_modifications() == []
+    
+    def test_modified_file_reported_until_reset(self, detector):
+        """Test that a modified mapping file is reported on every sweep"""
+        namaste = detector.data_dir / "namaste.csv"
+        baseline = detector.baseline_mtimes[str(namaste)]
+        with open(namaste, "a") as f:
+            f.write("X1,Injected,,\n")
+        os.utime(namaste, (baseline + 10, baseline + 10))
+        
+        for _ in range(2):
+            violations = detector.check_file_modifications()
+            assert [(v['type'], v['file']) for v in violations] == [('file_modified', str(namaste))]
+        
+        detector.reset_baselines()
+        assert detector.check_file_modifications() == []
+    
+    def test_deleted_file_reported_missing(self, detector):
+        """Test that a deleted mapping file is reported as missing"""
+        icd = detector.data_dir / "icd11_codes.csv"
+        icd.unlink()
+        
+        violations = detector.check_file_modifications()
+        assert [(v['type'], v['file']) for v in violations] == [('file_missing', str(icd))]
+    
+    def test_run_detection_combines_checks(self, detector):
+        """Test that the concurrent sweep reports every check's violations"""
+        assert detector.run_detection()['status'] == 'OK'
+        
+        (detector.data_dir / "icd11_codes.csv").unlink()
+        results = detector.run_detection()
+        
+        assert results['status'] == 'VIOLATION_DETECTED'
+        assert results['total_violations'] == 1
+        assert [v['type'] for v in results['file_violations']] == ['file_missing']
+        assert results['audit_events'] == [] and results['table_violations'] == []
+    
+    @pytest.mark.asyncio
+    async def test_run_detection_async_matches_sync(self, detector):
+        """Test that the async sweep reports the same violations"""
+        (detector.data_dir / "icd11_codes.csv").unlink()
+        results = await detector.run_detection_async()
+        
+        assert results['total_violations'] == 1
+        assert [v['type'] for v in results['file_violations']] == ['file_missing']
+    
+    @pytest.fixture
+    def mapping_db(self, tmp_path):
+        """Temporary database with empty mapping tables and orchestrator_audit"""
+        db_path = tmp_path / "mapping.db"
+        conn = sqlite3.connect(str(db_path))
+        for table in ('ayush_terms', 'mapping_candidates', 'icd_codes'):
+            conn.execute(f"CREATE TABLE {table} (id INTEGER PRIMARY KEY)")
+        conn.execute("""
+            CREATE TABLE orchestrator_audit (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, action TEXT, actor TEXT,
+                resource_target TEXT, payload_summary TEXT, timestamp TEXT, error_message TEXT
+            )
+        """)
+        conn.commit()
+        conn.close()
+        return db_path
+    
+    @pytest.fixture
+    def make_detector(self, mapping_db, tmp_path):
+        """Build stat-polling detectors over mapping_db, closed at teardown"""
+        detectors = []
+        
+        def make():
+            detector = MappingDetector(database_url=f"sqlite:///{mapping_db}", data_dir=str(tmp_path), use_inotify=False)
+            detectors.append(detector)
+            return detector
+        
+        yield make
+        for detector in detectors:
+            detector.close()
+    
+    def test_table_row_count_change_reported(self, mapping_db, make_detector):
+        """Test that row count changes are found by the combined count query"""
+        detector = make_detector()
+        assert detector.check_table_row_counts() == []
+        
+        conn = sqlite3.connect(str(mapping_db))
+        conn.execute("INSERT INTO mapping_candidates (id) VALUES (1)")
+        conn.commit()
+        conn.close()
+        
+        for _ in range(2):
+            violations = detector.check_table_row_counts()
+            assert [(v['table'], v['delta']) for v in violations] == [('mapping_candidates', 1)]
+    
+    def test_table_row_deletion_caught_by_periodic_full_count(self, mapping_db, make_detector):
+        """Test that deleting an older row is reported once the exact count is due"""
+        from backend.monitoring.mapping_detector import FULL_COUNT_MAX_AGE
+        conn = sqlite3.connect(str(mapping_db))
+        conn.executemany("INSERT INTO ayush_terms (id) VALUES (?)", [(1,), (2,)])
+        conn.commit()
+        
+        detector = make_detector()
+        
+        # Deleting a non-max row leaves MAX(rowid) unchanged
+        conn.execute("DELETE FROM ayush_terms WHERE id = 1")
+        conn.commit()
+        conn.close()
+        
+        # Within the bound only the rowid probe runs, and it sees no change
+        assert detector.check_table_row_counts() == []
+        
+        # One slow idle sweep later the exact count is due, whatever the sweep count
+        detector._last_full_count -= FULL_COUNT_MAX_AGE
+        violations = detector.check_table_row_counts()
+        
+        assert [(v['table'], v['delta']) for v in violations] == [('ayush_terms', -1)]
+        assert detector.check_table_row_counts() == violations
+    
+    def test_audit_events_reported_once(self, mapping_db, make_detector):
+        """Test that each blocked-write event is reported on exactly one sweep"""
+        conn = sqlite3.connect(str(mapping_db))
+        insert = "INSERT INTO orchestrator_audit (action, resource_target) VALUES (?, ?)"
+        conn.execute(insert, ('mapping_write_blocked', 'namaste_csv'))
+        conn.commit()
+        
+        detector = make_detector()
+        assert detector.check_audit_logs() == []
+        
+        conn.executemany(insert, [
+            ('mapping_write_blocked', 'icd_codes'),
+            ('encounter_processed', None),
+            ('mapping_write_blocked', 'mapping_candidates')
+        ])
+        conn.commit()
+        conn.close()
+        
+        events = detector.check_audit_logs()
+        assert [e['resource_target'] for e in events] == ['icd_codes', 'mapping_candidates']
+        assert detector.check_audit_logs() == []
+    
+    def test_sweep_reads_on_one_connection(self, make_detector):
+        """Test that a sweep's database checks share a single pool checkout"""
+        from sqlalchemy import event
+        
+        detector = make_detector()
+        checkouts = []
+        event.listen(detector.engine.pool, "checkout", lambda *args: checkouts.append(1))
+        
+        results = detector.run_detection()
+        
+        assert results['status'] == 'OK'
+        assert len(checkouts) == 1
+    
+    def test_detector_loop_backs_off_while_idle(self, monkeypatch):
+        """Test that idle sweeps lengthen the interval and a violation resets it"""
+        from backend.monitoring import mapping_detector
+        
+        totals = iter([0, 0, 0, 1, 0])
+        sleeps = []
+        
+        class FakeDetector:
+            def run_detection(self):
+                return {'total_violations': next(totals)}
+            
+            def close(self):
+                pass
+        
+        def fake_sleep(seconds):
+            sleeps.append(seconds)
+            if len(sleeps) == 5:
+                raise KeyboardInterrupt
+        
+        monkeypatch.setattr(mapping_detector, "MappingDetector", FakeDetector)
+        monkeypatch.setattr(mapping_detector.time, "sleep", fake_sleep)
+        
+        with pytest.raises(KeyboardInterrupt):
+            mapping_detector.run_detector_loop(min_interval=10, max_interval=25, backoff=2)
+        
+        assert sleeps == [20, 25, 25, 10, 20]
 
 
 class TestMappingImmutability:
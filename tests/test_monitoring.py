@@ -0,0 +1,56 @@
+"""
+Tests for monitoring routes
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.routes import monitoring
+
+
+class TestMetricsEndpoint:
+    """Test Prometheus metrics rendering"""
+    
+    @pytest.mark.asyncio
+    async def test_scrapes_within_ttl_share_payload(self, monkeypatch):
+        """Test that repeated scrapes reuse the rendered payload"""
+        calls = []
+        
+        class StubService:
+            def get_metrics(self):
+                calls.append(1)
+                return {"users_total": 3, "app_errors_total": 0}
+        
+        monkeypatch.setattr(monitoring, "_monitoring_service", StubService())
+        monitoring._metrics_cache.clear()
+        
+        first = await monitoring.get_metrics()
+        second = await monitoring.get_metrics()
+        
+        assert first.body == second.body
+        assert first.body.decode() == (
+            "# TYPE users_total gauge\nusers_total 3\n"
+            "# TYPE app_errors_total gauge\napp_errors_total 0"
+        )
+        assert len(calls) == 1
+    
+    @pytest.mark.asyncio
+    async def test_probes_return_json(self, monkeypatch):
+        """Test that liveness and failed readiness respond with JSON bodies"""
+        class DegradedService:
+            def get_health_status(self):
+                return {"status": "degraded"}
+        
+        monkeypatch.setattr(monitoring, "_monitoring_service", DegradedService())
+        
+        live = await monitoring.liveness_check()
+        ready = await monitoring.readiness_check()
+        
+        assert live.body == b'{"alive":true}'
+        assert ready.status_code == 503
+        assert ready.media_type == "application/json"
+        assert ready.body == b'{"ready":false}'
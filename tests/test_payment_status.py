@@ -0,0 +1,92 @@
+"""
+Tests for payment status caching
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from backend.services import payment_service
+from backend.services.payment_service import PaymentService
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    """Mock-mode payment service on a fresh database with one pending intent"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'payments.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE payment_intents (
+                id TEXT PRIMARY KEY, appointment_id TEXT, amount REAL, currency TEXT,
+                status TEXT, provider_order_id TEXT, provider_payment_id TEXT,
+                paid_at TIMESTAMP, updated_at TIMESTAMP, error_message TEXT
+            )
+        """))
+        conn.execute(text("""
+            INSERT INTO payment_intents (id, appointment_id, amount, currency, status, provider_order_id)
+            VALUES ('pi_1', 'appt_1', 500.0, 'INR', 'pending', 'order_1')
+        """))
+        conn.execute(text("""
+            CREATE TABLE payment_webhooks (
+                id TEXT PRIMARY KEY, provider TEXT, event_type TEXT, payload TEXT,
+                signature TEXT, processed BOOLEAN, created_at TIMESTAMP
+            )
+        """))
+
+    monkeypatch.setattr(payment_service, "SessionLocal", sessionmaker(bind=engine))
+    payment_service._payment_status_cache.clear()
+
+    service = PaymentService()
+    service.razorpay_available = False
+    yield service
+
+    payment_service._payment_status_cache.clear()
+    engine.dispose()
+
+
+class TestPaymentStatusCache:
+    """Test cached payment status polling"""
+
+    def test_repeated_polls_are_cached(self, service, monkeypatch):
+        """Test that polling again is served from cache"""
+        first = service.get_payment_status("pi_1")
+        monkeypatch.setattr(payment_service, "SessionLocal", None)
+
+        assert service.get_payment_status("pi_1") == first
+        assert first["status"] == "pending"
+
+    def test_verify_invalidates_status(self, service):
+        """Test that a verified payment is visible on the next poll"""
+        service.get_payment_status("pi_1")
+        service.verify_payment("pi_1", "pay_1", "order_1", "sig")
+
+        status = service.get_payment_status("pi_1")
+        assert status["status"] == "succeeded"
+        assert status["provider_payment_id"] == "pay_1"
+        assert status["paid_at"]
+
+    def test_webhook_invalidates_status(self, service):
+        """Test that a webhook update by order id drops the cached intent"""
+        service.get_payment_status("pi_1")
+        service.handle_webhook(
+            event_type="payment.failed",
+            payload={"payload": {"payment": {"entity": {"order_id": "order_1", "error_description": "declined"}}}},
+            signature=""
+        )
+
+        status = service.get_payment_status("pi_1")
+        assert status["status"] == "failed"
+        assert status["error_message"] == "declined"
+
+    def test_missing_intent_is_not_cached(self, service):
+        """Test that a not-found lookup raises and leaves nothing cached"""
+        with pytest.raises(ValueError):
+            service.get_payment_status("pi_missing")
+
+        assert len(payment_service._payment_status_cache) == 0
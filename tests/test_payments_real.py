@@ -0,0 +1,126 @@
+"""
+Tests for Razorpay order and payment routes
+"""
+
+import pytest
+import pytest_asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from backend.routes import payments_real
+
+
+class NullAuditQueue:
+    """Audit queue that discards records"""
+
+    def enqueue(self, record):
+        return True
+
+
+@pytest_asyncio.fixture
+async def db(tmp_path, monkeypatch):
+    """Async session on a fresh database with one appointment"""
+    from backend.decorators import audit
+    monkeypatch.setattr(audit, "get_audit_queue", lambda: NullAuditQueue())
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'payments.db'}")
+    async with engine.begin() as conn:
+        await conn.execute(text("""
+            CREATE TABLE appointments (
+                id TEXT PRIMARY KEY, staff_id TEXT, appointment_date TEXT, status TEXT
+            )
+        """))
+        await conn.execute(text("""
+            CREATE TABLE payment_intents (
+                id TEXT PRIMARY KEY, user_id TEXT, appointment_id TEXT, amount REAL,
+                currency TEXT, razorpay_order_id TEXT, razorpay_payment_id TEXT,
+                status TEXT, created_at TIMESTAMP, verified_at TIMESTAMP
+            )
+        """))
+        await conn.execute(text("""
+            INSERT INTO appointments (id, staff_id, appointment_date, status)
+            VALUES ('appt_1', 'doc_1', '2026-10-20', 'scheduled')
+        """))
+
+    async with AsyncSession(engine) as session:
+        yield session
+    await engine.dispose()
+
+
+class TestCreatePaymentOrder:
+    """Test Razorpay order creation"""
+
+    async def _create(self, db):
+        return await payments_real.create_payment_order(
+            request=payments_real.CreatePaymentRequest(appointment_id="appt_1", amount=500.0),
+            current_user={"id": "pat_1"},
+            db=db
+        )
+
+    @pytest.mark.asyncio
+    async def test_order_is_stored(self, db, monkeypatch):
+        """Test that the Razorpay order id is stored on a new intent"""
+        monkeypatch.setattr(payments_real.razorpay_client.order, "create", lambda data: {"id": "order_1"})
+
+        response = await self._create(db)
+
+        row = (await db.execute(text("SELECT razorpay_order_id, status FROM payment_intents"))).fetchone()
+        assert response.order_id == "order_1"
+        assert tuple(row) == ("order_1", "created")
+
+    @pytest.mark.asyncio
+    async def test_razorpay_failure_is_http_500(self, db, monkeypatch):
+        """Test that a failed order call surfaces as an HTTPException and leaves the session usable"""
+        def failing_create(data):
+            raise RuntimeError("razorpay down")
+
+        monkeypatch.setattr(payments_real.razorpay_client.order, "create", failing_create)
+
+        with pytest.raises(HTTPException) as exc:
+            await self._create(db)
+
+        assert exc.value.status_code == 500
+        assert (await db.execute(text("SELECT COUNT(*) FROM payment_intents"))).scalar() == 0
+
+
+class TestPaymentHistory:
+    """Test payment history listing"""
+
+    @pytest.mark.asyncio
+    async def test_history_includes_appointment_date(self, db, monkeypatch):
+        """Test that each intent carries its appointment's date"""
+        monkeypatch.setattr(payments_real.razorpay_client.order, "create", lambda data: {"id": "order_1"})
+        await payments_real.create_payment_order(
+            request=payments_real.CreatePaymentRequest(appointment_id="appt_1", amount=500.0),
+            current_user={"id": "pat_1"},
+            db=db
+        )
+
+        history = await payments_real.get_payment_history(current_user={"id": "pat_1"}, db=db)
+
+        assert [p["appointment_date"] for p in history["payments"]] == ["2026-10-20"]
+
+
+class TestCheckoutSignatureVerifier:
+    """Test shared checkout signature check"""
+
+    def test_matches_razorpay_scheme(self):
+        """Test that HMAC-SHA256(secret, 'order|payment') is accepted and anything else rejected"""
+        import hmac
+        import hashlib
+        from backend.utils.razorpay_signature import CheckoutSignatureVerifier
+
+        verifier = CheckoutSignatureVerifier("secret")
+        signature = hmac.new(b"secret", b"order_1|pay_1", hashlib.sha256).hexdigest()
+
+        assert verifier.is_valid("order_1", "pay_1", signature)
+        assert verifier.is_valid("order_1", "pay_1", signature)
+        assert not verifier.is_valid("order_1", "pay_2", signature)
+        assert not verifier.is_valid("order_1", "pay_1", "0" * 64)
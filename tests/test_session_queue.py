@@ -0,0 +1,124 @@
+"""
+Tests for batched teleconsult session transitions
+"""
+
+import asyncio
+import pytest
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import create_engine, text
+
+from backend.services import session_queue
+from backend.services.session_queue import SessionTransitionQueue, write_session_transitions
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    """Point the session writer at a fresh database with three booked sessions"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'sessions.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE teleconsult_sessions (
+                appointment_id TEXT PRIMARY KEY, status TEXT, started_at TIMESTAMP,
+                ended_at TIMESTAMP, duration_seconds INTEGER
+            )
+        """))
+        conn.execute(text("""
+            CREATE TABLE appointments (
+                id TEXT PRIMARY KEY, status TEXT, session_started_at TIMESTAMP,
+                session_ended_at TIMESTAMP, duration_minutes INTEGER
+            )
+        """))
+        for appointment_id in ("a1", "a2", "a3"):
+            conn.execute(text("INSERT INTO teleconsult_sessions (appointment_id, status) VALUES (:id, 'created')"), {"id": appointment_id})
+            conn.execute(text("INSERT INTO appointments (id, status) VALUES (:id, 'scheduled')"), {"id": appointment_id})
+
+    monkeypatch.setattr(session_queue, "engine", engine)
+    yield engine
+    engine.dispose()
+
+
+def _statuses(engine):
+    with engine.connect() as conn:
+        return dict(conn.execute(text("SELECT appointment_id, status FROM teleconsult_sessions")).fetchall())
+
+
+class TestWriteSessionTransitions:
+    """Test applying transitions in one transaction"""
+
+    def test_start_then_end_in_one_batch(self, engine):
+        """Test that an end sees a start earlier in the same batch"""
+        started = datetime.utcnow()
+        ended = started + timedelta(minutes=5, seconds=30)
+
+        results = write_session_transitions([("start", "a1", started), ("end", "a1", ended)])
+
+        assert results[0] == {"status": "active", "started_at": started.isoformat()}
+        assert results[1]["duration_seconds"] == 330
+        assert results[1]["duration_minutes"] == 5
+        with engine.connect() as conn:
+            appointment = conn.execute(text("SELECT status, duration_minutes FROM appointments WHERE id = 'a1'")).fetchone()
+        assert tuple(appointment) == ("completed", 5)
+
+    def test_end_without_start_is_rejected(self, engine):
+        """Test that ending a session that never started fails only that event"""
+        now = datetime.utcnow()
+
+        results = write_session_transitions([("end", "a1", now), ("start", "a2", now)])
+
+        assert isinstance(results[0], ValueError)
+        assert results[1]["status"] == "active"
+        assert _statuses(engine) == {"a1": "created", "a2": "active", "a3": "created"}
+
+
+class TestSessionTransitionQueue:
+    """Test SessionTransitionQueue batching behaviour"""
+
+    @pytest.mark.asyncio
+    async def test_submit_without_writer_writes_inline(self, engine):
+        """Test that transitions are written immediately when no writer is running"""
+        queue = SessionTransitionQueue()
+
+        result = await queue.submit("start", "a1")
+
+        assert result["status"] == "active"
+        assert _statuses(engine)["a1"] == "active"
+
+    @pytest.mark.asyncio
+    async def test_concurrent_transitions_share_a_batch(self, engine, monkeypatch):
+        """Test that transitions submitted together are written in one transaction"""
+        batches = []
+
+        def recording_write(events):
+            batches.append(list(events))
+            return write_session_transitions(events)
+
+        monkeypatch.setattr(session_queue, "write_session_transitions", recording_write)
+        queue = SessionTransitionQueue()
+        queue.start()
+
+        results = await asyncio.gather(*(queue.submit("start", a) for a in ("a1", "a2", "a3")))
+        await queue.stop()
+
+        assert [r["status"] for r in results] == ["active"] * 3
+        assert [len(b) for b in batches] == [3]
+        assert set(_statuses(engine).values()) == {"active"}
+
+    @pytest.mark.asyncio
+    async def test_rejected_transition_raises_for_its_caller(self, engine):
+        """Test that a rejected transition raises without failing the rest of the batch"""
+        queue = SessionTransitionQueue()
+        queue.start()
+
+        results = await asyncio.gather(
+            queue.submit("end", "a1"), queue.submit("start", "a2"), return_exceptions=True
+        )
+        await queue.stop()
+
+        assert isinstance(results[0], ValueError)
+        assert results[1]["status"] == "active"
@@ -0,0 +1,107 @@
+"""
+Tests for teleconsult video call routes
+"""
+
+import pytest
+import pytest_asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from backend.routes import teleconsult_real
+from backend.middleware.rbac import ActorContext
+
+
+class NullAuditQueue:
+    """Audit queue that discards records"""
+
+    def enqueue(self, record):
+        return True
+
+
+@pytest_asyncio.fixture
+async def db(tmp_path, monkeypatch):
+    """Async session on a fresh database with a few appointments"""
+    from backend.decorators import audit
+    monkeypatch.setattr(audit, "get_audit_queue", lambda: NullAuditQueue())
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'teleconsult.db'}")
+    async with engine.begin() as conn:
+        await conn.execute(text("""
+            CREATE TABLE appointments (
+                id TEXT PRIMARY KEY, status TEXT, teleconsult_enabled BOOLEAN DEFAULT 0,
+                room_token TEXT, room_url TEXT, session_started_at TIMESTAMP,
+                session_ended_at TIMESTAMP, duration_minutes INTEGER
+            )
+        """))
+        await conn.execute(text("""
+            INSERT INTO appointments (id, status) VALUES
+            ('appt_scheduled', 'scheduled'), ('appt_live', 'in-progress'), ('appt_done', 'completed')
+        """))
+
+    async with AsyncSession(engine) as session:
+        yield session
+    await engine.dispose()
+
+
+class TestStartVideoCall:
+    """Test start-call state checks"""
+
+    async def _start(self, db, appointment_id):
+        return await teleconsult_real.start_video_call(
+            request=teleconsult_real.StartCallRequest(appointment_id=appointment_id, participant_name="Dr. A"),
+            current_user=ActorContext(user_id="doc_1", email="doc@example.com", role="doctor"),
+            db=db
+        )
+
+    @pytest.mark.asyncio
+    async def test_scheduled_appointment_starts(self, db):
+        """Test that a scheduled appointment moves to in-progress"""
+        response = await self._start(db, "appt_scheduled")
+
+        status = (await db.execute(text("SELECT status FROM appointments WHERE id = 'appt_scheduled'"))).scalar()
+        assert response.meeting_started
+        assert status == "in-progress"
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("appointment_id", ["appt_live", "appt_done"])
+    async def test_started_or_finished_call_conflicts(self, db, appointment_id):
+        """Test that a call can't be started twice or after it ended"""
+        with pytest.raises(HTTPException) as exc:
+            await self._start(db, appointment_id)
+
+        assert exc.value.status_code == 409
+
+    @pytest.mark.asyncio
+    async def test_missing_appointment_not_found(self, db):
+        """Test that an unknown appointment is a 404"""
+        with pytest.raises(HTTPException) as exc:
+            await self._start(db, "appt_missing")
+
+        assert exc.value.status_code == 404
+
+
+class TestJoinVideoCall:
+    """Test participant token issuance"""
+
+    @pytest.mark.asyncio
+    async def test_token_carries_authenticated_user(self, monkeypatch):
+        """Test that the participant token identifies the authenticated actor"""
+        import jwt
+        from backend.decorators import audit
+        monkeypatch.setattr(audit, "get_audit_queue", lambda: NullAuditQueue())
+
+        response = await teleconsult_real.join_video_call(
+            request=teleconsult_real.JoinCallRequest(room_id="room-1", participant_name="Patient P"),
+            current_user=ActorContext(user_id="pat_1", email="pat@example.com", role="patient")
+        )
+
+        claims = jwt.decode(response.jwt_token, options={"verify_signature": False})
+        assert claims["context"]["user"]["id"] == "pat_1"
+        assert claims["context"]["user"]["moderator"] == "false"